@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class HealthOracleConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'HealthOracle'
+
+    def ready(self):
+        import HealthOracle.checks
@@ -0,0 +1,148 @@
+"""Cascade inference: a logistic screen distilled from a served model answers the
+rows whose risk is clearly inside one category band, and only rows within a
+margin of the 30 % / 60 % category thresholds reach the full model.
+"""
+import json
+import os
+import threading
+
+import numpy as np
+
+# Risk percentages where get_risk_category changes band
+CATEGORY_THRESHOLDS = np.array([30.0, 60.0])
+
+
+class LogisticScreen:
+    """``sigmoid(X @ weights + bias)`` on the scaled model inputs.
+
+    ``distilled_from`` is the version of the model it imitates; a screen is
+    only used in front of that exact version.
+    """
+
+    kind = 'logistic'
+
+    def __init__(self, weights, bias, name=None, distilled_from=None, margin=None):
+        self.name = name
+        self.weights = np.ascontiguousarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+        self.distilled_from = distilled_from
+        self.margin = margin
+
+    @property
+    def input_dim(self):
+        return len(self.weights)
+
+    @property
+    def nbytes(self):
+        return self.weights.nbytes + 8
+
+    def predict_proba_batch(self, X_scaled):
+        logits = np.asarray(X_scaled, dtype=np.float64) @ self.weights + self.bias
+        return 1.0 / (1.0 + np.exp(-np.clip(logits, -500, 500)))
+
+    def save(self, path, **metadata):
+        """Write the screen as JSON; ``metadata`` (such as the distillation report) is stored alongside"""
+        document = dict(metadata, kind=self.kind, name=self.name, weights=self.weights.tolist(), bias=self.bias,
+                        distilled_from=self.distilled_from, margin=self.margin)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(document, f, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            document = json.load(f)
+        if document.get('kind') != cls.kind:
+            raise ValueError(f"{path} holds a '{document.get('kind')}' screen, expected '{cls.kind}'")
+        return cls(document['weights'], document['bias'], document.get('name'), document.get('distilled_from'),
+                   document.get('margin'))
+
+
+def distil_logistic(X_scaled, probabilities, l2=1e-4, iterations=50, tolerance=1e-10):
+    """Fit a LogisticScreen to a model's probabilities on X_scaled (soft-label cross-entropy, Newton steps)"""
+    X = np.asarray(X_scaled, dtype=np.float64)
+    targets = np.asarray(probabilities, dtype=np.float64).reshape(-1)
+    design = np.column_stack([X, np.ones(len(X))])
+    # The bias is not penalised
+    penalty = np.full(design.shape[1], l2)
+    penalty[-1] = 0.0
+    coefficients = np.zeros(design.shape[1])
+    for _ in range(iterations):
+        fitted = 1.0 / (1.0 + np.exp(-np.clip(design @ coefficients, -500, 500)))
+        gradient = design.T @ (fitted - targets) / len(X) + penalty * coefficients
+        hessian = (design * (fitted * (1.0 - fitted))[:, None]).T @ design / len(X) + np.diag(penalty)
+        step = np.linalg.solve(hessian + 1e-12 * np.eye(len(coefficients)), gradient)
+        coefficients -= step
+        if np.abs(step).max() < tolerance:
+            break
+    return LogisticScreen(coefficients[:-1], coefficients[-1])
+
+
+def threshold_distance(risk_percentages):
+    """Distance in percentage points from each risk to the nearest category threshold"""
+    risk = np.asarray(risk_percentages, dtype=np.float64).reshape(-1, 1)
+    return np.abs(risk - CATEGORY_THRESHOLDS).min(axis=1)
+
+
+def category_codes(risk_percentages):
+    """0/1/2 for Low/Moderate/High Risk, as get_risk_category assigns them"""
+    risk = np.asarray(risk_percentages)
+    return (risk >= CATEGORY_THRESHOLDS[0]).astype(np.intp) + (risk > CATEGORY_THRESHOLDS[1])
+
+
+def flip_mask(screen_risk, full_risk):
+    """Rows where the screen's risk category differs from the full model's"""
+    return category_codes(screen_risk) != category_codes(full_risk)
+
+
+def agreement_report(screen_risk, full_risk, margins):
+    """Short-circuit rate, category flips and largest risk difference among short-circuited rows, per margin"""
+    distance = threshold_distance(screen_risk)
+    flipped = flip_mask(screen_risk, full_risk)
+    delta = np.abs(np.asarray(screen_risk) - np.asarray(full_risk))
+    report = []
+    for margin in margins:
+        screened = distance > margin
+        report.append({
+            'margin': float(margin),
+            'rows': int(len(distance)),
+            'short_circuit_rate': round(float(screened.mean()), 4) if len(distance) else 0.0,
+            'flips': int((flipped & screened).sum()),
+            'max_risk_delta': round(float(delta[screened].max()), 2) if screened.any() else 0.0,
+        })
+    return report
+
+
+def smallest_safe_margin(screen_risk, full_risk):
+    """Smallest margin that sends every row whose category the screen gets wrong to the full model"""
+    flipped = flip_mask(screen_risk, full_risk)
+    return float(threshold_distance(screen_risk)[flipped].max()) if flipped.any() else 0.0
+
+
+class CascadeStats:
+    """Thread-safe counts of rows the screen answered versus rows passed on to the full model"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.rows = 0
+        self.short_circuited = 0
+        self.escalated = 0
+
+    def record(self, rows, escalated):
+        with self._lock:
+            self.calls += 1
+            self.rows += rows
+            self.escalated += escalated
+            self.short_circuited += rows - escalated
+
+    def stats(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'rows': self.rows,
+                'short_circuited': self.short_circuited,
+                'escalated': self.escalated,
+                'short_circuit_rate': round(self.short_circuited / self.rows, 4) if self.rows else None,
+            }
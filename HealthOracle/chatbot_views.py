@@ -3,18 +3,26 @@ from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from .models import PredictionHistory
 from .chatbot_models import ChatbotSuggestion
+from .request_timing import stage
 import json
+import logging
 from django.conf import settings
 
+logger = logging.getLogger(__name__)
+
 # Configure Gemini API - lazy load to avoid slow startup
 def configure_gemini():
     try:
         # Import here to avoid slow Django startup
         import google.genai as genai
-        client = genai.Client(api_key=settings.GEMINI_API_KEY)
+        options = {}
+        base_url = getattr(settings, 'GEMINI_BASE_URL', None)
+        if base_url:
+            options['http_options'] = {'base_url': base_url}
+        client = genai.Client(api_key=settings.GEMINI_API_KEY, **options)
         return client
-    except Exception as e:
-        print(f"Error configuring Gemini: {str(e)}")
+    except Exception:
+        logger.exception("Error configuring Gemini")
         return None
 
 @login_required
@@ -81,14 +89,16 @@ def get_suggestions(request, prediction_id):
             
             try:
                 # Initialize Gemini
-                client = configure_gemini()
+                with stage('gemini_client'):
+                    client = configure_gemini()
                 if not client:
                     raise Exception("Failed to initialize Gemini client")
                 
-                response = client.models.generate_content(
-                    model='models/gemini-2.5-flash',
-                    contents=prompt
-                )
+                with stage('gemini'):
+                    response = client.models.generate_content(
+                        model='models/gemini-2.5-flash',
+                        contents=prompt
+                    )
                 
                 if not response or not response.text:
                     raise Exception("Empty response from Gemini API")
@@ -103,8 +113,8 @@ def get_suggestions(request, prediction_id):
                     'success': True,
                     'suggestion': suggestion.suggestion_text
                 })
-            except Exception as e:
-                print(f"Gemini API Error: {str(e)}")
+            except Exception:
+                logger.exception("Gemini API error", extra={'prediction_id': prediction_id})
                 return JsonResponse({
                     'success': False,
                     'error': 'Unable to generate health suggestions at this time. Please try again later.'
@@ -115,8 +125,8 @@ def get_suggestions(request, prediction_id):
                 'success': False,
                 'error': 'Prediction not found'
             })
-        except Exception as e:
-            print(f"General Error: {str(e)}")
+        except Exception:
+            logger.exception("Unexpected error generating suggestions", extra={'prediction_id': prediction_id})
             return JsonResponse({
                 'success': False,
                 'error': 'An unexpected error occurred. Please try again later.'
@@ -137,7 +147,8 @@ def handle_chatbot_query(request, prediction_id=None):
                 })
             
             # Initialize Gemini
-            client = configure_gemini()
+            with stage('gemini_client'):
+                client = configure_gemini()
             if not client:
                 raise Exception("Failed to initialize Gemini client")
 
@@ -202,10 +213,11 @@ def handle_chatbot_query(request, prediction_id=None):
                 """
             
             try:
-                response = client.models.generate_content(
-                    model='models/gemini-2.5-flash',
-                    contents=context
-                )
+                with stage('gemini'):
+                    response = client.models.generate_content(
+                        model='models/gemini-2.5-flash',
+                        contents=context
+                    )
                 
                 if not response or not response.text:
                     raise Exception("Empty response from Gemini API")
@@ -214,8 +226,8 @@ def handle_chatbot_query(request, prediction_id=None):
                     'response': response.text
                 })
                 
-            except Exception as e:
-                print(f"Gemini API Error: {str(e)}")
+            except Exception:
+                logger.exception("Gemini API error", extra={'prediction_id': prediction_id})
                 return JsonResponse({
                     'response': 'I apologize, but I encountered an error generating a response. Please try again or rephrase your question.'
                 })
@@ -224,8 +236,8 @@ def handle_chatbot_query(request, prediction_id=None):
             return JsonResponse({
                 'response': 'Invalid request format. Please try again.'
             })
-        except Exception as e:
-            print(f"Error in handle_chatbot_query: {str(e)}")
+        except Exception:
+            logger.exception("Error in handle_chatbot_query", extra={'prediction_id': prediction_id})
             return JsonResponse({
                 'response': 'I apologize, but I encountered an error processing your request. Please try again.'
             })
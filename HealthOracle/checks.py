@@ -0,0 +1,88 @@
+from django.core.checks import Error, Warning, register
+
+from .model_bundle import BundleError, read_bundle_header
+
+
+@register()
+def check_model_bundles(app_configs, **kwargs):
+    """Validate model bundle headers at startup (format version, model name)"""
+    from .ml_models import (MODEL_NAMES, forest_bundle_problem, get_cascade_margin, get_cascade_path,
+                            get_legacy_paths, get_model_backend, get_model_precision, get_served_bundle_path,
+                            precision_parity)
+
+    messages = []
+    for name in MODEL_NAMES:
+        try:
+            precision = get_model_precision(name)
+        except BundleError as e:
+            messages.append(Error(str(e), id='HealthOracle.E003'))
+            precision = 'float32'
+        try:
+            if get_cascade_margin(name) is not None and not get_cascade_path(name).exists():
+                messages.append(Error(
+                    f"ML_CASCADE_MARGIN cascades '{name}', but {get_cascade_path(name)} does not exist.",
+                    hint=f"Run 'python manage.py build_cascade_models {name}'.",
+                    id='HealthOracle.E007',
+                ))
+        except BundleError as e:
+            messages.append(Error(str(e), id='HealthOracle.E007'))
+        try:
+            backend = get_model_backend(name)
+        except BundleError as e:
+            messages.append(Error(str(e), id='HealthOracle.E004'))
+            continue
+        if backend == 'keras':
+            missing = [str(path) for path in get_legacy_paths(name) if not path.exists()]
+            if missing:
+                messages.append(Error(
+                    f"ML_MODEL_BACKEND serves '{name}' with Keras, but {', '.join(missing)} does not exist.",
+                    id='HealthOracle.E006',
+                ))
+            continue
+        if backend == 'forest':
+            problem = forest_bundle_problem(name)
+            if problem is not None:
+                messages.append(Error(
+                    f"ML_MODEL_BACKEND serves '{name}' from a forest bundle, but {problem}. "
+                    f"It would be served by the numpy backend.",
+                    hint=f"Run 'python manage.py build_model_bundles --forest {name}', or retrain "
+                         f"{name}_model.pkl on the current {name} features first.",
+                    id='HealthOracle.E005',
+                ))
+                continue
+        path = get_served_bundle_path(name)
+        if not path.exists():
+            messages.append(Warning(
+                f"No model bundle for '{name}' at {path}; falling back to the legacy .h5/.pkl files.",
+                hint="Run 'python manage.py build_model_bundles'.",
+                id='HealthOracle.W001',
+            ))
+            continue
+        try:
+            header = read_bundle_header(path)
+        except (BundleError, OSError, ValueError) as e:
+            messages.append(Error(str(e), id='HealthOracle.E001'))
+            continue
+        if header.get('name') != name:
+            messages.append(Error(
+                f"{path} contains the '{header.get('name')}' model, expected '{name}'.",
+                id='HealthOracle.E002',
+            ))
+        if backend == 'numpy' and precision != 'float32' and header.get('precision', 'float32') == 'float32':
+            parity = precision_parity(name, precision, header.get('model_version'))
+            if parity is None:
+                messages.append(Warning(
+                    f"ML_MODEL_PRECISION serves '{name}' at {precision}, which has not been checked against "
+                    f"float32 for model version {header.get('model_version')}.",
+                    hint=f"Run 'python manage.py check_reduced_precision {name} --precisions {precision} --record'.",
+                    id='HealthOracle.W002',
+                ))
+            elif not parity['within_tolerance']:
+                messages.append(Error(
+                    f"ML_MODEL_PRECISION serves '{name}' at {precision}, but that moves its risk by up to "
+                    f"{parity['max_delta']} points and changes {parity['flips']} risk categories; "
+                    f"it would be served at float32.",
+                    hint="Use float16 or remove the setting.",
+                    id='HealthOracle.E008',
+                ))
+    return messages
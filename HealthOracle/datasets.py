@@ -0,0 +1,138 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import tempfile
+import urllib.request
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+# Training tables for the models trained on real data (lung uses generated data).
+# Each is imported once from CSV into <ML_DATASET_DIR>/<name>.npz: one float64
+# array per column, NaN for missing values, categorical columns as codes.
+DATASETS = {
+    'heart': {
+        'url': 'https://archive.ics.uci.edu/ml/machine-learning-databases/heart-disease/processed.cleveland.data',
+        'columns': ['age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg', 'thalach', 'exang',
+                    'oldpeak', 'slope', 'ca', 'thal', 'target'],
+        'na_values': ['?'],
+    },
+    'liver': {
+        # Same columns as the Kaggle indian_liver_patient.csv (which has a header row)
+        'url': 'https://archive.ics.uci.edu/ml/machine-learning-databases/00225/Indian%20Liver%20Patient%20Dataset%20(ILPD).csv',
+        'columns': ['Age', 'Gender', 'Total_Bilirubin', 'Direct_Bilirubin', 'Alkaline_Phosphotase',
+                    'Alamine_Aminotransferase', 'Aspartate_Aminotransferase', 'Total_Protiens', 'Albumin',
+                    'Albumin_and_Globulin_Ratio', 'Dataset'],
+        'categories': {'Gender': ['Female', 'Male']},
+    },
+    'diabetes': {
+        'url': 'https://raw.githubusercontent.com/jbrownlee/Datasets/master/pima-indians-diabetes.data.csv',
+        'columns': ['Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness', 'Insulin',
+                    'BMI', 'DiabetesPedigreeFunction', 'Age', 'Outcome'],
+    },
+}
+
+
+class DatasetError(Exception):
+    pass
+
+
+def get_dataset_dir():
+    return Path(getattr(settings, 'ML_DATASET_DIR', None) or Path(settings.BASE_DIR) / 'datasets')
+
+
+def get_dataset_path(name):
+    return get_dataset_dir() / f'{name}.npz'
+
+
+def _is_number(value):
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+
+def parse_csv(text, spec):
+    """Columns of a dataset CSV as float64 arrays; a header row, if present, is skipped"""
+    columns = spec['columns']
+    na_values = set(spec.get('na_values', [])) | {''}
+    categories = spec.get('categories', {})
+    rows = [row for row in csv.reader(io.StringIO(text)) if row]
+    if rows and not _is_number(rows[0][0].strip()):
+        rows = rows[1:]
+    data = np.full((len(rows), len(columns)), np.nan)
+    for i, row in enumerate(rows):
+        if len(row) != len(columns):
+            raise DatasetError(f"Row {i + 1} has {len(row)} values, expected {len(columns)}")
+        for j, (column, value) in enumerate(zip(columns, row)):
+            value = value.strip()
+            if value in na_values:
+                continue
+            if column in categories:
+                try:
+                    data[i, j] = categories[column].index(value)
+                except ValueError:
+                    raise DatasetError(f"Row {i + 1}: unknown {column} value {value!r}")
+            else:
+                try:
+                    data[i, j] = float(value)
+                except ValueError:
+                    raise DatasetError(f"Row {i + 1}: {column} value {value!r} is not a number")
+    return {column: np.ascontiguousarray(data[:, j]) for j, column in enumerate(columns)}
+
+
+def import_dataset(name, source=None):
+    """Convert a dataset CSV (local path or URL, default: the dataset's URL) into the local cache"""
+    spec = DATASETS.get(name)
+    if spec is None:
+        raise DatasetError(f"No dataset is defined for '{name}'")
+    source = str(source or spec['url'])
+    if source.startswith(('http://', 'https://')):
+        with urllib.request.urlopen(source, timeout=60) as response:
+            raw = response.read()
+    else:
+        with open(source, 'rb') as f:
+            raw = f.read()
+
+    columns = parse_csv(raw.decode('utf-8-sig'), spec)
+    meta = {
+        'name': name,
+        'source': source,
+        'sha256': hashlib.sha256(raw).hexdigest(),
+        'rows': len(next(iter(columns.values()))),
+        'imported': datetime.now(timezone.utc).isoformat(),
+    }
+    path = get_dataset_path(name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{name}-', suffix='.npz')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez_compressed(f, _meta=np.array(json.dumps(meta)), **columns)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return path, meta
+
+
+def load_dataset(name):
+    """The cached columns of a dataset as {column: float64 array}, plus its import metadata"""
+    path = get_dataset_path(name)
+    if not path.exists():
+        raise DatasetError(
+            f"The {name} dataset is not in the local cache ({path}). Import it once with "
+            f"'python manage.py train_models --download' or '--import-csv {name}=<file.csv>'."
+        )
+    with np.load(path, allow_pickle=False) as archive:
+        columns = {key: archive[key] for key in archive.files if key != '_meta'}
+        meta = json.loads(str(archive['_meta']))
+    missing = [column for column in DATASETS[name]['columns'] if column not in columns]
+    if missing:
+        raise DatasetError(f"{path} is missing columns: {', '.join(missing)}; import it again")
+    return columns, meta
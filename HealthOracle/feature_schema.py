@@ -0,0 +1,191 @@
+import numpy as np
+
+# Display encodings for binary fields, indexed by the field value (0 or 1)
+NO_YES = ('No', 'Yes')
+FEMALE_MALE = ('Female', 'Male')
+
+
+class Field:
+    """A raw input collected from the prediction form.
+
+    ``name`` is the form field, ``feature`` the column name the model was
+    trained with, ``history_key`` the key stored in PredictionHistory.input_data
+    and ``display`` an optional (value 0, value 1) label pair for binary fields.
+    """
+
+    def __init__(self, name, feature, dtype, history_key=None, display=None):
+        self.name = name
+        self.feature = feature
+        self.dtype = dtype
+        self.history_key = history_key or name
+        self.display = display
+
+    def parse(self, raw):
+        return self.dtype(raw)
+
+    def display_value(self, value):
+        """Value as stored in prediction history (binary fields become their label)"""
+        if self.display is None:
+            return value
+        if isinstance(value, str):
+            return self.display[1] if value == '1' else self.display[0]
+        return self.display[1] if value == 1 else self.display[0]
+
+    def decode_history_value(self, value):
+        """Inverse of display_value: the numeric model input for a stored history value"""
+        if self.display is not None and value in self.display:
+            return self.display.index(value)
+        return self.parse(value)
+
+
+class Engineered:
+    """A derived model input computed from columns declared before it"""
+
+    def __init__(self, feature, expression):
+        self.feature = feature
+        self.expression = expression
+
+
+class DiseaseSchema:
+    """Raw fields, engineered features and model input order for one disease model"""
+
+    def __init__(self, name, label, fields, engineered):
+        self.name = name
+        self.label = label
+        self.fields = fields
+        self.engineered = engineered
+        self.field_names = [field.name for field in fields]
+        self.model_inputs = [field.feature for field in fields] + [feature.feature for feature in engineered]
+        self._compile()
+
+    @property
+    def raw_count(self):
+        return len(self.fields)
+
+    def parse_post(self, post):
+        """Typed raw feature list from request.POST; raises on missing or malformed values"""
+        return [field.parse(post.get(field.name)) for field in self.fields]
+
+    def parse_values(self, values):
+        return [field.parse(value) for field, value in zip(self.fields, values)]
+
+    def history_input_data(self, values):
+        """input_data dict for PredictionHistory from raw form strings or parsed values"""
+        return {field.history_key: field.display_value(value) for field, value in zip(self.fields, values)}
+
+    def _compile(self):
+        """Resolve every engineered expression to output column indices once"""
+        positions = {feature: i for i, feature in enumerate(self.model_inputs)}
+        self._raw_positions = [positions[field.feature] for field in self.fields]
+        self._engineered_positions = [(positions[feature.feature], feature.expression) for feature in self.engineered]
+
+    def engineer(self, X, out=None):
+        """(n, raw_count) raw inputs -> (n, len(model_inputs)) model inputs, in model order.
+
+        This is the only feature-engineering code path: training, single-row
+        serving and batch scoring all call it. Columns are written into one
+        preallocated column-major array (or ``out``), and each engineered
+        expression runs once over whole columns, so one row and a million rows
+        do the same work per column with no Python-level row loop.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.raw_count:
+            raise ValueError(f"Expected an (n, {self.raw_count}) array for {self.name}, got {X.shape}")
+        if out is None:
+            out = np.empty((X.shape[0], len(self.model_inputs)), dtype=np.float64, order='F')
+        elif out.shape != (X.shape[0], len(self.model_inputs)):
+            raise ValueError(f"out must have shape {(X.shape[0], len(self.model_inputs))}, got {out.shape}")
+
+        columns = {}
+        for i, (field, position) in enumerate(zip(self.fields, self._raw_positions)):
+            out[:, position] = X[:, i]
+            columns[field.feature] = out[:, position]
+        for (position, expression), feature in zip(self._engineered_positions, self.engineered):
+            out[:, position] = expression(columns)
+            columns[feature.feature] = out[:, position]
+        return out
+
+    def engineer_row(self, values):
+        """Model inputs for one patient's raw values (parsed with the field dtypes)"""
+        return self.engineer([self.parse_values(values)])[0]
+
+
+SCHEMAS = {
+    'heart': DiseaseSchema('heart', 'Heart disease', [
+        Field('age', 'age', int),
+        Field('sex', 'sex', int, display=FEMALE_MALE),
+        Field('cp', 'cp', int, 'chest_pain_type'),
+        Field('trestbps', 'trestbps', int, 'resting_blood_pressure'),
+        Field('chol', 'chol', int, 'cholesterol'),
+        Field('fbs', 'fbs', int, 'fasting_blood_sugar', display=NO_YES),
+        Field('restecg', 'restecg', int, 'resting_ecg'),
+        Field('thalach', 'thalach', int, 'max_heart_rate'),
+        Field('exang', 'exang', int, 'exercise_induced_angina', display=NO_YES),
+        Field('oldpeak', 'oldpeak', float, 'st_depression'),
+        Field('slope', 'slope', int, 'st_slope'),
+        Field('ca', 'ca', int, 'num_major_vessels'),
+        Field('thal', 'thal', int, 'thalassemia'),
+    ], [
+        Engineered('age_sex', lambda c: c['age'] * c['sex']),
+        Engineered('chol_age', lambda c: c['chol'] / c['age']),
+        Engineered('trestbps_chol', lambda c: c['trestbps'] * c['chol'] / 10000),
+        Engineered('exang_oldpeak', lambda c: c['exang'] * c['oldpeak']),
+        Engineered('risk_factors', lambda c: c['fbs'] + c['exang']),
+    ]),
+    'diabetes': DiseaseSchema('diabetes', 'Diabetes', [
+        Field('pregnancies', 'Pregnancies', float),
+        Field('glucose', 'Glucose', float),
+        Field('blood_pressure', 'BloodPressure', float),
+        Field('skin_thickness', 'SkinThickness', float),
+        Field('insulin', 'Insulin', float),
+        Field('bmi', 'BMI', float),
+        Field('diabetes_pedigree', 'DiabetesPedigreeFunction', float),
+        Field('age', 'Age', float),
+    ], [
+        Engineered('Glucose_BMI', lambda c: c['Glucose'] * c['BMI'] / 100),
+        Engineered('Age_BMI', lambda c: c['Age'] * c['BMI'] / 100),
+        Engineered('Glucose_Insulin', lambda c: c['Glucose'] / (c['Insulin'] + 1)),
+        Engineered('Preg_Age', lambda c: c['Pregnancies'] / (c['Age'] + 1)),
+        Engineered('Risk_Score', lambda c: c['Glucose'] / 100 + c['BMI'] / 30 + c['Age'] / 50),
+    ]),
+    'lung': DiseaseSchema('lung', 'Lung disease', [
+        Field('age', 'Age', float),
+        Field('smoking_status', 'Smoking Status', int, display=NO_YES),
+        Field('area_air_quality_index', 'Area Air Quality Index', float),
+        Field('alcohol_consumption', 'Alcohol Consumption', int, display=NO_YES),
+        Field('bmi', 'BMI', float),
+        Field('family_history', 'Family History', int, display=NO_YES),
+        Field('physical_activity_level', 'Physical Activity Level', int),
+        Field('occupation_exposure', 'Occupation Exposure', int, display=NO_YES),
+    ], [
+        Engineered('Age_Smoking', lambda c: c['Age'] * c['Smoking Status'] * 2),
+        Engineered('Smoking_AirQuality', lambda c: c['Smoking Status'] * c['Area Air Quality Index'] / 100),
+        Engineered('BMI_Activity', lambda c: c['BMI'] / (c['Physical Activity Level'] + 1)),
+        Engineered('Risk_Factor_Sum', lambda c: (c['Smoking Status'] * 2 +
+                                                 c['Family History'] * 1.5 +
+                                                 c['Occupation Exposure'] * 1.5 +
+                                                 c['Alcohol Consumption'] * 1)),
+    ]),
+    'liver': DiseaseSchema('liver', 'Liver disease', [
+        Field('age', 'Age', int),
+        Field('gender', 'Gender', int, display=FEMALE_MALE),
+        Field('total_bilirubin', 'Total_Bilirubin', float),
+        Field('direct_bilirubin', 'Direct_Bilirubin', float),
+        Field('alkaline_phosphotase', 'Alkaline_Phosphotase', int),
+        Field('alamine_aminotransferase', 'Alamine_Aminotransferase', int),
+        Field('aspartate_aminotransferase', 'Aspartate_Aminotransferase', int),
+        Field('total_proteins', 'Total_Protiens', float),
+        Field('albumin', 'Albumin', float),
+        Field('albumin_globulin_ratio', 'Albumin_and_Globulin_Ratio', float),
+    ], [
+        Engineered('Age_Gender', lambda c: c['Age'] * c['Gender']),
+        Engineered('Bilirubin_Ratio', lambda c: c['Direct_Bilirubin'] / (c['Total_Bilirubin'] + 0.001)),
+        Engineered('Enzyme_Ratio', lambda c: c['Aspartate_Aminotransferase'] / (c['Alamine_Aminotransferase'] + 0.001)),
+        Engineered('Protein_Ratio', lambda c: c['Albumin'] / (c['Total_Protiens'] + 0.001)),
+        Engineered('Liver_Score', lambda c: (c['Total_Bilirubin'] + c['Direct_Bilirubin']) * c['Enzyme_Ratio']),
+    ]),
+}
+
+
+def get_schema(name):
+    return SCHEMAS[name]
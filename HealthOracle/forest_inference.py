@@ -0,0 +1,109 @@
+import numpy as np
+
+# Names of the flat arrays in a forest bundle, in storage order
+FOREST_ARRAYS = ('feature', 'threshold', 'children', 'missing_left', 'value', 'roots')
+
+
+class FlatForest:
+    """Inference-only copy of a binary RandomForestClassifier as flat NumPy arrays.
+
+    The nodes of all trees are concatenated: ``feature``/``threshold`` hold the
+    split of each node, ``children`` the global indices of its (left, right)
+    children and ``value`` the positive-class probability of the node, ``roots``
+    the first node of every tree. Leaves point to themselves, so a batch is evaluated by
+    stepping every (tree, row) pair down one level at a time for ``max_depth``
+    steps, with no Python loop over rows or trees. Splits compare the input
+    cast to float32 against the float64 thresholds and average the trees in
+    order, as scikit-learn does, so probabilities match ``predict_proba``.
+    """
+
+    precision = 'float32'
+    kind = 'forest'
+
+    def __init__(self, feature, threshold, children, missing_left, value, roots, max_depth, n_features):
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float64)
+        self.children = np.ascontiguousarray(children, dtype=np.int32).reshape(-1, 2)
+        self.missing_left = np.ascontiguousarray(missing_left, dtype=np.bool_)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.roots = np.ascontiguousarray(roots, dtype=np.int32)
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+
+    @property
+    def input_dim(self):
+        return self.n_features
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def node_count(self):
+        return len(self.feature)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in FOREST_ARRAYS)
+
+    def arrays(self):
+        return {name: getattr(self, name) for name in FOREST_ARRAYS}
+
+    def with_precision(self, precision):
+        if precision != 'float32':
+            raise ValueError("Forest models have no reduced-precision mode")
+        return self
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        """Flatten a fitted binary RandomForestClassifier (or ExtraTreesClassifier)"""
+        if len(forest.classes_) != 2:
+            raise ValueError(f"Only binary forests are supported, this one has {len(forest.classes_)} classes")
+        parts = {name: [] for name in FOREST_ARRAYS}
+        offset = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            leaf = tree.children_left < 0
+            parts['feature'].append(np.where(leaf, 0, tree.feature))
+            parts['threshold'].append(np.where(leaf, np.inf, tree.threshold))
+            parts['children'].append(np.column_stack([np.where(leaf, nodes, tree.children_left),
+                                                      np.where(leaf, nodes, tree.children_right)]) + offset)
+            missing_left = getattr(tree, 'missing_go_to_left', None)
+            parts['missing_left'].append(np.zeros(tree.node_count, dtype=np.bool_) if missing_left is None
+                                         else np.asarray(missing_left, dtype=np.bool_) & ~leaf)
+            # Class fractions since scikit-learn 1.4; older versions store weighted counts
+            counts = tree.value[:, 0, :]
+            totals = counts.sum(axis=1)
+            parts['value'].append(counts[:, 1] if np.allclose(totals, 1.0) else counts[:, 1] / totals)
+            parts['roots'].append([offset])
+            offset += tree.node_count
+        max_depth = max(estimator.tree_.max_depth for estimator in forest.estimators_)
+        return cls(*(np.concatenate(parts[name]) for name in FOREST_ARRAYS), max_depth, forest.n_features_in_)
+
+    def predict(self, X, verbose=0, block_rows=4096):
+        """(n, 1) positive-class probabilities, like the networks' ``predict``"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        feature = self.feature.astype(np.intp)
+        children = self.children.ravel()
+        routes_missing = bool(self.missing_left.any())
+        out = np.empty((len(X), 1), dtype=np.float64)
+        for start in range(0, len(X), block_rows):
+            block = X[start:start + block_rows]
+            n = len(block)
+            # Feature-major, so node (tree, row) reads its split value at feature * n + row
+            columns = np.ascontiguousarray(block.T).ravel()
+            rows = np.arange(n)
+            check_missing = routes_missing and bool(np.isnan(columns).any())
+            nodes = np.repeat(self.roots.astype(np.intp)[:, None], n, axis=1)
+            for _ in range(self.max_depth):
+                values = columns[feature[nodes] * n + rows]
+                go_right = ~(values <= self.threshold[nodes])
+                if check_missing:
+                    go_right &= ~(np.isnan(values) & self.missing_left[nodes])
+                nodes = children[2 * nodes + go_right]
+            # Reducing over the tree axis adds one tree at a time, in the order scikit-learn accumulates them
+            out[start:start + block_rows, 0] = self.value[nodes].sum(axis=0) / self.n_trees
+        return out
@@ -0,0 +1,83 @@
+import hmac
+import os
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_POST
+
+from .process_stats import process_rss_bytes
+from .request_timing import collect_metrics, render_metrics
+
+
+def _has_metrics_token(request):
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    return bool(token) and hmac.compare_digest(request.headers.get('Authorization', '').encode(),
+                                               f'Bearer {token}'.encode())
+
+
+@never_cache
+def readiness(request):
+    """Per-worker readiness: 200 once the warm-up models are loaded, 503 before.
+
+    Anonymous callers (the load balancer's health check) only get ``ready``;
+    staff users and requests with ``Authorization: Bearer <METRICS_TOKEN>``
+    also get the worker's models, caches and reload statistics.
+    """
+    # Imported here so URL loading doesn't pull in the model serving stack
+    from .hot_reload import get_reload_stats
+    from .ml_models import get_cascade_stats, get_microbatch_stats, get_prediction_cache_stats, model_registry
+    from .warmup import get_warmup_models, is_ready, warmup_status
+
+    ready = is_ready()
+    if not (_has_metrics_token(request) or request.user.is_staff):
+        return JsonResponse({'ready': ready}, status=200 if ready else 503)
+
+    models = model_registry.status()
+    for name, entry in models.items():
+        entry['warmup'] = warmup_status.get(name, {}).get('state', 'disabled')
+    return JsonResponse({
+        'ready': ready,
+        'pid': os.getpid(),
+        'rss_bytes': process_rss_bytes(),
+        'warmup_models': get_warmup_models(),
+        'models': models,
+        'prediction_cache': get_prediction_cache_stats(),
+        'microbatch': get_microbatch_stats(),
+        'cascade': get_cascade_stats(),
+        'reloads': get_reload_stats(),
+    }, status=200 if ready else 503)
+
+
+@staff_member_required
+@require_POST
+@never_cache
+def reload_models(request):
+    """Reload models from disk in the worker that handles this request.
+
+    POST ``model`` (repeatable) to pick models; the default is every loaded
+    model. Other workers pick changes up through the artifact watcher.
+    """
+    from .hot_reload import reload_model
+    from .ml_models import MODEL_NAMES, model_registry
+
+    names = request.POST.getlist('model') or [name for name in MODEL_NAMES if model_registry.is_loaded(name)]
+    unknown = [name for name in names if name not in MODEL_NAMES]
+    if unknown:
+        return JsonResponse({'error': f"Unknown model: {', '.join(unknown)}"}, status=400)
+    force = request.POST.get('force', '').lower() in ('1', 'true', 'yes')
+    records = [reload_model(name, reason=f'requested by {request.user.username}', force=force) for name in names]
+    failed = any(record['status'] == 'failed' for record in records)
+    return JsonResponse({'pid': os.getpid(), 'reloads': records}, status=500 if failed else 200)
+
+
+@never_cache
+def metrics(request):
+    """Prometheus scrape endpoint for request and stage latency histograms.
+
+    Requires ``Authorization: Bearer <METRICS_TOKEN>`` when METRICS_TOKEN is set.
+    """
+    if getattr(settings, 'METRICS_TOKEN', None) and not _has_metrics_token(request):
+        return HttpResponseForbidden("Forbidden")
+    return HttpResponse(render_metrics(collect_metrics()), content_type='text/plain; version=0.0.4; charset=utf-8')
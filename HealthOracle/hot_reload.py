@@ -0,0 +1,194 @@
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import deque
+
+import numpy as np
+from django.conf import settings
+
+from .feature_schema import SCHEMAS
+from .ml_models import (MODEL_NAMES, artifact_fingerprint, get_cascade_margin, get_served_bundle_path,
+                        load_model_artifacts, model_registry)
+from .model_bundle import read_bundle_header
+from .process_stats import process_rss_bytes
+
+logger = logging.getLogger(__name__)
+
+# Recent reloads in this worker, newest last
+reload_history = deque(maxlen=50)
+# Replaced models that may still be in use by in-flight requests: (weakref, name, version, replaced_at)
+_draining = []
+# Fingerprints whose reload failed; not retried until the files change again
+_rejected = {}
+_reload_lock = threading.Lock()
+_watcher_thread = None
+_watcher_pid = None
+_watcher_lock = threading.Lock()
+
+
+def get_reload_poll_interval():
+    return float(getattr(settings, 'ML_RELOAD_POLL_INTERVAL', 0))
+
+
+def smoke_test(loaded):
+    """Score the scaler's training mean through a newly loaded model before it serves traffic"""
+    schema = SCHEMAS[loaded.name]
+    raw_row = np.asarray(loaded.scaler.mean_[:schema.raw_count], dtype=np.float64).reshape(1, -1)
+    output = loaded.model.predict(loaded.scaler.transform(schema.engineer(raw_row)), verbose=0)
+    probability = float(np.asarray(output).reshape(-1)[0])
+    if not 0.0 <= probability <= 1.0:
+        raise ValueError(f"smoke prediction returned {probability}")
+    return probability
+
+
+def artifact_version(name):
+    """model_version of the bundle on disk, or None for the legacy layout, the Keras backend and cascades"""
+    if get_cascade_margin(name) is not None:
+        # A rebuilt screen leaves the bundle's version unchanged
+        return None
+    path = get_served_bundle_path(name)
+    if path is not None and path.exists():
+        return read_bundle_header(path)['model_version']
+    return None
+
+
+def _release_drained():
+    now = time.time()
+    still_draining = []
+    for ref, name, version, replaced_at in _draining:
+        if ref() is None:
+            for record in reversed(reload_history):
+                if record['model'] == name and record['from_version'] == version and record['drained_seconds'] is None:
+                    record['drained_seconds'] = round(now - replaced_at, 4)
+                    break
+        else:
+            still_draining.append((ref, name, version, replaced_at))
+    _draining[:] = still_draining
+
+
+def reload_model(name, reason='manual', force=False):
+    """Load the current artifacts for ``name`` next to the serving model and swap if they pass a smoke test.
+
+    Returns the reload record. Requests that already hold the previous model
+    finish on it; it is released once the last of them lets go.
+    """
+    with _reload_lock:
+        current = model_registry.peek(name)
+        fingerprint = artifact_fingerprint(name)
+        record = {
+            'model': name,
+            'reason': reason,
+            'at': time.time(),
+            'from_version': current.version if current is not None else None,
+            'to_version': None,
+            'status': None,
+            'load_seconds': None,
+            'smoke_seconds': None,
+            'total_seconds': None,
+            'rss_before': process_rss_bytes(),
+            'rss_after': None,
+            'rss_delta': None,
+            'nbytes_delta': None,
+            'drained_seconds': None,
+            'error': None,
+        }
+        started = time.perf_counter()
+        try:
+            if not force and current is not None:
+                version = artifact_version(name)
+                if version is not None and version == current.version:
+                    # Touched or copied over with identical content
+                    current.fingerprint = fingerprint
+                    record['status'] = 'unchanged'
+                    record['to_version'] = version
+                    return record
+
+            loaded = load_model_artifacts(name)
+            loaded.load_seconds = time.perf_counter() - started
+            record['load_seconds'] = round(loaded.load_seconds, 4)
+            record['to_version'] = loaded.version
+
+            smoke_started = time.perf_counter()
+            smoke_test(loaded)
+            record['smoke_seconds'] = round(time.perf_counter() - smoke_started, 4)
+
+            previous = model_registry.swap(name, loaded)
+            _rejected.pop(name, None)
+            record['status'] = 'swapped'
+            if previous is not None:
+                record['nbytes_delta'] = loaded.nbytes - previous.nbytes
+                _draining.append((weakref.ref(previous), name, previous.version, time.time()))
+                # Only in-flight requests may hold it now
+                del previous
+                current = None
+            logger.info("Reloaded %s model: %s -> %s (%s)", name, record['from_version'], loaded.version, reason,
+                        extra={'model': name, 'model_version': loaded.version})
+        except Exception as e:
+            _rejected[name] = fingerprint
+            record['status'] = 'failed'
+            record['error'] = str(e)
+            logger.exception("Reload of %s model failed, still serving %s", name, record['from_version'],
+                             extra={'model': name})
+        finally:
+            record['total_seconds'] = round(time.perf_counter() - started, 4)
+            if record['status'] != 'unchanged':
+                record['rss_after'] = process_rss_bytes()
+                record['rss_delta'] = record['rss_after'] - record['rss_before']
+                reload_history.append(record)
+            _release_drained()
+    return record
+
+
+def artifacts_changed(name):
+    current = model_registry.peek(name)
+    if current is None:
+        # Not loaded yet; the next get() reads whatever is on disk
+        return False
+    fingerprint = artifact_fingerprint(name)
+    return fingerprint != current.fingerprint and fingerprint != _rejected.get(name)
+
+
+def check_for_updates():
+    """Reload every loaded model whose artifacts changed on disk since it was loaded"""
+    records = []
+    for name in MODEL_NAMES:
+        if artifacts_changed(name):
+            records.append(reload_model(name, reason='artifact changed'))
+    _release_drained()
+    return records
+
+
+def _watch(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            check_for_updates()
+        except Exception:
+            logger.exception("Model reload check failed")
+
+
+def start_reload_watcher():
+    """Poll model artifacts every ML_RELOAD_POLL_INTERVAL seconds (0 disables); one thread per process"""
+    global _watcher_thread, _watcher_pid
+    interval = get_reload_poll_interval()
+    if interval <= 0:
+        return None
+    with _watcher_lock:
+        if _watcher_thread is None or _watcher_pid != os.getpid() or not _watcher_thread.is_alive():
+            _watcher_pid = os.getpid()
+            _watcher_thread = threading.Thread(target=_watch, args=(interval,), name='model-reload', daemon=True)
+            _watcher_thread.start()
+    return _watcher_thread
+
+
+def get_reload_stats():
+    _release_drained()
+    return {
+        'poll_interval': get_reload_poll_interval(),
+        'watching': _watcher_thread is not None and _watcher_thread.is_alive() and _watcher_pid == os.getpid(),
+        'draining': [{'model': name, 'version': version, 'seconds': round(time.time() - replaced_at, 2)}
+                     for _, name, version, replaced_at in _draining],
+        'recent': list(reload_history)[-10:],
+    }
@@ -0,0 +1,139 @@
+import json
+import os
+import sys
+import time
+import warnings
+from datetime import datetime, timezone
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from HealthOracle.forest_inference import FlatForest
+from HealthOracle.management.commands.bench_models import git_commit, percentiles_us
+from HealthOracle.management.commands.check_forest_parity import load_forest
+from HealthOracle.ml_models import BASE_DIR, MODEL_NAMES
+from HealthOracle.numpy_inference import DenseNetwork
+from HealthOracle.process_stats import process_rss_bytes
+
+
+def sklearn_tree_bytes(forest):
+    """Node and value arrays held by the trees of a fitted forest (Python object overhead not included)"""
+    total = 0
+    for estimator in forest.estimators_:
+        state = estimator.tree_.__getstate__()
+        total += state['nodes'].nbytes + state['values'].nbytes
+    return total
+
+
+def time_backend(predict, rows, batch, iterations, min_batch_time):
+    """Single-row latency percentiles and median whole-batch throughput of a ``predict(X)`` callable"""
+    predict(rows[:1])
+    timings = []
+    for i in range(iterations):
+        row = rows[i % len(rows)][None, :]
+        started = time.perf_counter()
+        predict(row)
+        timings.append(time.perf_counter() - started)
+    per_batch = []
+    deadline = time.perf_counter() + min_batch_time
+    while time.perf_counter() < deadline or len(per_batch) < 3:
+        started = time.perf_counter()
+        predict(batch)
+        per_batch.append(time.perf_counter() - started)
+    return {
+        'single_row': percentiles_us(timings),
+        'batch_size': len(batch),
+        'batch_rows_per_s': round(len(batch) / float(np.median(per_batch)), 1),
+    }
+
+
+class Command(BaseCommand):
+    help = ("Compare the RandomForest models as pickled scikit-learn objects and as flat NumPy arrays against the "
+            "Keras networks (and their NumPy serving copies): single-row latency, batch throughput and memory")
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', choices=MODEL_NAMES,
+                            help="Models to compare (default: every model with a <model>_model.pkl)")
+        parser.add_argument('--source-dir', default=str(BASE_DIR), help="Directory holding the .pkl/.h5 files")
+        parser.add_argument('--iterations', type=int, default=200, help="Single-row predictions per backend")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--min-batch-time', type=float, default=0.5)
+        parser.add_argument('--no-keras', action='store_true', help="Skip the Keras models (and TensorFlow)")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help="JSON file (default: bench_results/forest-<time>-<commit>.json)")
+
+    def handle(self, *args, **options):
+        source_dir = options['source_dir']
+        names = options['models'] or [name for name in MODEL_NAMES
+                                      if os.path.exists(os.path.join(source_dir, f'{name}_model.pkl'))]
+        rng = np.random.default_rng(options['seed'])
+        timing = (options['iterations'], options['min_batch_time'])
+        results = {}
+
+        for name in names:
+            forest, _ = load_forest(name, source_dir)
+            flat = FlatForest.from_sklearn(forest)
+            network = DenseNetwork.from_h5(os.path.join(source_dir, f'{name}_model.h5'))
+
+            # Standardised inputs: every model here consumes scaled features
+            forest_rows = rng.normal(size=(max(options['batch_size'], 1000), flat.input_dim))
+            network_rows = rng.normal(size=(max(options['batch_size'], 1000), network.input_dim))
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                results[name] = {
+                    'sklearn_forest': dict(time_backend(lambda X: forest.predict_proba(X),
+                                                        forest_rows, forest_rows[:options['batch_size']], *timing),
+                                           memory_bytes=sklearn_tree_bytes(forest),
+                                           file_bytes=os.path.getsize(os.path.join(source_dir, f'{name}_model.pkl'))),
+                    'flat_forest': dict(time_backend(flat.predict, forest_rows,
+                                                     forest_rows[:options['batch_size']], *timing),
+                                        memory_bytes=flat.nbytes),
+                    'numpy_network': dict(time_backend(network.predict, network_rows,
+                                                       network_rows[:options['batch_size']], *timing),
+                                          memory_bytes=network.nbytes),
+                }
+            del forest
+
+        if not options['no_keras']:
+            # Last, so TensorFlow's import and thread pools don't disturb the numbers above
+            rss_before = process_rss_bytes()
+            import tensorflow as tf
+            for name in names:
+                model = tf.keras.models.load_model(os.path.join(source_dir, f'{name}_model.h5'), compile=False)
+                rows = rng.normal(size=(max(options['batch_size'], 1000), model.input_shape[1])).astype(np.float32)
+                results[name]['keras'] = dict(
+                    time_backend(lambda X: model.predict(X, verbose=0), rows, rows[:options['batch_size']], *timing),
+                    memory_bytes=int(sum(weight.nbytes for weight in model.get_weights())),
+                    process_rss_delta_bytes=process_rss_bytes() - rss_before,
+                )
+
+        commit = git_commit()
+        output = options['output'] or os.path.join(
+            BASE_DIR, 'bench_results',
+            f"forest-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}-{(commit or 'nocommit')[:10]}.json",
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump({
+                'meta': {
+                    'created': datetime.now(timezone.utc).isoformat(),
+                    'commit': commit,
+                    'python': sys.version.split()[0],
+                    'numpy': np.__version__,
+                    'iterations': options['iterations'],
+                    'batch_size': options['batch_size'],
+                },
+                'models': results,
+            }, f, indent=2)
+
+        self.stdout.write(f"{'model':<9} {'backend':<15} {'p50 us':>9} {'p99 us':>9} {'rows/s':>11} {'memory':>10}")
+        for name, backends in results.items():
+            for backend, result in backends.items():
+                memory = f"{result['memory_bytes'] / 1024:.0f} KB"
+                if 'process_rss_delta_bytes' in result:
+                    memory += f" (+{result['process_rss_delta_bytes'] / 2**20:.0f} MB RSS with TensorFlow)"
+                self.stdout.write(
+                    f"{name:<9} {backend:<15} {result['single_row']['p50_us']:>9.1f} "
+                    f"{result['single_row']['p99_us']:>9.1f} {result['batch_rows_per_s']:>11,.0f} {memory:>10}"
+                )
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
@@ -0,0 +1,233 @@
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from HealthOracle import ml_models
+from HealthOracle.ml_models import BASE_DIR, model_registry, predict_batch, prediction_cache
+from HealthOracle.process_stats import process_rss_bytes
+from HealthOracle.reference_data import reference_inputs
+
+PREDICTORS = {
+    'heart': ml_models.predict_heart_disease,
+    'lung': ml_models.predict_lung_disease,
+    'liver': ml_models.predict_liver_disease,
+    'diabetes': ml_models.predict_diabetes,
+}
+
+DEFAULT_BATCH_SIZES = [1, 8, 32, 128, 1024, 8192]
+
+# Runs in a fresh interpreter so nothing is imported or loaded yet
+COLD_START_SCRIPT = '''
+import json, os, resource, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+setup_done = time.perf_counter()
+from HealthOracle import ml_models
+imported = time.perf_counter()
+from HealthOracle.process_stats import process_rss_bytes
+name = sys.argv[1]
+loaded = ml_models.model_registry.get(name)
+load_done = time.perf_counter()
+row = loaded.scaler.mean_[:ml_models.SCHEMAS[name].raw_count].reshape(1, -1)
+ml_models.predict_batch(name, row)
+first_done = time.perf_counter()
+# stderr, so log lines written to stdout by the logging thread can't interleave
+sys.stderr.write('@@result ' + json.dumps({
+    'django_setup_s': setup_done - started,
+    'import_s': imported - setup_done,
+    'load_s': load_done - imported,
+    'first_predict_s': first_done - load_done,
+    'total_s': first_done - started,
+    'rss_bytes': process_rss_bytes(),
+    'peak_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+}) + '\\n')
+'''
+
+
+def percentiles_us(seconds):
+    values = np.asarray(seconds) * 1e6
+    return {
+        'n': int(values.size),
+        'mean_us': round(float(values.mean()), 2),
+        'min_us': round(float(values.min()), 2),
+        'p50_us': round(float(np.percentile(values, 50)), 2),
+        'p95_us': round(float(np.percentile(values, 95)), 2),
+        'p99_us': round(float(np.percentile(values, 99)), 2),
+        'max_us': round(float(values.max()), 2),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BASE_DIR, capture_output=True, text=True,
+                              timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = "Benchmark cold load, warm single-row latency and batch throughput of the disease models; writes JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', choices=sorted(PREDICTORS), help="Models to benchmark (default: all)")
+        parser.add_argument('--cold-runs', type=int, default=3, help="Fresh processes per model for cold start")
+        parser.add_argument('--iterations', type=int, default=2000, help="Warm single-row predictions per model")
+        parser.add_argument('--warmup', type=int, default=50)
+        parser.add_argument('--batch-sizes', type=int, nargs='+', default=DEFAULT_BATCH_SIZES)
+        parser.add_argument('--min-batch-time', type=float, default=0.25,
+                            help="Keep repeating each batch size for at least this many seconds")
+        parser.add_argument('--with-cache', action='store_true',
+                            help="Leave the prediction cache on (default: off, so every call runs the model)")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help="JSON file (default: bench_results/<time>-<commit>.json)")
+        parser.add_argument('--compare', help="Earlier JSON result to print changes against")
+
+    def handle(self, *args, **options):
+        names = options['models'] or sorted(PREDICTORS)
+        commit = git_commit()
+        results = {
+            'meta': {
+                'created': datetime.now(timezone.utc).isoformat(),
+                'commit': commit,
+                'python': sys.version.split()[0],
+                'numpy': np.__version__,
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'prediction_cache': bool(options['with_cache']),
+                'microbatching': ml_models.microbatching_enabled(),
+                'model_precision': getattr(settings, 'ML_MODEL_PRECISION', ''),
+                'model_backend': getattr(settings, 'ML_MODEL_BACKEND', ''),
+                'iterations': options['iterations'],
+            },
+            'models': {},
+        }
+
+        saved_cache_size = prediction_cache.maxsize
+        if not options['with_cache']:
+            prediction_cache.maxsize = 0
+        try:
+            for name in names:
+                self.stdout.write(f"Benchmarking {name}...")
+                results['models'][name] = {
+                    'cold': self.bench_cold(name, options['cold_runs']),
+                    **self.bench_warm(name, options),
+                }
+        finally:
+            prediction_cache.maxsize = saved_cache_size
+
+        results['meta']['peak_rss_bytes'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        results['meta']['rss_bytes'] = process_rss_bytes()
+
+        output = options['output'] or os.path.join(
+            BASE_DIR, 'bench_results',
+            f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}-{(commit or 'nocommit')[:10]}.json",
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+        self.print_summary(results)
+        if options['compare']:
+            self.print_comparison(results, options['compare'])
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
+
+    def bench_cold(self, name, runs):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'HealthOracle.settings'))
+        samples = []
+        for _ in range(max(1, runs)):
+            completed = subprocess.run(
+                [sys.executable, '-c', COLD_START_SCRIPT, name],
+                cwd=BASE_DIR, env=env, capture_output=True, text=True,
+            )
+            if completed.returncode != 0:
+                raise CommandError(f"Cold start of {name} failed:\n{completed.stderr[-2000:]}")
+            samples.append(json.loads(next(line for line in completed.stderr.splitlines()
+                                           if line.startswith('@@result '))[len('@@result '):]))
+        summary = {key: round(float(np.median([sample[key] for sample in samples])), 4)
+                   for key in samples[0] if key.endswith('_s')}
+        summary.update({key: int(np.median([sample[key] for sample in samples]))
+                        for key in samples[0] if key.endswith('_bytes')})
+        summary['runs'] = samples
+        return summary
+
+    def bench_warm(self, name, options):
+        predictor = PREDICTORS[name]
+        loaded = model_registry.get(name)
+        X = reference_inputs(name, loaded.scaler, max(options['iterations'], max(options['batch_sizes'])),
+                             options['seed'], include_history=False)
+        rows = [row.tolist() for row in X[:options['iterations']]]
+
+        for row in rows[:options['warmup']]:
+            predictor(row)
+        timings = []
+        for row in rows:
+            started = time.perf_counter()
+            predictor(row)
+            timings.append(time.perf_counter() - started)
+
+        batches = []
+        for batch_size in options['batch_sizes']:
+            batch = X[np.arange(batch_size) % len(X)]
+            predict_batch(name, batch)
+            per_batch = []
+            deadline = time.perf_counter() + options['min_batch_time']
+            while time.perf_counter() < deadline or len(per_batch) < 3:
+                started = time.perf_counter()
+                predict_batch(name, batch)
+                per_batch.append(time.perf_counter() - started)
+            median = float(np.median(per_batch))
+            batches.append({
+                'batch_size': batch_size,
+                'repeats': len(per_batch),
+                'median_ms': round(median * 1e3, 4),
+                'rows_per_s': round(batch_size / median, 1),
+            })
+
+        return {
+            'version': loaded.version,
+            'backend': loaded.backend,
+            'precision': loaded.precision,
+            'single_row': percentiles_us(timings),
+            'batch': batches,
+        }
+
+    def print_summary(self, results):
+        self.stdout.write(f"\n{'model':<9} {'cold s':>7} {'load s':>7} {'peak MB':>8} "
+                          f"{'p50 us':>8} {'p95 us':>8} {'p99 us':>8}  throughput (rows/s by batch size)")
+        for name, result in results['models'].items():
+            cold, single = result['cold'], result['single_row']
+            throughput = '  '.join(f"{b['batch_size']}:{b['rows_per_s']:,.0f}" for b in result['batch'])
+            self.stdout.write(
+                f"{name:<9} {cold['total_s']:>7.2f} {cold['load_s']:>7.3f} {cold['peak_rss_bytes'] / 2**20:>8.1f} "
+                f"{single['p50_us']:>8.1f} {single['p95_us']:>8.1f} {single['p99_us']:>8.1f}  {throughput}"
+            )
+
+    def print_comparison(self, results, baseline_path):
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        self.stdout.write(f"\nChange against {baseline_path} (commit {baseline['meta'].get('commit')}), new/old:")
+        for name, result in results['models'].items():
+            old = baseline['models'].get(name)
+            if old is None:
+                continue
+            ratios = {
+                'cold': result['cold']['total_s'] / old['cold']['total_s'],
+                'peak_rss': result['cold']['peak_rss_bytes'] / old['cold']['peak_rss_bytes'],
+                'p50': result['single_row']['p50_us'] / old['single_row']['p50_us'],
+                'p99': result['single_row']['p99_us'] / old['single_row']['p99_us'],
+            }
+            old_batches = {b['batch_size']: b for b in old['batch']}
+            for b in result['batch']:
+                if b['batch_size'] in old_batches:
+                    ratios[f"rows/s@{b['batch_size']}"] = b['rows_per_s'] / old_batches[b['batch_size']]['rows_per_s']
+            self.stdout.write(f"{name:<9} " + '  '.join(f"{key} {value:.2f}x" for key, value in ratios.items()))
@@ -0,0 +1,120 @@
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from HealthOracle.management.commands.bench_models import git_commit
+from HealthOracle.ml_models import BASE_DIR, oversample_minority
+
+# ILPD and Pima sizes, then synthetic tables up to millions of generated rows
+DEFAULT_SIZES = [583, 768, 10000, 100000, 1000000, 2000000]
+
+
+def make_table(rows, features, minority_fraction, max_minority, seed):
+    rng = np.random.default_rng(seed)
+    minority = max(6, min(int(rows * minority_fraction), max_minority))
+    X = rng.normal(size=(rows, features))
+    X[:minority] += 0.5
+    y = np.zeros(rows, dtype=np.int64)
+    y[:minority] = 1
+    order = rng.permutation(rows)
+    return X[order], y[order]
+
+
+def run_traced(function, *args, **kwargs):
+    """(result, seconds, peak traced bytes) of one call"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    seconds = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+class Command(BaseCommand):
+    help = ("Benchmark the NumPy SMOTE oversampler from Pima/ILPD-sized tables up to millions of synthetic rows: "
+            "time, generated rows/s and peak memory, next to imbalanced-learn's SMOTE where it is installed")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Table sizes in rows")
+        parser.add_argument('--features', type=int, default=15)
+        parser.add_argument('--minority-fraction', type=float, default=0.3)
+        parser.add_argument('--max-minority', type=int, default=20000,
+                            help="Cap on minority rows; neighbour search is quadratic in them, generation is not")
+        parser.add_argument('--k-neighbors', type=int, default=5)
+        parser.add_argument('--chunk-mb', type=float, default=64, help="Distance-matrix block size")
+        parser.add_argument('--reference-max-rows', type=int, default=100000,
+                            help="Largest table also run through imbalanced-learn (0 disables)")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help="JSON file (default: bench_results/oversampler-<time>-<commit>.json)")
+
+    def handle(self, *args, **options):
+        try:
+            from imblearn.over_sampling import SMOTE
+        except ImportError:
+            SMOTE = None
+        chunk_bytes = int(options['chunk_mb'] * 2**20)
+        k = options['k_neighbors']
+
+        header = (f"{'rows':>9} {'minority':>8} {'new rows':>9} {'seconds':>8} {'new rows/s':>11} {'peak MB':>8} "
+                  f"{'imblearn s':>10} {'peak MB':>8} {'speedup':>7} {'same':>5}")
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        results = []
+        for rows in options['sizes']:
+            X, y = make_table(rows, options['features'], options['minority_fraction'], options['max_minority'],
+                              options['seed'])
+            (X_resampled, _), seconds, peak = run_traced(oversample_minority, X, y, k_neighbors=k,
+                                                         seed=options['seed'], chunk_bytes=chunk_bytes)
+            generated = len(X_resampled) - rows
+            result = {
+                'rows': rows,
+                'minority_rows': int(y.sum()),
+                'generated_rows': generated,
+                'seconds': round(seconds, 4),
+                'generated_rows_per_s': round(generated / seconds, 1),
+                'peak_bytes': peak,
+            }
+            line = (f"{rows:>9} {result['minority_rows']:>8} {generated:>9} {seconds:>8.3f} "
+                    f"{result['generated_rows_per_s']:>11,.0f} {peak / 2**20:>8.1f}")
+            if SMOTE is not None and rows <= options['reference_max_rows']:
+                (reference, _), reference_seconds, reference_peak = run_traced(
+                    SMOTE(k_neighbors=k, random_state=options['seed']).fit_resample, X, y)
+                result.update({
+                    'reference_seconds': round(reference_seconds, 4),
+                    'reference_peak_bytes': reference_peak,
+                    'identical': bool(np.array_equal(reference, X_resampled)),
+                })
+                line += (f" {reference_seconds:>10.3f} {reference_peak / 2**20:>8.1f} "
+                         f"{reference_seconds / seconds:>6.2f}x {'yes' if result['identical'] else 'NO':>5}")
+            self.stdout.write(line)
+            results.append(result)
+            del X, y, X_resampled
+
+        commit = git_commit()
+        output = options['output'] or os.path.join(
+            BASE_DIR, 'bench_results',
+            f"oversampler-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}-{(commit or 'nocommit')[:10]}.json",
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump({
+                'meta': {
+                    'created': datetime.now(timezone.utc).isoformat(),
+                    'commit': commit,
+                    'python': sys.version.split()[0],
+                    'numpy': np.__version__,
+                    'features': options['features'],
+                    'k_neighbors': k,
+                    'chunk_mb': options['chunk_mb'],
+                    'seed': options['seed'],
+                },
+                'results': results,
+            }, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
@@ -0,0 +1,185 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from HealthOracle.management.commands.bench_models import git_commit
+from HealthOracle.ml_models import BASE_DIR, MODEL_NAMES
+
+# Never needed to boot Django and route a request
+DEFAULT_FORBIDDEN = ['sklearn', 'tensorflow', 'keras', 'joblib', 'h5py', 'scipy', 'pandas']
+
+BOOT_PATHS = ['/', '/about/', '/login/']
+
+# Runs under `python -X importtime`; the markers split the import log into phases
+STARTUP_SCRIPT = '''
+import json, resource, sys, time
+from HealthOracle.process_stats import process_rss_bytes
+started = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+resolver = get_resolver()
+for path in sys.argv[2:]:
+    resolver.resolve(path)
+boot_done = time.perf_counter()
+boot_rss = process_rss_bytes()
+boot_modules = sorted({name.split('.')[0] for name in sys.modules})
+sys.stderr.write('@@phase first_predict\\n')
+name = sys.argv[1]
+from HealthOracle import predictors
+from HealthOracle.ml_models import SCHEMAS, model_registry
+row = model_registry.get(name).scaler.mean_[:SCHEMAS[name].raw_count].reshape(1, -1)
+predictors.predict_batch(name, row)
+predict_done = time.perf_counter()
+# stderr, so log lines written to stdout by the logging thread can't interleave
+sys.stderr.write('@@result ' + json.dumps({
+    'boot_s': boot_done - started,
+    'first_predict_s': predict_done - boot_done,
+    'boot_rss_bytes': boot_rss,
+    'rss_bytes': process_rss_bytes(),
+    'peak_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    'boot_modules': boot_modules,
+}) + '\\n')
+'''
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def parse_importtime(stderr):
+    """Per-phase import records from -X importtime output: [(module, self_us, cumulative_us, depth)]"""
+    phases = {'boot': []}
+    current = phases['boot']
+    for line in stderr.splitlines():
+        if line.startswith('@@phase '):
+            current = phases.setdefault(line.split()[1], [])
+            continue
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            current.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return phases
+
+
+def summarise_imports(records, top):
+    packages = {}
+    for module, self_us, _, _ in records:
+        package = module.split('.')[0]
+        packages[package] = packages.get(package, 0) + self_us
+    roots = sorted((r for r in records if r[3] == 0), key=lambda r: r[2], reverse=True)
+    return {
+        'total_import_s': round(sum(r[1] for r in records) / 1e6, 4),
+        'modules': len(records),
+        'by_package_s': {package: round(us / 1e6, 4)
+                         for package, us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]},
+        'slowest_s': {module: round(cumulative_us / 1e6, 4) for module, _, cumulative_us, _ in roots[:top]},
+    }
+
+
+class Command(BaseCommand):
+    help = ("Benchmark process startup with python -X importtime: Django boot and URL routing, then the first "
+            "prediction; reports import time per package and RSS, and fails if boot imports the ML training stack")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help="Fresh processes to measure (medians are reported)")
+        parser.add_argument('--model', choices=MODEL_NAMES, default='heart', help="Model for the first-prediction phase")
+        parser.add_argument('--top', type=int, default=10, help="Packages and imports to list")
+        parser.add_argument('--forbid', default=','.join(DEFAULT_FORBIDDEN),
+                            help="Comma-separated packages that must not be imported at boot ('' to disable)")
+        parser.add_argument('--output', help="JSON file (default: bench_results/startup-<time>-<commit>.json)")
+        parser.add_argument('--compare', help="Earlier bench_startup JSON to print changes against")
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'HealthOracle.settings'))
+        runs = []
+        for i in range(max(1, options['runs'])):
+            completed = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT, options['model'], *BOOT_PATHS],
+                cwd=BASE_DIR, env=env, capture_output=True, text=True,
+            )
+            if completed.returncode != 0:
+                raise CommandError(f"Startup run failed:\n{completed.stderr[-3000:]}")
+            result = json.loads(next(line for line in completed.stderr.splitlines()
+                                     if line.startswith('@@result '))[len('@@result '):])
+            result['imports'] = {phase: summarise_imports(records, options['top'])
+                                 for phase, records in parse_importtime(completed.stderr).items()}
+            runs.append(result)
+            self.stdout.write(f"run {i + 1}: boot {result['boot_s']:.3f}s, first predict {result['first_predict_s']:.3f}s")
+
+        median = lambda values: float(np.median(values))  # noqa: E731
+        commit = git_commit()
+        summary = {
+            'boot_s': round(median([r['boot_s'] for r in runs]), 4),
+            'boot_import_s': round(median([r['imports']['boot']['total_import_s'] for r in runs]), 4),
+            'boot_rss_bytes': int(median([r['boot_rss_bytes'] for r in runs])),
+            'first_predict_s': round(median([r['first_predict_s'] for r in runs]), 4),
+            'first_predict_import_s': round(median([r['imports'].get('first_predict', {}).get('total_import_s', 0.0)
+                                                    for r in runs]), 4),
+            'rss_bytes': int(median([r['rss_bytes'] for r in runs])),
+            'peak_rss_bytes': int(median([r['peak_rss_bytes'] for r in runs])),
+        }
+        results = {
+            'meta': {
+                'created': datetime.now(timezone.utc).isoformat(),
+                'commit': commit,
+                'python': sys.version.split()[0],
+                'model': options['model'],
+                'boot_paths': BOOT_PATHS,
+            },
+            'summary': summary,
+            # The last run's import breakdown; the totals above are medians
+            'imports': runs[-1]['imports'],
+            'boot_modules': runs[-1]['boot_modules'],
+            'runs': [{key: value for key, value in run.items() if key not in ('imports', 'boot_modules')}
+                     for run in runs],
+        }
+
+        output = options['output'] or os.path.join(
+            BASE_DIR, 'bench_results',
+            f"startup-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}-{(commit or 'nocommit')[:10]}.json",
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+        self.print_summary(results)
+        if options['compare']:
+            self.print_comparison(summary, options['compare'])
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
+
+        forbidden = [name.strip() for name in options['forbid'].split(',') if name.strip()]
+        loaded = sorted(set(forbidden) & set(results['boot_modules']))
+        if loaded:
+            raise CommandError(f"Booting Django imported {', '.join(loaded)}; keep these behind the lazy ML imports")
+
+    def print_summary(self, results):
+        summary = results['summary']
+        self.stdout.write(
+            f"\nboot (django.setup + routing {', '.join(BOOT_PATHS)}): {summary['boot_s']:.3f}s, "
+            f"imports {summary['boot_import_s']:.3f}s (incl. interpreter startup), RSS {summary['boot_rss_bytes'] / 2**20:.1f} MB"
+        )
+        self.stdout.write(
+            f"first {results['meta']['model']} prediction: {summary['first_predict_s']:.3f}s "
+            f"({summary['first_predict_import_s']:.3f}s imports), RSS {summary['rss_bytes'] / 2**20:.1f} MB, "
+            f"peak {summary['peak_rss_bytes'] / 2**20:.1f} MB"
+        )
+        for phase, imports in results['imports'].items():
+            self.stdout.write(f"\n{phase}: {imports['modules']} modules; import time by package:")
+            for package, seconds in imports['by_package_s'].items():
+                self.stdout.write(f"  {package:<28} {seconds * 1000:>8.1f} ms")
+
+    def print_comparison(self, summary, baseline_path):
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        self.stdout.write(f"\nChange against {baseline_path} (commit {baseline['meta'].get('commit')}), new/old:")
+        ratios = []
+        for key, value in summary.items():
+            old = baseline['summary'].get(key)
+            if old:
+                ratios.append(f"{key} {value / old:.2f}x")
+        self.stdout.write('  '.join(ratios))
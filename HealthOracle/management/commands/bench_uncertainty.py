@@ -0,0 +1,124 @@
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from HealthOracle.management.commands.bench_models import git_commit
+from HealthOracle.ml_models import BASE_DIR, MODEL_NAMES, get_backend
+from HealthOracle.numpy_inference import mc_dropout_samples
+from HealthOracle.reference_data import scaled_reference_rows
+
+DEFAULT_SAMPLES = [1, 2, 5, 10, 20, 50, 100, 200]
+
+
+def median_seconds(function, min_time, min_repeats=3):
+    function()
+    timings = []
+    deadline = time.perf_counter() + min_time
+    while time.perf_counter() < deadline or len(timings) < min_repeats:
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings))
+
+
+def growth_exponent(samples, seconds):
+    """Slope of log(time) against log(T): 1 is linear growth, below 1 sub-linear"""
+    return round(float(np.polyfit(np.log(samples), np.log(seconds), 1)[0]), 3)
+
+
+class Command(BaseCommand):
+    help = ("Benchmark Monte Carlo dropout uncertainty: T dropout passes as one tiled T x k batch against T separate "
+            "forward passes, for growing T; reports time per request and how it scales with T")
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', choices=MODEL_NAMES, help="Models to benchmark (default: all)")
+        parser.add_argument('--samples', type=int, nargs='+', default=DEFAULT_SAMPLES, help="Values of T")
+        parser.add_argument('--rows', type=int, nargs='+', default=[1, 100], help="Rows per request (k)")
+        parser.add_argument('--min-time', type=float, default=0.2, help="Seconds to repeat each measurement")
+        parser.add_argument('--keras', action='store_true',
+                            help="Also time the .h5 networks in TensorFlow (one tiled call vs T calls)")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help="JSON file (default: bench_results/uncertainty-<time>-<commit>.json)")
+
+    def handle(self, *args, **options):
+        samples_list = sorted(set(options['samples']))
+        min_time = options['min_time']
+        rng = np.random.default_rng(options['seed'])
+        results = {}
+        self.stdout.write(f"{'model':<9} {'engine':<6} {'k':>5} {'T':>5} {'tiled ms':>9} {'naive ms':>9} {'speedup':>8}")
+        for name in options['models'] or MODEL_NAMES:
+            backend = get_backend(name, 'numpy').load()
+            network = backend.network
+            if not network.has_dropout:
+                raise CommandError(f"The {name} bundle has no dropout rates; rebuild it with 'manage.py build_model_bundles'")
+            rows = scaled_reference_rows(name, backend.scaler, max(options['rows']), options['seed'])
+            results[name] = {'numpy': self.bench_engine(
+                name, 'numpy', rows, options['rows'], samples_list, min_time,
+                tiled=lambda X, T: network.predict_samples(X, T, rng),
+                # The naive way: one stochastic forward pass per sample
+                naive=lambda X, T: np.stack([mc_dropout_samples(network, X, 1, rng)[0] for _ in range(T)]),
+            )}
+
+        if options['keras']:
+            # Last, so TensorFlow's import and thread pools don't disturb the numbers above
+            for name in results:
+                keras = get_backend(name, 'keras').load()
+                model = keras.keras_model
+                rows = scaled_reference_rows(name, keras.scaler, max(options['rows']), options['seed']).astype(np.float32)
+                results[name]['keras'] = self.bench_engine(
+                    name, 'keras', rows, options['rows'], samples_list, min_time,
+                    tiled=lambda X, T: keras.predict_proba_samples(X, T, None),
+                    # model.predict never applies dropout, so the naive loop calls the model in training mode
+                    naive=lambda X, T: np.stack([np.asarray(model(X, training=True)) for _ in range(T)]),
+                )
+
+        commit = git_commit()
+        output = options['output'] or os.path.join(
+            BASE_DIR, 'bench_results',
+            f"uncertainty-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}-{(commit or 'nocommit')[:10]}.json",
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump({
+                'meta': {
+                    'created': datetime.now(timezone.utc).isoformat(),
+                    'commit': commit,
+                    'python': sys.version.split()[0],
+                    'numpy': np.__version__,
+                    'samples': samples_list,
+                    'rows': options['rows'],
+                },
+                'models': results,
+            }, f, indent=2)
+
+        self.stdout.write("\nGrowth exponent of time in T (1.0 = linear):")
+        for name, engines in results.items():
+            for engine, by_rows in engines.items():
+                for k, result in by_rows.items():
+                    self.stdout.write(f"  {name:<9} {engine:<6} k={k:<5} tiled {result['tiled_exponent']:.2f}  "
+                                      f"naive {result['naive_exponent']:.2f}")
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
+
+    def bench_engine(self, name, engine, rows, row_counts, samples_list, min_time, tiled, naive):
+        by_rows = {}
+        for k in row_counts:
+            X = rows[:k]
+            points = []
+            for T in samples_list:
+                tiled_s = median_seconds(lambda: tiled(X, T), min_time)
+                naive_s = median_seconds(lambda: naive(X, T), min_time)
+                points.append({'samples': T, 'tiled_ms': round(tiled_s * 1e3, 4), 'naive_ms': round(naive_s * 1e3, 4),
+                               'speedup': round(naive_s / tiled_s, 2)})
+                self.stdout.write(f"{name:<9} {engine:<6} {k:>5} {T:>5} {tiled_s * 1e3:>9.3f} {naive_s * 1e3:>9.3f} "
+                                  f"{naive_s / tiled_s:>7.1f}x")
+            by_rows[k] = {
+                'points': points,
+                'tiled_exponent': growth_exponent(samples_list, [point['tiled_ms'] for point in points]),
+                'naive_exponent': growth_exponent(samples_list, [point['naive_ms'] for point in points]),
+            }
+        return by_rows
@@ -0,0 +1,74 @@
+import math
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from HealthOracle.cascade import agreement_report, distil_logistic, smallest_safe_margin
+from HealthOracle.ml_models import MODEL_NAMES, calibrate_predictions, get_backend, get_bundle_dir
+from HealthOracle.reference_data import scaled_reference_rows
+
+REPORT_MARGINS = [0, 5, 10, 15, 20, 25, 30]
+
+
+def risk_percentages(model, X_scaled, calibration):
+    return np.round(calibrate_predictions(model.predict_proba_batch(X_scaled), calibration) * 100, 2)
+
+
+class Command(BaseCommand):
+    help = ("Distil a logistic screening model from each served model for cascade inference and measure the "
+            "margin around the 30 %/60 % thresholds it needs to never change a risk category")
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', choices=MODEL_NAMES, help="Models to distil (default: all)")
+        parser.add_argument('--samples', type=int, default=20000, help="Reference rows the screen is fitted on")
+        parser.add_argument('--calibration-samples', type=int, default=50000,
+                            help="Held-out reference rows the margin is measured on")
+        parser.add_argument('--pad', type=float, default=1.0,
+                            help="Percentage points added to the measured margin before rounding up")
+        parser.add_argument('--l2', type=float, default=1e-4)
+        parser.add_argument('--seed', type=int, default=42,
+                            help="Seed of the fitting rows; the held-out rows use seed + 1")
+        parser.add_argument('--output-dir', default=None, help="Directory for <model>-cascade.json (default: ML_BUNDLE_DIR)")
+
+    def handle(self, *args, **options):
+        output_dir = options['output_dir'] or get_bundle_dir()
+        os.makedirs(output_dir, exist_ok=True)
+        self.stdout.write(f"{'model':<9} {'backend':<7} {'fit rows':>8} {'held out':>8} {'safe':>6} "
+                          f"{'margin':>6} {'screened':>8}")
+        for name in options['models'] or MODEL_NAMES:
+            try:
+                full = get_backend(name).load()
+            except Exception as e:
+                raise CommandError(f"Could not load the {name} model: {e}") from e
+
+            X_fit = scaled_reference_rows(name, full.scaler, options['samples'], options['seed'])
+            screen = distil_logistic(X_fit, full.predict_proba_batch(X_fit), l2=options['l2'])
+
+            X_held_out = scaled_reference_rows(name, full.scaler, options['calibration_samples'], options['seed'] + 1)
+            screen_risk = risk_percentages(screen, X_held_out, full.calibration)
+            full_risk = risk_percentages(full, X_held_out, full.calibration)
+            safe_margin = smallest_safe_margin(screen_risk, full_risk)
+            margin = float(math.ceil(safe_margin + options['pad']))
+
+            screen.name = name
+            screen.distilled_from = full.version
+            screen.margin = margin
+            report = agreement_report(screen_risk, full_risk, sorted(set(REPORT_MARGINS + [margin])))
+            path = os.path.join(output_dir, f'{name}-cascade.json')
+            screen.save(
+                path,
+                created=datetime.now(timezone.utc).isoformat(),
+                backend=full.kind,
+                fit_rows=len(X_fit),
+                held_out_rows=len(X_held_out),
+                seed=options['seed'],
+                safe_margin=round(safe_margin, 2),
+                report=report,
+            )
+            screened = next(entry for entry in report if entry['margin'] == margin)['short_circuit_rate']
+            self.stdout.write(f"{name:<9} {full.kind:<7} {len(X_fit):>8} {len(X_held_out):>8} {safe_margin:>6.2f} "
+                              f"{margin:>6.1f} {screened:>8.1%}  -> {path}")
+
+        self.stdout.write(self.style.SUCCESS("Cascade screens written; enable them with ML_CASCADE_MARGIN=auto"))
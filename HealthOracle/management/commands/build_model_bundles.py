@@ -0,0 +1,58 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from HealthOracle.ml_models import (
+    BASE_DIR, MODEL_NAMES, build_bundle_from_artifacts, build_forest_bundle_from_pickle, get_bundle_dir,
+)
+from HealthOracle.model_bundle import BundleError
+from HealthOracle.numpy_inference import PRECISIONS
+
+
+class Command(BaseCommand):
+    help = "Convert *_model.h5, *_scaler.pkl and *_model_features.pkl into single-file model bundles"
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', choices=MODEL_NAMES, help="Models to convert (default: all)")
+        parser.add_argument('--source-dir', default=str(BASE_DIR), help="Directory holding the legacy artifacts")
+        parser.add_argument('--output-dir', default=None, help="Bundle directory (default: ML_BUNDLE_DIR)")
+        parser.add_argument('--precision', choices=PRECISIONS, default='float32',
+                            help="Store the network weights at this precision (default: float32)")
+        parser.add_argument('--forest', action='store_true',
+                            help="Flatten the RandomForest <model>_model.pkl files into <model>-forest.bundle instead")
+
+    def handle(self, *args, **options):
+        source_dir = options['source_dir']
+        output_dir = options['output_dir'] or get_bundle_dir()
+
+        if options['forest']:
+            return self.build_forests(options['models'], source_dir, output_dir)
+
+        for name in options['models'] or MODEL_NAMES:
+            path = f'{output_dir}/{name}.bundle'
+            try:
+                header = build_bundle_from_artifacts(name, source_dir, path, precision=options['precision'])
+            except (OSError, KeyError, ValueError) as e:
+                raise CommandError(f"Could not read the {name} artifacts: {e}") from e
+            self.stdout.write(f"{name:<9} -> {path}  version {header['model_version']}  {options['precision']}")
+
+        self.stdout.write(self.style.SUCCESS("Model bundles written"))
+
+    def build_forests(self, names, source_dir, output_dir):
+        # By default every model with a <name>_model.pkl; ones that don't fit the current schema are skipped
+        requested = bool(names)
+        names = names or [name for name in MODEL_NAMES if os.path.exists(os.path.join(source_dir, f'{name}_model.pkl'))]
+        for name in names:
+            path = f'{output_dir}/{name}-forest.bundle'
+            try:
+                header = build_forest_bundle_from_pickle(name, source_dir, path)
+            except (OSError, KeyError, ValueError, BundleError) as e:
+                if requested:
+                    raise CommandError(f"Could not flatten the {name} forest: {e}") from e
+                self.stderr.write(f"{name:<9} skipped: {e}")
+                continue
+            forest = header['forest']
+            self.stdout.write(f"{name:<9} -> {path}  version {header['model_version']}  "
+                              f"{forest['n_trees']} trees, {forest['node_count']} nodes, depth {forest['max_depth']}")
+
+        self.stdout.write(self.style.SUCCESS("Forest bundles written"))
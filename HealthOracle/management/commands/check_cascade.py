@@ -0,0 +1,76 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from HealthOracle.cascade import CascadeStats, LogisticScreen, agreement_report, flip_mask
+from HealthOracle.management.commands.build_cascade_models import REPORT_MARGINS, risk_percentages
+from HealthOracle.ml_models import MODEL_NAMES, CascadeBackend, get_backend, get_cascade_margin, get_cascade_path
+from HealthOracle.reference_data import scaled_reference_rows
+
+
+class Command(BaseCommand):
+    help = ("Agreement report for cascade inference on a fresh reference set: per margin, the share of rows the "
+            "screen answers and how many change risk category against the full model. Fails if any row changes "
+            "category at the margin that would be served")
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', choices=MODEL_NAMES,
+                            help="Models to check (default: every model with a cascade screen)")
+        parser.add_argument('--samples', type=int, default=20000)
+        parser.add_argument('--seed', type=int, default=7,
+                            help="Reference set seed; keep it apart from the seeds the screens were built with")
+        parser.add_argument('--margins', type=float, nargs='+', default=REPORT_MARGINS,
+                            help="Extra margins to report on")
+        parser.add_argument('--output', help="Also write the report as JSON to this file")
+
+    def handle(self, *args, **options):
+        names = options['models'] or [name for name in MODEL_NAMES if get_cascade_path(name).exists()]
+        if not names:
+            raise CommandError("No cascade screens found; run 'manage.py build_cascade_models' first")
+        failed = []
+        results = {}
+        for name in names:
+            path = get_cascade_path(name)
+            if not path.exists():
+                raise CommandError(f"{path} does not exist; run 'manage.py build_cascade_models {name}'")
+            full = get_backend(name).load()
+            screen = LogisticScreen.load(path)
+            if screen.distilled_from != full.version:
+                self.stdout.write(f"{name}: screen was distilled from {screen.distilled_from}, the served model is "
+                                  f"{full.version}; rebuild it")
+                failed.append(name)
+                continue
+            margin = get_cascade_margin(name)
+            if margin in (None, 'auto'):
+                margin = screen.margin
+
+            X = scaled_reference_rows(name, full.scaler, options['samples'], options['seed'])
+            screen_risk = risk_percentages(screen, X, full.calibration)
+            full_risk = risk_percentages(full, X, full.calibration)
+            report = agreement_report(screen_risk, full_risk, sorted(set(options['margins']) | {margin}))
+
+            # End to end: the served cascade against the full model, row by row
+            cascade = CascadeBackend(full, screen, margin, CascadeStats())
+            cascade_risk = risk_percentages(cascade, X, full.calibration)
+            flips = int(flip_mask(cascade_risk, full_risk).sum())
+            stats = cascade.stats.stats()
+            results[name] = {'margin': margin, 'flips': flips, 'cascade': stats, 'report': report}
+
+            self.stdout.write(f"\n{name} ({full.kind}, {len(X)} rows, serving margin {margin:g}): "
+                              f"{stats['short_circuit_rate']:.1%} answered by the screen, {flips} category flips")
+            self.stdout.write(f"  {'margin':>6} {'screened':>8} {'flips':>6} {'max dRisk':>9}")
+            for entry in report:
+                marker = '  <- served' if entry['margin'] == margin else ''
+                self.stdout.write(f"  {entry['margin']:>6g} {entry['short_circuit_rate']:>8.1%} {entry['flips']:>6} "
+                                  f"{entry['max_risk_delta']:>9.2f}{marker}")
+            if flips:
+                failed.append(name)
+
+        if options['output']:
+            os.makedirs(os.path.dirname(os.path.abspath(options['output'])), exist_ok=True)
+            with open(options['output'], 'w') as f:
+                json.dump({'seed': options['seed'], 'samples': options['samples'], 'models': results}, f, indent=2)
+        if failed:
+            raise CommandError(f"The cascade changes risk categories for: {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS("No risk category changes within the cascade margins"))
@@ -0,0 +1,107 @@
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from HealthOracle.feature_schema import SCHEMAS
+from HealthOracle.ml_models import engineer_training_features
+
+# The engineered features as the training scripts originally wrote them,
+# column by column, kept here as an independent reference for the schema
+REFERENCE = {
+    'heart': lambda d: [
+        d['age'] * d['sex'],
+        d['chol'] / d['age'],
+        d['trestbps'] * d['chol'] / 10000,
+        d['exang'] * d['oldpeak'],
+        d['fbs'] + d['exang'],
+    ],
+    'diabetes': lambda d: [
+        d['Glucose'] * d['BMI'] / 100,
+        d['Age'] * d['BMI'] / 100,
+        d['Glucose'] / (d['Insulin'] + 1),
+        d['Pregnancies'] / (d['Age'] + 1),
+        d['Glucose'] / 100 + d['BMI'] / 30 + d['Age'] / 50,
+    ],
+    'lung': lambda d: [
+        d['Age'] * d['Smoking Status'] * 2,
+        d['Smoking Status'] * d['Area Air Quality Index'] / 100,
+        d['BMI'] / (d['Physical Activity Level'] + 1),
+        (d['Smoking Status'] * 2 +
+         d['Family History'] * 1.5 +
+         d['Occupation Exposure'] * 1.5 +
+         d['Alcohol Consumption'] * 1),
+    ],
+    'liver': lambda d: [
+        d['Age'] * d['Gender'],
+        d['Direct_Bilirubin'] / (d['Total_Bilirubin'] + 0.001),
+        d['Aspartate_Aminotransferase'] / (d['Alamine_Aminotransferase'] + 0.001),
+        d['Albumin'] / (d['Total_Protiens'] + 0.001),
+        (d['Total_Bilirubin'] + d['Direct_Bilirubin']) *
+        (d['Aspartate_Aminotransferase'] / (d['Alamine_Aminotransferase'] + 0.001)),
+    ],
+}
+
+
+def random_raw_rows(schema, n, rng):
+    """Raw inputs that survive the form's int()/float() parsing unchanged"""
+    columns = []
+    for field in schema.fields:
+        if field.display is not None:
+            columns.append(rng.integers(0, 2, n).astype(np.float64))
+        elif field.dtype is int:
+            columns.append(rng.integers(1, 300, n).astype(np.float64))
+        else:
+            columns.append(rng.uniform(0.1, 300.0, n))
+    return np.column_stack(columns)
+
+
+def same_bits(a, b):
+    a = np.ascontiguousarray(a, dtype=np.float64)
+    b = np.ascontiguousarray(b, dtype=np.float64)
+    return a.shape == b.shape and np.array_equal(a.view(np.uint64), b.view(np.uint64))
+
+
+class Command(BaseCommand):
+    help = "Check that training, single-row serving and batch scoring build bit-identical feature matrices"
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', choices=sorted(SCHEMAS), help="Models to check (default: all)")
+        parser.add_argument('--samples', type=int, default=2000)
+        parser.add_argument('--chunk-size', type=int, default=256)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        failed = []
+        for name in options['models'] or sorted(SCHEMAS):
+            schema = SCHEMAS[name]
+            raw = random_raw_rows(schema, options['samples'], rng)
+            table = {field.feature: raw[:, i] for i, field in enumerate(schema.fields)}
+
+            training, features = engineer_training_features(name, table)
+            serving = np.stack([schema.engineer_row(row.tolist()) for row in raw])
+            batch = schema.engineer(raw)
+
+            # Chunked scoring into a caller-owned buffer must match a single call
+            chunked = np.empty_like(batch, order='C')
+            step = max(1, options['chunk_size'])
+            for start in range(0, len(raw), step):
+                schema.engineer(raw[start:start + step], out=chunked[start:start + step])
+
+            reference = np.column_stack([raw] + REFERENCE[name](table))
+
+            results = {
+                'feature order': features == schema.model_inputs,
+                'serving': same_bits(training, serving),
+                'batch': same_bits(training, batch),
+                'chunked': same_bits(training, chunked),
+                'reference': same_bits(training, reference),
+            }
+            status = 'OK' if all(results.values()) else 'FAIL'
+            if status == 'FAIL':
+                failed.append(name)
+            detail = '  '.join(f"{check}={'ok' if passed else 'MISMATCH'}" for check, passed in results.items())
+            self.stdout.write(f"{name:<9} {training.shape[0]} rows x {training.shape[1]} features  {detail}  {status}")
+
+        if failed:
+            raise CommandError(f"Feature parity failed for: {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS("Training and serving features are bit-identical"))
@@ -0,0 +1,97 @@
+import os
+import tempfile
+import warnings
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from HealthOracle.feature_schema import SCHEMAS
+from HealthOracle.forest_inference import FlatForest
+from HealthOracle.ml_models import BASE_DIR, MODEL_NAMES, build_forest_bundle_from_pickle
+from HealthOracle.model_bundle import BundleError, ModelBundle
+from HealthOracle.reference_data import reference_inputs
+
+
+def load_forest(name, source_dir):
+    import joblib
+    with warnings.catch_warnings():
+        # The pickles were written by an older scikit-learn; the check below is what vouches for them
+        warnings.simplefilter('ignore')
+        forest = joblib.load(os.path.join(source_dir, f'{name}_model.pkl'))
+        scaler = joblib.load(os.path.join(source_dir, f'{name}_scaler.pkl'))
+    return forest, scaler
+
+
+def parity_inputs(name, forest, scaler, samples, seed):
+    """Scaled reference rows when the forest fits the current schema, plus random rows with some NaNs"""
+    parts = []
+    if forest.n_features_in_ == len(SCHEMAS[name].model_inputs):
+        X = reference_inputs(name, scaler, samples, seed)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            features = SCHEMAS[name].engineer(X)
+        parts.append(scaler.transform(features[np.isfinite(features).all(axis=1)]))
+    rng = np.random.default_rng(seed)
+    random_rows = rng.normal(scale=1.5, size=(samples, forest.n_features_in_))
+    random_rows[rng.random(random_rows.shape) < 0.02] = np.nan
+    parts.append(random_rows)
+    return np.concatenate(parts, axis=0)
+
+
+class Command(BaseCommand):
+    help = ("Check that the flattened RandomForest models (FlatForest and <model>-forest.bundle) return exactly "
+            "the probabilities of scikit-learn's predict_proba on the pickled forests")
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', choices=MODEL_NAMES,
+                            help="Models to check (default: every model with a <model>_model.pkl)")
+        parser.add_argument('--source-dir', default=str(BASE_DIR), help="Directory holding the .pkl files")
+        parser.add_argument('--samples', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--max-delta', type=float, default=0.0,
+                            help="Largest allowed probability difference (default: exact)")
+
+    def handle(self, *args, **options):
+        source_dir = options['source_dir']
+        names = options['models'] or [name for name in MODEL_NAMES
+                                      if os.path.exists(os.path.join(source_dir, f'{name}_model.pkl'))]
+        failed = []
+        header = (f"{'model':<9} {'rows':>6} {'trees':>5} {'nodes':>6} {'depth':>5} "
+                  f"{'max |dP|':>9} {'exact':>7} {'bundle':>9}  notes")
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+
+        for name in names:
+            forest, scaler = load_forest(name, source_dir)
+            flat = FlatForest.from_sklearn(forest)
+            X = parity_inputs(name, forest, scaler, options['samples'], options['seed'])
+            expected = forest.predict_proba(X)[:, 1]
+            actual = flat.predict(X)[:, 0]
+            delta = np.abs(actual - expected)
+
+            notes = ''
+            bundle_delta = '-'
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, f'{name}-forest.bundle')
+                try:
+                    with warnings.catch_warnings():
+                        warnings.simplefilter('ignore')
+                        build_forest_bundle_from_pickle(name, source_dir, path)
+                except BundleError as e:
+                    notes = f"not servable with the current schema: {e}"
+                else:
+                    bundle = ModelBundle.load(path)
+                    bundle_max = float(np.abs(bundle.network.predict(X)[:, 0] - expected).max())
+                    bundle_delta = f"{bundle_max:.1e}"
+                    delta = np.maximum(delta, bundle_max)
+                    del bundle
+
+            self.stdout.write(
+                f"{name:<9} {len(X):>6} {flat.n_trees:>5} {flat.node_count:>6} {flat.max_depth:>5} "
+                f"{delta.max():>9.1e} {np.mean(actual == expected):>7.2%} {bundle_delta:>9}  {notes}"
+            )
+            if delta.max() > options['max_delta']:
+                failed.append(name)
+
+        if failed:
+            raise CommandError(f"Flattened forest probabilities differ from predict_proba for: {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS("Flattened forests match predict_proba"))
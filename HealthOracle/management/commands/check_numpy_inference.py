@@ -0,0 +1,51 @@
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from HealthOracle.numpy_inference import DenseNetwork
+
+MODEL_FILES = {
+    'heart': 'heart_model.h5',
+    'lung': 'lung_model.h5',
+    'liver': 'liver_model.h5',
+    'diabetes': 'diabetes_model.h5',
+}
+
+
+class Command(BaseCommand):
+    help = "Compare the NumPy inference engine against Keras on random scaled inputs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', choices=sorted(MODEL_FILES), help="Models to check (default: all)")
+        parser.add_argument('--samples', type=int, default=1000)
+        parser.add_argument('--tolerance', type=float, default=1e-5)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        try:
+            from tensorflow.keras.models import load_model
+        except ImportError as e:
+            raise CommandError("TensorFlow is required to run the Keras side of this check") from e
+
+        rng = np.random.default_rng(options['seed'])
+        failed = []
+        for name in options['models'] or sorted(MODEL_FILES):
+            path = MODEL_FILES[name]
+            network = DenseNetwork.from_h5(path)
+            keras_model = load_model(path, compile=False)
+
+            # Inputs are standard-scaled, so N(0, 1) with some wide tails covers the useful range
+            X = rng.standard_normal((options['samples'], network.input_dim)).astype(np.float32)
+            X[:options['samples'] // 10] *= 5
+
+            expected = keras_model.predict(X, verbose=0)
+            actual = network.predict(X)
+            max_diff = float(np.max(np.abs(expected - actual)))
+
+            status = 'OK' if max_diff <= options['tolerance'] else 'FAIL'
+            if status == 'FAIL':
+                failed.append(name)
+            self.stdout.write(f"{name:<9} max |keras - numpy| = {max_diff:.3e}  {status}")
+
+        if failed:
+            raise CommandError(f"Parity check failed for: {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS("NumPy inference matches Keras"))
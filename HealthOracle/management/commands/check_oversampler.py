@@ -0,0 +1,126 @@
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from HealthOracle.datasets import DatasetError
+from HealthOracle.ml_models import MODEL_NAMES, TRAINING_DATA, nearest_neighbors, oversample_minority
+
+
+def check_datasets(names, seed):
+    """(label, scaled X, y) for each cached training table, plus a synthetic Gaussian one"""
+    from sklearn.preprocessing import StandardScaler
+
+    datasets = []
+    for name in names:
+        try:
+            X, y, _ = TRAINING_DATA[name](seed)
+        except DatasetError as e:
+            datasets.append((name, None, str(e)))
+            continue
+        datasets.append((name, StandardScaler().fit_transform(X), y))
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(5000, 15))
+    y = (X[:, 0] + rng.normal(scale=2.0, size=len(X)) > 2.0).astype(int)
+    datasets.append(('synthetic', X, y))
+    return datasets
+
+
+def segment_positions(X_class, neighbors, synthetic):
+    """For each synthetic row, its distance to the closest segment x -> (one of x's k neighbours), and its position t on it"""
+    bases = np.repeat(X_class, neighbors.shape[1], axis=0)
+    directions = X_class[neighbors.ravel()] - bases
+    lengths = np.einsum('ij,ij->i', directions, directions)
+    usable = lengths > 0
+    bases, directions, lengths = bases[usable], directions[usable], lengths[usable]
+    residuals = np.empty(len(synthetic))
+    positions = np.empty(len(synthetic))
+    for i, row in enumerate(synthetic):
+        offsets = row - bases
+        t = np.clip(np.einsum('ij,ij->i', offsets, directions) / lengths, 0.0, 1.0)
+        distances = np.linalg.norm(offsets - t[:, None] * directions, axis=1)
+        best = np.argmin(distances)
+        residuals[i] = distances[best]
+        positions[i] = t[best]
+    return residuals, positions
+
+
+class Command(BaseCommand):
+    help = ("Check the NumPy SMOTE oversampler: synthetic rows must lie on segments between k-nearest minority "
+            "neighbours at uniform positions, match imbalanced-learn's SMOTE for the same seed when it is installed, "
+            "and be distributed like its output for an independent seed")
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', choices=MODEL_NAMES, help="Training tables to use (default: all)")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--k-neighbors', type=int, default=5)
+        parser.add_argument('--sample', type=int, default=500, help="Synthetic rows checked geometrically per table")
+        parser.add_argument('--alpha', type=float, default=0.01, help="Significance level of the KS tests")
+
+    def handle(self, *args, **options):
+        from scipy import stats
+        try:
+            from imblearn.over_sampling import SMOTE
+        except ImportError:
+            SMOTE = None
+            self.stdout.write("imbalanced-learn is not installed; skipping the comparison against its SMOTE")
+
+        seed = options['seed']
+        k = options['k_neighbors']
+        alpha = options['alpha']
+        failed = []
+        header = (f"{'table':<10} {'rows':>6} {'new':>6} {'max resid':>10} {'KS t~U p':>9} "
+                  f"{'same seed':>10} {'min KS p':>9}")
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+
+        for label, X, y in check_datasets(options['models'] or MODEL_NAMES, seed):
+            if X is None:
+                self.stdout.write(f"{label:<10} skipped: {y}")
+                continue
+            X_resampled, y_resampled = oversample_minority(X, y, k_neighbors=k, seed=seed)
+            classes, counts = np.unique(y, return_counts=True)
+            minority = classes[np.argmin(counts)]
+            synthetic = X_resampled[len(X):]
+            problems = []
+            if not np.array_equal(X_resampled[:len(X)], X) or not np.all(y_resampled[len(y):] == minority):
+                problems.append("original rows or synthetic labels changed")
+            if np.ptp(np.unique(y_resampled, return_counts=True)[1]) != 0:
+                problems.append("classes are not balanced")
+
+            # Geometry: every synthetic row sits on a segment to one of its base row's k nearest neighbours,
+            # at a position t drawn from U[0, 1). Mutual neighbours give the same segment in both directions
+            # (t and 1 - t), so test the folded position 2 * min(t, 1 - t), which is U[0, 1) too.
+            X_class = X[y == minority]
+            rng = np.random.default_rng(seed)
+            checked = synthetic[rng.choice(len(synthetic), min(options['sample'], len(synthetic)), replace=False)]
+            residuals, positions = segment_positions(X_class, nearest_neighbors(X_class, k), checked)
+            uniform_p = stats.kstest(2 * np.minimum(positions, 1 - positions), 'uniform').pvalue
+            if residuals.max() > 1e-9:
+                problems.append(f"a synthetic row is {residuals.max():.2e} off every neighbour segment")
+            if uniform_p < alpha:
+                problems.append(f"interpolation positions are not uniform (KS p={uniform_p:.4f})")
+
+            same_seed = '-'
+            min_ks_p = float('nan')
+            if SMOTE is not None:
+                reference, _ = SMOTE(k_neighbors=k, random_state=seed).fit_resample(X, y)
+                same_seed = 'identical' if np.array_equal(reference, X_resampled) else 'DIFFERENT'
+                if same_seed != 'identical':
+                    problems.append("output differs from imbalanced-learn's SMOTE with the same seed")
+                # Independent draws: per-feature two-sample KS with a Bonferroni correction
+                independent, _ = SMOTE(k_neighbors=k, random_state=seed + 1).fit_resample(X, y)
+                independent = independent[len(X):]
+                min_ks_p = min(stats.ks_2samp(synthetic[:, j], independent[:, j]).pvalue
+                               for j in range(X.shape[1]))
+                if min_ks_p < alpha / X.shape[1]:
+                    problems.append(f"a feature's distribution differs from SMOTE's (KS p={min_ks_p:.4g})")
+
+            self.stdout.write(f"{label:<10} {len(X):>6} {len(synthetic):>6} {residuals.max():>10.1e} "
+                              f"{uniform_p:>9.3f} {same_seed:>10} {min_ks_p:>9.3f}")
+            for problem in problems:
+                self.stdout.write(f"{'':<10} {problem}")
+            if problems:
+                failed.append(label)
+
+        if failed:
+            raise CommandError(f"Oversampler check failed for: {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS("Oversampled rows behave like SMOTE"))
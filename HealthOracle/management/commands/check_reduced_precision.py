@@ -0,0 +1,167 @@
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from HealthOracle.feature_schema import SCHEMAS
+from HealthOracle.ml_models import (
+    BASE_DIR,
+    DEFAULT_CALIBRATION,
+    RISK_CATEGORIES,
+    calibrate_predictions,
+    get_bundle_path,
+    get_precision_record_path,
+    get_risk_category_codes,
+)
+from HealthOracle.model_bundle import ModelBundle
+from HealthOracle.numpy_inference import PRECISIONS, DenseNetwork
+from HealthOracle.reference_data import reference_inputs
+
+
+# Risks are served rounded to 0.01 points; a category flip within that is rounding, not a change
+ROUNDING = 0.01
+
+
+def load_full_precision(name):
+    """The float32 network, scaler, calibration and model version the reduced modes are compared against"""
+    path = get_bundle_path(name)
+    if path.exists():
+        bundle = ModelBundle.load(path)
+        if bundle.precision != 'float32':
+            raise CommandError(f"{path} is stored as {bundle.precision}; rebuild it at float32 to compare against")
+        return bundle.network, bundle.scaler, bundle.calibration, bundle.version
+    import joblib
+    return (DenseNetwork.from_h5(BASE_DIR / f'{name}_model.h5'),
+            joblib.load(BASE_DIR / f'{name}_scaler.pkl'),
+            DEFAULT_CALIBRATION,
+            None)
+
+
+def record_parity(name, version, rows, results):
+    """Merge ``results`` into <model>-precision.json, which apply_model_precision reads at load time"""
+    path = get_precision_record_path(name)
+    record = {}
+    if path.exists():
+        with open(path) as f:
+            record = json.load(f)
+    if record.get('model_version') != version:
+        record = {'name': name, 'model_version': version, 'precisions': {}}
+    record['created'] = datetime.now(timezone.utc).isoformat()
+    record['rows'] = rows
+    record['precisions'].update(results)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(record, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def risk_percentages(network, scaled, calibration):
+    return np.round(calibrate_predictions(network.predict(scaled)[:, 0], calibration) * 100, 2)
+
+
+def median_latency(network, row, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        network.predict(row)
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings))
+
+
+def batch_throughput(network, scaled, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        network.predict(scaled)
+    return len(scaled) * repeat / (time.perf_counter() - started)
+
+
+class Command(BaseCommand):
+    help = ("Compare float16 / int8 weights against float32 on a reference input set: risk deltas, category flips, "
+            "memory, latency. With --record the results are stored next to the bundle, and serving refuses a "
+            "precision recorded outside tolerance")
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', choices=sorted(SCHEMAS), help="Models to check (default: all)")
+        parser.add_argument('--precisions', nargs='+', choices=PRECISIONS[1:], default=['float16'])
+        parser.add_argument('--samples', type=int, default=5000, help="Synthetic rows added to the saved history rows")
+        parser.add_argument('--no-history', action='store_true', help="Use synthetic rows only")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--repeat', type=int, default=200, help="Timing repetitions")
+        parser.add_argument('--max-delta', type=float, default=1.0,
+                            help="Fail if any risk percentage moves by more than this many points")
+        parser.add_argument('--max-flips', type=int, default=0,
+                            help="Fail if more rows than this change risk category by more than rounding")
+        parser.add_argument('--record', action='store_true',
+                            help="Write the results to <model>-precision.json in ML_BUNDLE_DIR")
+
+    def handle(self, *args, **options):
+        failed = []
+        header = (f"{'model':<9} {'precision':<9} {'weights':>9} {'ratio':>6} {'max dRisk':>9} "
+                  f"{'mean dRisk':>10} {'flips':>11} {'1-row p50':>10} {'batch rows/s':>13}")
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+
+        for name in options['models'] or sorted(SCHEMAS):
+            network, scaler, calibration, version = load_full_precision(name)
+            X = reference_inputs(name, scaler, options['samples'], options['seed'], not options['no_history'])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                features = SCHEMAS[name].engineer(X)
+            features = features[np.isfinite(features).all(axis=1)]
+            scaled = scaler.transform(features).astype(np.float32)
+
+            reference = risk_percentages(network, scaled, calibration)
+            reference_codes = get_risk_category_codes(reference)
+            batch_repeat = max(1, options['repeat'] // 20)
+            self.stdout.write(
+                f"{name:<9} {'float32':<9} {network.nbytes:>9} {1.0:>6.2f} {0.0:>9.2f} {0.0:>10.3f} {'-':>11} "
+                f"{median_latency(network, scaled[:1], options['repeat']) * 1e6:>8.1f}us "
+                f"{batch_throughput(network, scaled, batch_repeat):>13,.0f}"
+            )
+
+            results = {}
+            for precision in options['precisions']:
+                reduced = network.with_precision(precision)
+                risk = risk_percentages(reduced, scaled, calibration)
+                delta = np.abs(risk - reference)
+                codes = get_risk_category_codes(risk)
+                flipped = np.flatnonzero(codes != reference_codes)
+                real_flips = int((delta[flipped] > ROUNDING + 1e-9).sum())
+                within_tolerance = bool(delta.max() <= options['max_delta'] and real_flips <= options['max_flips'])
+                results[precision] = {
+                    'max_delta': round(float(delta.max()), 2),
+                    'mean_delta': round(float(delta.mean()), 4),
+                    'flips': real_flips,
+                    'rounding_flips': int(flipped.size) - real_flips,
+                    'max_delta_tolerance': options['max_delta'],
+                    'max_flips_tolerance': options['max_flips'],
+                    'within_tolerance': within_tolerance,
+                }
+
+                self.stdout.write(
+                    f"{'':<9} {precision:<9} {reduced.nbytes:>9} {reduced.nbytes / network.nbytes:>6.2f} "
+                    f"{delta.max():>9.2f} {delta.mean():>10.3f} {f'{flipped.size}/{len(risk)}':>11} "
+                    f"{median_latency(reduced, scaled[:1], options['repeat']) * 1e6:>8.1f}us "
+                    f"{batch_throughput(reduced, scaled, batch_repeat):>13,.0f}"
+                )
+                for row in flipped[:5]:
+                    self.stdout.write(
+                        f"{'':<19} flip row {row}: {reference[row]:.2f}% {RISK_CATEGORIES[reference_codes[row]]} -> "
+                        f"{risk[row]:.2f}% {RISK_CATEGORIES[codes[row]]}"
+                    )
+                if not within_tolerance:
+                    failed.append(f"{name}/{precision}")
+
+            if options['record']:
+                if version is None:
+                    self.stdout.write(f"{'':<19} not recorded: {name} is served from the legacy .h5 files")
+                else:
+                    self.stdout.write(f"{'':<19} recorded in {record_parity(name, version, len(scaled), results)}")
+
+        if failed:
+            raise CommandError(f"Risk moved by more than {options['max_delta']} points or changed category in more "
+                               f"than {options['max_flips']} rows for: {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS("Reduced-precision risks are within tolerance"))
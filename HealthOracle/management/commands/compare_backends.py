@@ -0,0 +1,171 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from HealthOracle.datasets import DatasetError
+from HealthOracle.feature_schema import SCHEMAS
+from HealthOracle.management.commands.bench_forest import time_backend
+from HealthOracle.management.commands.bench_models import git_commit
+from HealthOracle.ml_models import (BASE_DIR, MODEL_BACKENDS, MODEL_NAMES, TRAINING_DATA, calibrate_predictions,
+                                    get_backend, get_risk_category_codes)
+from HealthOracle.process_stats import process_rss_bytes
+from HealthOracle.reference_data import reference_inputs
+
+
+def auc(y, scores):
+    """ROC AUC as the Mann-Whitney statistic, ties counted half"""
+    from scipy.stats import rankdata
+    y = np.asarray(y).astype(bool)
+    positives = int(y.sum())
+    negatives = len(y) - positives
+    if not positives or not negatives:
+        return None
+    ranks = rankdata(scores)
+    return float((ranks[y].sum() - positives * (positives + 1) / 2) / (positives * negatives))
+
+
+def measure_backend(name, kind, samples, iterations, batch_size, min_batch_time, seed):
+    """Load one backend in this (fresh) process and measure it; returns a JSON-serialisable dict"""
+    rss_before = process_rss_bytes()
+    started = time.perf_counter()
+    backend = get_backend(name, kind).load()
+    load_seconds = time.perf_counter() - started
+    rss_loaded = process_rss_bytes()
+
+    X = reference_inputs(name, backend.scaler, samples, seed)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        features = SCHEMAS[name].engineer(X)
+    rows = backend.scaler.transform(features[np.isfinite(features).all(axis=1)])
+    result = dict(time_backend(backend.predict_proba_batch, rows, rows[:batch_size], iterations, min_batch_time))
+    result.update({
+        'version': backend.version,
+        'source': backend.source,
+        'load_seconds': round(load_seconds, 4),
+        'memory_footprint_bytes': backend.memory_footprint(),
+        'load_rss_delta_bytes': rss_loaded - rss_before,
+        'rss_bytes': process_rss_bytes(),
+        'reference_probabilities': backend.predict_proba_batch(rows).tolist(),
+    })
+
+    try:
+        X_labelled, y, _ = TRAINING_DATA[name](seed)
+    except DatasetError as e:
+        result['auc'] = None
+        result['auc_note'] = str(e)
+    else:
+        # The held-out rows of train_model_with_improvements' split; the rest were fitted on
+        from sklearn.model_selection import train_test_split
+        _, X_test, _, y_test = train_test_split(X_labelled, y, test_size=0.2, random_state=seed, stratify=y)
+        result['auc'] = auc(y_test, backend.predict_proba_batch(backend.scaler.transform(X_test)))
+        result['held_out_rows'] = len(y_test)
+    return result
+
+
+class Command(BaseCommand):
+    help = ("Compare the serving backends (NumPy network, Keras .h5 network, flattened RandomForest) of each model: "
+            "load time, single-row latency, batch throughput, memory, RSS and held-out AUC, plus agreement with the "
+            "NumPy backend. Each backend is measured in its own process, so one library's footprint doesn't hide "
+            "another's")
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', choices=MODEL_NAMES, help="Models to compare (default: all)")
+        parser.add_argument('--backends', nargs='+', choices=list(MODEL_BACKENDS), default=list(MODEL_BACKENDS))
+        parser.add_argument('--samples', type=int, default=2000, help="Reference rows for latency and agreement")
+        parser.add_argument('--iterations', type=int, default=200, help="Single-row predictions per backend")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--min-batch-time', type=float, default=0.5)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help="JSON file (default: bench_results/backends-<time>-<commit>.json)")
+        parser.add_argument('--child', action='store_true', help="Internal: measure one model and backend and exit")
+
+    def handle(self, *args, **options):
+        measure_options = (options['samples'], options['iterations'], options['batch_size'],
+                           options['min_batch_time'], options['seed'])
+        if options['child']:
+            name, = options['models']
+            kind, = options['backends']
+            # stderr, so log lines written to stdout by the logging thread can't interleave
+            sys.stderr.write('@@result ' + json.dumps(measure_backend(name, kind, *measure_options)) + '\n')
+            return
+
+        results = {}
+        for name in options['models'] or MODEL_NAMES:
+            results[name] = {}
+            for kind in options['backends']:
+                results[name][kind] = self.run_child(name, kind, options)
+            self.add_agreement(results[name])
+
+        commit = git_commit()
+        output = options['output'] or os.path.join(
+            BASE_DIR, 'bench_results',
+            f"backends-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}-{(commit or 'nocommit')[:10]}.json",
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump({
+                'meta': {
+                    'created': datetime.now(timezone.utc).isoformat(),
+                    'commit': commit,
+                    'python': sys.version.split()[0],
+                    'numpy': np.__version__,
+                    'samples': options['samples'],
+                    'iterations': options['iterations'],
+                    'batch_size': options['batch_size'],
+                    'seed': options['seed'],
+                },
+                'models': results,
+            }, f, indent=2)
+        self.print_summary(results)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
+
+    def run_child(self, name, kind, options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'HealthOracle.settings'))
+        command = [sys.executable, os.path.join(BASE_DIR, 'manage.py'), 'compare_backends', name,
+                   '--backends', kind, '--child']
+        for option in ('samples', 'iterations', 'batch_size', 'min_batch_time', 'seed'):
+            command += [f"--{option.replace('_', '-')}", str(options[option])]
+        completed = subprocess.run(command, cwd=BASE_DIR, env=env, capture_output=True, text=True)
+        for line in completed.stderr.splitlines():
+            if line.startswith('@@result '):
+                return json.loads(line[len('@@result '):])
+        if completed.returncode == 0:
+            raise CommandError(f"Measuring the {kind} backend of {name} produced no result")
+        # An unavailable backend (no forest bundle, TensorFlow not installed) is reported, not fatal
+        return {'error': completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'failed'}
+
+    def add_agreement(self, backends):
+        """Largest calibrated-risk difference and risk-category agreement with the NumPy backend"""
+        baseline = backends.get('numpy', {}).get('reference_probabilities')
+        for result in backends.values():
+            probabilities = result.pop('reference_probabilities', None)
+            if baseline is None or probabilities is None or len(probabilities) != len(baseline):
+                continue
+            risk = np.round(calibrate_predictions(probabilities) * 100, 2)
+            baseline_risk = np.round(calibrate_predictions(baseline) * 100, 2)
+            result['max_risk_delta'] = round(float(np.abs(risk - baseline_risk).max()), 4)
+            result['category_agreement'] = float(np.mean(get_risk_category_codes(risk)
+                                                         == get_risk_category_codes(baseline_risk)))
+
+    def print_summary(self, results):
+        self.stdout.write(f"{'model':<9} {'backend':<7} {'load s':>7} {'p50 us':>8} {'p99 us':>8} {'rows/s':>11} "
+                          f"{'weights':>9} {'RSS MB':>7} {'AUC':>6} {'max dRisk':>9} {'same cat':>8}")
+        for name, backends in results.items():
+            for kind, result in backends.items():
+                if 'error' in result:
+                    self.stdout.write(f"{name:<9} {kind:<7} unavailable: {result['error']}")
+                    continue
+                auc_text = f"{result['auc']:.3f}" if result.get('auc') is not None else '-'
+                delta = f"{result['max_risk_delta']:.2f}" if 'max_risk_delta' in result else '-'
+                agreement = f"{result['category_agreement']:.2%}" if 'category_agreement' in result else '-'
+                self.stdout.write(
+                    f"{name:<9} {kind:<7} {result['load_seconds']:>7.3f} {result['single_row']['p50_us']:>8.1f} "
+                    f"{result['single_row']['p99_us']:>8.1f} {result['batch_rows_per_s']:>11,.0f} "
+                    f"{result['memory_footprint_bytes'] / 1024:>6.0f} KB {result['rss_bytes'] / 2**20:>7.0f} "
+                    f"{auc_text:>6} {delta:>9} {agreement:>8}"
+                )
@@ -0,0 +1,50 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from HealthOracle.models import ModelTrainingJob
+from HealthOracle.training_jobs import TRAINERS, claim_next_job, enqueue_training, fail_stale_jobs, run_training_job
+
+
+class Command(BaseCommand):
+    help = "Run queued model retraining jobs outside the web workers"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--enqueue', nargs='+', choices=sorted(TRAINERS), metavar='MODEL',
+                            help="Queue retraining of these models before running")
+        parser.add_argument('--once', action='store_true', help="Exit when the queue is empty instead of polling")
+        parser.add_argument('--poll-interval', type=float,
+                            default=getattr(settings, 'ML_TRAINING_POLL_INTERVAL', 5.0))
+        parser.add_argument('--timeout', type=float, default=getattr(settings, 'ML_TRAINING_JOB_TIMEOUT', 3600.0),
+                            help="Fail jobs that have been running longer than this many seconds")
+
+    def handle(self, *args, **options):
+        for name in options['enqueue'] or []:
+            job = enqueue_training(name, reason='Requested from the command line')
+            self.stdout.write(f"Queued {job}")
+
+        while True:
+            stale = fail_stale_jobs(options['timeout'])
+            if stale:
+                self.stdout.write(self.style.WARNING(f"Marked {stale} stale running job(s) as failed"))
+
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f"Running {job}")
+            started = time.perf_counter()
+            job = run_training_job(job)
+            elapsed = time.perf_counter() - started
+            if job.status == ModelTrainingJob.STATUS_SUCCEEDED:
+                self.stdout.write(self.style.SUCCESS(
+                    f"{job.model_name} retrained in {elapsed:.1f}s: version {job.model_version} ({job.bundle_path})"
+                ))
+            else:
+                self.stdout.write(self.style.ERROR(
+                    f"{job.model_name} retraining failed after {elapsed:.1f}s: {job.error.splitlines()[0]}"
+                ))
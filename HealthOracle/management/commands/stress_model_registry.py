@@ -0,0 +1,91 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from HealthOracle.ml_models import MODEL_NAMES, load_model_artifacts
+from HealthOracle.model_registry import ModelRegistry
+
+
+class Command(BaseCommand):
+    help = "Hit a cold ModelRegistry from many threads at once and verify single-flight loading"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=64)
+        parser.add_argument('--rounds', type=int, default=5)
+        parser.add_argument('--load-delay', type=float, default=0.05,
+                            help="Extra seconds added to every load to widen the race window")
+
+    def handle(self, *args, **options):
+        threads, rounds, delay = options['threads'], options['rounds'], options['load_delay']
+        problems = []
+
+        for round_number in range(1, rounds + 1):
+            problems += self._check_successful_loads(round_number, threads, delay)
+            problems += self._check_failed_loads(round_number, threads, delay)
+
+        if problems:
+            for problem in problems:
+                self.stderr.write(problem)
+            raise CommandError(f"{len(problems)} single-flight violations")
+        self.stdout.write(self.style.SUCCESS(
+            f"{rounds} rounds x {threads} threads: every model loaded exactly once per cold registry"
+        ))
+
+    def _hammer(self, registry, threads):
+        """Release all threads at once against the registry; return per-thread outcomes"""
+        barrier = threading.Barrier(threads)
+        outcomes = [None] * threads
+
+        def worker(index):
+            name = MODEL_NAMES[index % len(MODEL_NAMES)]
+            barrier.wait()
+            try:
+                outcomes[index] = (name, registry.get(name))
+            except Exception as e:
+                outcomes[index] = (name, e)
+
+        pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        started = time.perf_counter()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        return outcomes, time.perf_counter() - started
+
+    def _check_successful_loads(self, round_number, threads, delay):
+        def slow_loader(name):
+            time.sleep(delay)
+            return load_model_artifacts(name)
+
+        registry = ModelRegistry({name: (lambda name=name: slow_loader(name)) for name in MODEL_NAMES})
+        outcomes, elapsed = self._hammer(registry, threads)
+
+        problems = []
+        for name in MODEL_NAMES:
+            results = [result for model_name, result in outcomes if model_name == name]
+            if registry.load_counts[name] != 1:
+                problems.append(f"round {round_number}: {name} loaded {registry.load_counts[name]} times")
+            if any(isinstance(result, Exception) for result in results):
+                problems.append(f"round {round_number}: {name} raised during load")
+            elif len({id(result) for result in results}) != 1:
+                problems.append(f"round {round_number}: {name} threads received different model objects")
+        self.stdout.write(f"round {round_number}: cold load under {threads} threads took {elapsed:.3f}s")
+        return problems
+
+    def _check_failed_loads(self, round_number, threads, delay):
+        def failing_loader():
+            time.sleep(delay)
+            raise RuntimeError("simulated missing artifact")
+
+        registry = ModelRegistry({name: failing_loader for name in MODEL_NAMES}, retry_backoff=60.0)
+        outcomes, _ = self._hammer(registry, threads)
+
+        problems = []
+        for name in MODEL_NAMES:
+            if registry.load_counts[name] != 1:
+                problems.append(f"round {round_number}: failed {name} load was attempted "
+                                f"{registry.load_counts[name]} times inside the backoff window")
+        if not all(isinstance(result, RuntimeError) for _, result in outcomes):
+            problems.append(f"round {round_number}: some threads did not receive the cached load error")
+        return problems
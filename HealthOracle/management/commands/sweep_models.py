@@ -0,0 +1,124 @@
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+
+from HealthOracle.datasets import DATASETS, DatasetError, load_dataset
+from HealthOracle.management.commands.train_models import get_training_output_dir, init_worker
+from HealthOracle.ml_models import MODEL_NAMES
+from HealthOracle.model_sweep import (
+    append_result, config_id, evaluate_fold, expand_grid, load_results, parse_grid, summarise,
+)
+
+
+class Command(BaseCommand):
+    help = ("Cross-validate a grid of network configurations for one model with stratified k-fold, spreading "
+            "(configuration, fold) tasks over worker processes; reports accuracy, ROC AUC and inference latency "
+            "per configuration and resumes from its results file")
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=MODEL_NAMES)
+        parser.add_argument('--grid', action='append', default=[], metavar='PARAM=V1,V2',
+                            help="Values to try for one parameter (repeatable): hidden_units (e.g. 24-12-6,32-16), "
+                                 "dropout, l1, l2, class_weight, batch_size, epochs, patience. "
+                                 "Parameters not given keep the served model's values")
+        parser.add_argument('--folds', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+        parser.add_argument('--threads-per-worker', type=int, default=None,
+                            help="TensorFlow/BLAS threads per worker (default: CPU count / workers)")
+        parser.add_argument('--results', help="JSONL results file (default: ML_TRAINING_OUTPUT_DIR/sweeps/"
+                                              "<model>-seed<seed>-k<folds>.jsonl)")
+        parser.add_argument('--fresh', action='store_true', help="Discard earlier results in the results file")
+        parser.add_argument('--verbose-fit', action='store_true', help="Show Keras progress output")
+
+    def handle(self, *args, **options):
+        name = options['model']
+        if options['folds'] < 2:
+            raise CommandError("--folds must be at least 2")
+        try:
+            configs = expand_grid(parse_grid(options['grid']))
+        except ValueError as e:
+            raise CommandError(str(e))
+        if name in DATASETS:
+            try:
+                load_dataset(name)
+            except DatasetError as e:
+                raise CommandError(str(e))
+
+        path = options['results'] or str(get_training_output_dir() / 'sweeps' /
+                                         f"{name}-seed{options['seed']}-k{options['folds']}.jsonl")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if options['fresh'] and os.path.exists(path):
+            os.unlink(path)
+        results = {key: record for key, record in load_results(path).items()
+                   if record['model'] == name and record['seed'] == options['seed']
+                   and record['folds'] == options['folds']}
+        tasks = [(params, fold) for params in configs for fold in range(options['folds'])
+                 if (config_id(params), fold) not in results]
+
+        cpu_count = os.cpu_count() or 1
+        workers = max(1, min(options['workers'] or cpu_count, len(tasks) or 1))
+        threads = options['threads_per_worker'] or max(1, cpu_count // workers)
+        self.stdout.write(f"{len(configs)} configuration(s) x {options['folds']} folds for {name}: "
+                          f"{len(results)} task(s) already in {path}, {len(tasks)} to run with "
+                          f"{workers} worker(s) x {threads} thread(s)")
+
+        failures = 0
+        started = time.perf_counter()
+        if tasks:
+            # spawn, not fork: TensorFlow's thread pools don't survive a fork
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker,
+                                     initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'HealthOracle.settings'),
+                                               threads)) as pool:
+                futures = {pool.submit(evaluate_fold, name, params, fold, options['folds'], options['seed'],
+                                       int(options['verbose_fit'])): (params, fold)
+                           for params, fold in tasks}
+                for done, future in enumerate(as_completed(futures), 1):
+                    params, fold = futures[future]
+                    try:
+                        record = future.result()
+                    except Exception as e:
+                        failures += 1
+                        self.stderr.write(f"  [{done}/{len(tasks)}] {config_id(params)} fold {fold}: failed: "
+                                          f"{type(e).__name__}: {e}")
+                        continue
+                    append_result(path, record)
+                    results[(record['config'], fold)] = record
+                    self.stdout.write(f"  [{done}/{len(tasks)}] {record['config']} fold {fold}: "
+                                      f"ROC AUC {record['roc_auc']:.4f}, {record['fit_seconds']:.1f}s")
+        wall_seconds = time.perf_counter() - started
+
+        summaries = summarise(configs, results)
+        summary_path = os.path.splitext(path)[0] + '.summary.json'
+        with open(summary_path, 'w') as f:
+            json.dump({'model': name, 'seed': options['seed'], 'folds': options['folds'], 'configs': summaries},
+                      f, indent=2)
+
+        self.print_summary(summaries, options['folds'])
+        fit_seconds = sum(record['fit_seconds'] for record in results.values())
+        self.stdout.write(f"wall clock {wall_seconds:.1f}s this run; {fit_seconds:.1f}s of fitting in the store")
+        self.stdout.write(f"Summary written to {summary_path}")
+        if failures:
+            raise CommandError(f"{failures} task(s) failed; run the command again to retry them")
+        self.stdout.write(self.style.SUCCESS("Sweep finished"))
+
+    def print_summary(self, summaries, folds):
+        self.stdout.write(f"\n{'config':<11} {'hidden':<10} {'drop':>5} {'l1':>7} {'l2':>7} {'cw':>5} {'bs':>4} "
+                          f"{'folds':>5} {'acc':>7} {'ROC AUC':>15} {'f1':>7} {'p50 us':>8} {'rows/s':>10}")
+        for summary in summaries:
+            params = summary['params']
+            hidden = '-'.join(str(units) for units in params['hidden_units'])
+            marker = '*' if summary['pareto'] else ' '
+            self.stdout.write(
+                f"{summary['config']:<10}{marker} {hidden:<10} {params['dropout']:>5g} {params['l1']:>7g} "
+                f"{params['l2']:>7g} {params['class_weight']:>5g} {params['batch_size']:>4} "
+                f"{summary['folds_done']:>2}/{folds:<2} {summary['accuracy']:>7.4f} "
+                f"{summary['roc_auc']:>7.4f} ±{summary['roc_auc_std']:.4f} {summary['f1']:>7.4f} "
+                f"{summary['p50_us']:>8.1f} {summary['rows_per_s']:>10.0f}"
+            )
+        self.stdout.write("* = not beaten on both ROC AUC and single-row latency by another configuration")
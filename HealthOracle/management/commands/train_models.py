@@ -0,0 +1,170 @@
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from HealthOracle.datasets import DATASETS, DatasetError, import_dataset, load_dataset
+from HealthOracle.management.commands.bench_models import git_commit
+from HealthOracle.ml_models import BASE_DIR, MODEL_NAMES, file_sha256, training_artifact_paths
+
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS', 'TF_NUM_INTEROP_THREADS')
+
+
+def get_training_output_dir():
+    return Path(getattr(settings, 'ML_TRAINING_OUTPUT_DIR', None) or BASE_DIR / 'training_runs')
+
+
+def init_worker(settings_module, threads):
+    """Process pool initializer: cap TensorFlow's thread pools before it is imported, then set up Django"""
+    for variable in THREAD_ENV_VARS:
+        os.environ[variable] = str(threads)
+    os.environ['TF_CPP_MIN_LOG_LEVEL'] = os.environ.get('TF_CPP_MIN_LOG_LEVEL', '2')
+    os.environ['DJANGO_SETTINGS_MODULE'] = settings_module
+    import django
+    django.setup()
+
+
+def train_one(name, output_dir, seed, verbose):
+    """Train one model into ``output_dir`` (runs in a pool worker)"""
+    from HealthOracle.training_jobs import TRAINERS
+
+    started = time.perf_counter()
+    _, metrics = TRAINERS[name](output_dir=output_dir, seed=seed, verbose=verbose)
+    seconds = time.perf_counter() - started
+    return {
+        'seconds': round(seconds, 3),
+        'pid': os.getpid(),
+        'metrics': metrics,
+        'artifacts': {os.path.basename(path): file_sha256(path)
+                      for path in training_artifact_paths(name, output_dir) if os.path.exists(path)},
+    }
+
+
+class Command(BaseCommand):
+    help = ("Train the disease models offline from the local dataset cache, in parallel worker processes with "
+            "fixed seeds, into a new versioned output directory")
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', choices=MODEL_NAMES, help="Models to train (default: all)")
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Training processes (default: one per model, at most the CPU count)")
+        parser.add_argument('--threads-per-worker', type=int, default=None,
+                            help="TensorFlow/BLAS threads per worker (default: CPU count / workers)")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output-dir', help="Run directory (default: ML_TRAINING_OUTPUT_DIR/<time>-seed<seed>)")
+        parser.add_argument('--download', action='store_true',
+                            help="Fetch datasets missing from the cache from their source URLs")
+        parser.add_argument('--import-csv', action='append', default=[], metavar='NAME=PATH',
+                            help="Convert a local CSV into the dataset cache first (repeatable)")
+        parser.add_argument('--bundles', action='store_true',
+                            help="Also build <model>.bundle files in the run directory")
+        parser.add_argument('--verbose-fit', action='store_true', help="Show Keras progress output")
+
+    def handle(self, *args, **options):
+        names = options['models'] or list(MODEL_NAMES)
+        self.prepare_datasets(names, options)
+
+        cpu_count = os.cpu_count() or 1
+        workers = max(1, min(options['workers'] or min(len(names), cpu_count), len(names)))
+        threads = options['threads_per_worker'] or max(1, cpu_count // workers)
+        run_dir = Path(options['output_dir'] or get_training_output_dir() /
+                       f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}-seed{options['seed']}")
+        if run_dir.exists() and any(run_dir.iterdir()):
+            raise CommandError(f"{run_dir} already exists and is not empty")
+        run_dir.mkdir(parents=True, exist_ok=True)
+
+        self.stdout.write(f"Training {', '.join(names)} with {workers} worker(s) x {threads} thread(s) "
+                          f"into {run_dir}")
+        results = {}
+        failures = {}
+        started = time.perf_counter()
+        # spawn, not fork: TensorFlow's thread pools don't survive a fork
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker,
+                                 initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'HealthOracle.settings'),
+                                           threads)) as pool:
+            futures = {pool.submit(train_one, name, str(run_dir), options['seed'], int(options['verbose_fit'])): name
+                       for name in names}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    results[name] = future.result()
+                    metrics = results[name]['metrics']
+                    self.stdout.write(f"  {name}: {results[name]['seconds']:.1f}s, ROC AUC {metrics['roc_auc']:.4f}, "
+                                      f"{metrics['epochs']} epochs")
+                except Exception as e:
+                    failures[name] = f"{type(e).__name__}: {e}"
+                    self.stderr.write(f"  {name}: failed: {failures[name]}")
+        wall_seconds = time.perf_counter() - started
+
+        if options['bundles']:
+            from HealthOracle.ml_models import build_bundle_from_artifacts
+            for name in results:
+                header = build_bundle_from_artifacts(name, str(run_dir), str(run_dir / f'{name}.bundle'))
+                results[name]['bundle_version'] = header['model_version']
+
+        model_seconds = sum(result['seconds'] for result in results.values())
+        manifest = {
+            'created': datetime.now(timezone.utc).isoformat(),
+            'commit': git_commit(),
+            'seed': options['seed'],
+            'workers': workers,
+            'threads_per_worker': threads,
+            'wall_seconds': round(wall_seconds, 3),
+            'sum_model_seconds': round(model_seconds, 3),
+            'datasets': {name: load_dataset(name)[1] for name in names if name in DATASETS and name in results},
+            'models': results,
+            'failures': failures,
+        }
+        with open(run_dir / 'manifest.json', 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        self.stdout.write(f"\n{'model':<9} {'seconds':>8} {'ROC AUC':>8} {'F1':>7} {'epochs':>7}")
+        for name in names:
+            if name in results:
+                result = results[name]
+                self.stdout.write(f"{name:<9} {result['seconds']:>8.1f} {result['metrics']['roc_auc']:>8.4f} "
+                                  f"{result['metrics']['f1']:>7.4f} {result['metrics']['epochs']:>7}")
+            else:
+                self.stdout.write(f"{name:<9} {'failed':>8}")
+        self.stdout.write(f"wall clock {wall_seconds:.1f}s for {model_seconds:.1f}s of training "
+                          f"({model_seconds / wall_seconds if wall_seconds else 0:.2f}x)")
+        self.stdout.write(f"Manifest written to {run_dir / 'manifest.json'}")
+        if results:
+            self.stdout.write(f"To serve these models: python manage.py build_model_bundles --source-dir {run_dir} "
+                              f"{' '.join(sorted(results))}")
+        if failures:
+            raise CommandError(f"Training failed for: {', '.join(sorted(failures))}")
+        self.stdout.write(self.style.SUCCESS("Training finished"))
+
+    def prepare_datasets(self, names, options):
+        """Import any --import-csv files, download missing datasets with --download, then check the cache"""
+        for item in options['import_csv']:
+            name, _, path = item.partition('=')
+            if name not in DATASETS or not path:
+                raise CommandError(f"--import-csv expects NAME=PATH with NAME one of {', '.join(DATASETS)}")
+            try:
+                dataset_path, meta = import_dataset(name, path)
+            except (DatasetError, OSError) as e:
+                raise CommandError(f"Could not import {path}: {e}")
+            self.stdout.write(f"Imported {meta['rows']} {name} rows into {dataset_path}")
+
+        for name in names:
+            if name not in DATASETS:
+                continue
+            try:
+                load_dataset(name)
+            except DatasetError as e:
+                if not options['download']:
+                    raise CommandError(str(e))
+                try:
+                    dataset_path, meta = import_dataset(name)
+                except (DatasetError, OSError) as e:
+                    raise CommandError(f"Could not download the {name} dataset from {DATASETS[name]['url']}: {e}")
+                self.stdout.write(f"Downloaded {meta['rows']} {name} rows into {dataset_path}")
@@ -0,0 +1,145 @@
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+
+class _PendingRequest:
+    __slots__ = ('row', 'model', 'event', 'result', 'error')
+
+    def __init__(self, row, model):
+        self.row = row
+        self.model = model
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-row predictions into one forward pass.
+
+    Callers block in ``submit`` while a background thread collects rows for
+    up to ``max_wait_ms`` (or until ``max_batch_size`` rows are waiting), runs
+    ``predict_fn(model, X)`` once per model on the stacked rows submitted for
+    it and hands every caller its own output row. Rows carry the model they
+    were scaled for, so a batch spanning a hot reload never runs a row
+    through the other version. Only useful with threaded workers; under the
+    sync worker there is never more than one request in flight.
+    """
+
+    def __init__(self, name, predict_fn, max_batch_size=32, max_wait_ms=2.0, timeout=5.0):
+        self.name = name
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.timeout = float(timeout) if timeout else None
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stats = {
+            'requests': 0,
+            'batches': 0,
+            'errors': 0,
+            'timeouts': 0,
+            'max_batch_size_seen': 0,
+            'max_queue_depth': 0,
+            'batch_size_counts': {},
+        }
+
+    def submit(self, row, model):
+        """Score one row with ``model``; blocks until its batch has been predicted.
+
+        Raises TimeoutError if that takes longer than ``timeout`` seconds
+        (a stuck or dead batching thread).
+        """
+        self._ensure_worker()
+        pending = _PendingRequest(np.asarray(row, dtype=np.float32).reshape(-1), model)
+        self._queue.put(pending)
+        depth = self._queue.qsize()
+        with self._lock:
+            self._stats['requests'] += 1
+            if depth > self._stats['max_queue_depth']:
+                self._stats['max_queue_depth'] = depth
+        if not pending.event.wait(self.timeout):
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise TimeoutError(f"No micro-batch result for {self.name} within {self.timeout:g} s")
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['batch_size_counts'] = dict(self._stats['batch_size_counts'])
+        stats['queue_depth'] = self._queue.qsize()
+        stats['mean_batch_size'] = (
+            round(stats['requests'] / stats['batches'], 2) if stats['batches'] else 0.0
+        )
+        stats['max_batch_size'] = self.max_batch_size
+        stats['max_wait_ms'] = self.max_wait * 1000.0
+        stats['timeout_s'] = self.timeout
+        return stats
+
+    def _ensure_worker(self):
+        # Threads don't survive fork, so gunicorn workers each start their own
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != pid or not self._thread.is_alive():
+                self._queue = queue.Queue()
+                self._pid = pid
+                self._thread = threading.Thread(
+                    target=self._run, name=f"microbatch-{self.name}", daemon=True
+                )
+                self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            size = len(batch)
+            # Requests scaled for different model versions (around a reload) run separately
+            groups = {}
+            for pending in batch:
+                groups.setdefault(id(pending.model), []).append(pending)
+            try:
+                for group in groups.values():
+                    self._predict_group(group)
+            finally:
+                with self._lock:
+                    self._stats['batches'] += 1
+                    counts = self._stats['batch_size_counts']
+                    counts[size] = counts.get(size, 0) + 1
+                    if size > self._stats['max_batch_size_seen']:
+                        self._stats['max_batch_size_seen'] = size
+                for pending in batch:
+                    pending.event.set()
+
+    def _predict_group(self, group):
+        try:
+            outputs = self.predict_fn(group[0].model, np.stack([pending.row for pending in group]))
+            for pending, output in zip(group, outputs):
+                pending.result = output
+        except Exception as e:
+            for pending in group:
+                pending.error = e
+            with self._lock:
+                self._stats['errors'] += 1
@@ -0,0 +1,32 @@
+# Generated by Django 6.1.2 on 2026-10-18 19:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HealthOracle', '0003_alter_chatbotsuggestion_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModelTrainingJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(choices=[('heart', 'Heart Disease'), ('lung', 'Lung Disease'), ('liver', 'Liver Disease'), ('diabetes', 'Diabetes')], max_length=20)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], db_index=True, default='queued', max_length=20)),
+                ('reason', models.TextField(blank=True)),
+                ('worker', models.CharField(blank=True, max_length=100)),
+                ('model_version', models.CharField(blank=True, max_length=64)),
+                ('bundle_path', models.CharField(blank=True, max_length=500)),
+                ('error', models.TextField(blank=True)),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('date_started', models.DateTimeField(blank=True, null=True)),
+                ('date_finished', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['date_created'],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.1.2 on 2026-10-18 20:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HealthOracle', '0004_modeltrainingjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='predictionhistory',
+            name='risk_interval_high',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='predictionhistory',
+            name='risk_interval_low',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -1,23 +1,53 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import zlib
+from functools import partial
+from pathlib import Path
 import numpy as np
-import tensorflow as tf
-from tensorflow.keras.models import Sequential, load_model
-from tensorflow.keras.layers import Dense, Dropout
-from tensorflow.keras.regularizers import l1_l2
-from tensorflow.keras.callbacks import EarlyStopping
-from sklearn.model_selection import train_test_split, KFold, cross_val_score
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score, confusion_matrix, classification_report
-import joblib
-# Removed: import pandas as pd, import matplotlib.pyplot as plt, import seaborn as sns, from imblearn.over_sampling import SMOTE
-
-def build_model(input_dim):
+from django.conf import settings
+from .numpy_inference import DenseNetwork, PRECISIONS
+from .cascade import CascadeStats, LogisticScreen, threshold_distance
+from .micro_batching import MicroBatcher
+from .model_bundle import ModelBundle, BundleError, build_bundle, build_forest_bundle, read_bundle_header
+from .model_registry import LoadedModel, ModelRegistry
+from .prediction_cache import PredictionCache, canonical_feature_key
+from .request_timing import set_disease, stage
+from .feature_schema import SCHEMAS
+# Removed: import pandas as pd, import matplotlib.pyplot as plt, import seaborn as sns
+
+logger = logging.getLogger(__name__)
+
+# Architecture and fit settings of the served models; 'manage.py sweep_models'
+# evaluates variants of these. class_weight is the weight of the positive class.
+DEFAULT_TRAINING_PARAMS = {
+    'hidden_units': (24, 12, 6),
+    'dropout': 0.2,
+    'l1': 0.001,
+    'l2': 0.001,
+    'class_weight': 3.0,
+    'batch_size': 16,
+    'epochs': 100,
+    'patience': 10,
+}
+
+def build_model(input_dim, hidden_units=(24, 12, 6), dropout=0.2, l1=0.001, l2=0.001):
+    # TensorFlow is only needed for training; serving runs on DenseNetwork
+    import tensorflow as tf
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Dense, Dropout
+    from tensorflow.keras.regularizers import l1_l2
+
     model = Sequential()
-    model.add(Dense(24, input_dim=input_dim, activation='relu', kernel_regularizer=l1_l2(l1=0.001, l2=0.001)))
-    model.add(Dropout(0.2))
-    model.add(Dense(12, activation='relu', kernel_regularizer=l1_l2(l1=0.001, l2=0.001)))
-    model.add(Dropout(0.2))
-    model.add(Dense(6, activation='relu', kernel_regularizer=l1_l2(l1=0.001, l2=0.001)))
-    model.add(Dropout(0.2))
+    for i, units in enumerate(hidden_units):
+        if i == 0:
+            model.add(Dense(units, input_dim=input_dim, activation='relu', kernel_regularizer=l1_l2(l1=l1, l2=l2)))
+        else:
+            model.add(Dense(units, activation='relu', kernel_regularizer=l1_l2(l1=l1, l2=l2)))
+        if dropout:
+            model.add(Dropout(dropout))
     model.add(Dense(1, activation='sigmoid'))
     model.compile(optimizer='adam', loss='binary_crossentropy', metrics=['accuracy', tf.keras.metrics.AUC()])
     return model
@@ -39,52 +69,166 @@ def get_health_advice(category):
     else:
         return "You are at low risk. Maintain a healthy lifestyle and regular check-ups."
 
+# Vectorized versions of get_risk_category / get_health_advice, indexed by category code
+RISK_CATEGORIES = np.array(["Low Risk", "Moderate Risk", "High Risk"])
+HEALTH_ADVICE = np.array([get_health_advice(category) for category in RISK_CATEGORIES])
+
+def get_risk_category_codes(risk_percentages):
+    risk = np.asarray(risk_percentages)
+    return (risk >= 30).astype(np.intp) + (risk > 60)
+
+# Minority oversampling (SMOTE) for training, in NumPy
+def nearest_neighbors(X, k, chunk_bytes=64 * 2**20):
+    """Indices of the ``k`` nearest other rows of each row of X, nearest first.
+
+    Squared distances are computed a block of rows at a time, so at most about
+    ``chunk_bytes`` of distance matrix (plus its partition indices) exists at once. Candidates are then
+    ranked on exactly recomputed distances, ties by row index, like a tree
+    search; as in imbalanced-learn, the first hit (normally the row itself)
+    is dropped.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    n = len(X)
+    if n <= k:
+        raise ValueError(f"Need more than {k} samples to find {k} neighbours, got {n}")
+    keep = k + 1
+    # A few spare candidates absorb rounding in the |a|^2 - 2ab + |b|^2 expansion
+    candidates = min(n, keep + 8)
+    squared_norms = np.einsum('ij,ij->i', X, X)
+    chunk = max(1, min(n, int(chunk_bytes // (8 * n))))
+    neighbors = np.empty((n, k), dtype=np.intp)
+    for start in range(0, n, chunk):
+        block = X[start:start + chunk]
+        distances = block @ X.T
+        distances *= -2
+        distances += squared_norms[start:start + chunk, None]
+        distances += squared_norms[None, :]
+        if candidates < n:
+            nearest = np.argpartition(distances, candidates - 1, axis=1)[:, :candidates]
+        else:
+            nearest = np.broadcast_to(np.arange(n), distances.shape)
+        exact = ((X[nearest] - block[:, None, :]) ** 2).sum(axis=2)
+        order = np.lexsort((nearest, exact), axis=1)[:, :keep]
+        neighbors[start:start + chunk] = np.take_along_axis(nearest, order, axis=1)[:, 1:]
+    return neighbors
+
+def oversample_minority(X, y, k_neighbors=5, seed=42, chunk_bytes=64 * 2**20):
+    """SMOTE: grow every class to the size of the largest one with interpolated samples.
+
+    Each synthetic row is ``x + u * (neighbour - x)`` for a random row x of the
+    class, one of its ``k_neighbors`` nearest same-class rows and u ~ U[0, 1).
+    The draws follow imbalanced-learn's ``SMOTE(random_state=seed)``, so the
+    same data and seed give the same samples. Returns (X_resampled, y_resampled)
+    with the original rows first.
+    """
+    X = np.asarray(X)
+    y = np.asarray(y)
+    classes, counts = np.unique(y, return_counts=True)
+    new_rows = counts.max() - counts
+    # One output array, filled in place: originals first, then each class's samples
+    X_resampled = np.empty((len(X) + new_rows.sum(), X.shape[1]), dtype=X.dtype)
+    y_resampled = np.empty(len(X_resampled), dtype=y.dtype)
+    X_resampled[:len(X)] = X
+    y_resampled[:len(y)] = y
+    offset = len(X)
+    block = max(1, int(chunk_bytes // (8 * max(1, X.shape[1]))))
+    for label, n_samples in zip(classes, new_rows):
+        if n_samples == 0:
+            continue
+        X_class = X[y == label]
+        neighbors = nearest_neighbors(X_class, k_neighbors, chunk_bytes)
+        random_state = np.random.RandomState(seed)
+        sample_indices = random_state.randint(low=0, high=neighbors.size, size=n_samples)
+        steps = random_state.uniform(size=n_samples)[:, np.newaxis]
+        rows, cols = np.divmod(sample_indices, k_neighbors)
+        # Interpolate in blocks, bounded like the distance matrices
+        for start in range(0, n_samples, block):
+            r = rows[start:start + block]
+            base = X_class[r]
+            X_resampled[offset + start:offset + start + len(r)] = base + steps[start:start + block] * (
+                X_class[neighbors[r, cols[start:start + block]]] - base)
+        y_resampled[offset:offset + n_samples] = label
+        offset += n_samples
+    return X_resampled, y_resampled
+
 # Common training function with improvements
-def train_model_with_improvements(X, y, scaler_filename, model_filename, features_filename=None, feature_names=None):
-    # Split data with stratification
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
-    
-    # Scale features
-    scaler = StandardScaler().fit(X_train)
-    joblib.dump(scaler, scaler_filename)
-    X_train_scaled = scaler.transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
-    
+def fit_network(X_train_scaled, y_train, params=None, seed=42, verbose=1):
+    """Oversample the scaled training rows and fit one network; returns (model, history, balanced row count).
+
+    ``params`` overrides entries of DEFAULT_TRAINING_PARAMS.
+    """
+    import tensorflow as tf
+
+    params = dict(DEFAULT_TRAINING_PARAMS, **(params or {}))
+
     # Apply SMOTE to balance the dataset
-    smote = SMOTE(random_state=42)
-    X_train_balanced, y_train_balanced = smote.fit_resample(X_train_scaled, y_train)
+    X_train_balanced, y_train_balanced = oversample_minority(X_train_scaled, y_train, seed=seed)
     
-    # Print class distribution before and after SMOTE
-    print(f"Original class distribution: {np.bincount(y_train)}")
-    print(f"Balanced class distribution: {np.bincount(y_train_balanced)}")
+    # Log class distribution before and after SMOTE
+    logger.info("Original class distribution: %s", np.bincount(y_train))
+    logger.info("Balanced class distribution: %s", np.bincount(y_train_balanced))
     
     # Set up early stopping
+    from tensorflow.keras.callbacks import EarlyStopping
     early_stopping = EarlyStopping(
         monitor='val_loss',
-        patience=10,
+        patience=params['patience'],
         restore_best_weights=True,
-        verbose=1
+        verbose=verbose
     )
     
-    # Build model
-    model = build_model(X_train_balanced.shape[1])
+    # Build model; a fresh session also restarts Keras layer naming, so the saved
+    # file doesn't depend on how many models this process built before
+    tf.keras.backend.clear_session()
+    tf.keras.utils.set_random_seed(seed)
+    tf.config.experimental.enable_op_determinism()
+    model = build_model(X_train_balanced.shape[1], hidden_units=tuple(params['hidden_units']),
+                        dropout=params['dropout'], l1=params['l1'], l2=params['l2'])
     
     # Use class weights to further address imbalance
-    class_weights = {0: 1.0, 1: 3.0}
+    class_weights = {0: 1.0, 1: float(params['class_weight'])}
     
     # Train model with early stopping and smaller batch size
     history = model.fit(
         X_train_balanced, y_train_balanced,
-        epochs=100,
-        batch_size=16,
+        epochs=params['epochs'],
+        batch_size=params['batch_size'],
         validation_split=0.2,
         callbacks=[early_stopping],
         class_weight=class_weights,
-        verbose=1
+        verbose=verbose
+    )
+    return model, history, len(y_train_balanced)
+
+def train_model_with_improvements(X, y, scaler_filename, model_filename, features_filename=None, feature_names=None,
+                                  seed=42, verbose=1, params=None):
+    """Split, scale, oversample and fit one network; returns (model, test-set metrics).
+
+    ``seed`` fixes the split, the oversampling and the Keras weight
+    initialisation and shuffling, so a retrain with the same data and seed
+    reproduces the same model.
+    """
+    # Training-only dependencies; the serving path never imports them
+    import joblib
+    from sklearn.metrics import (
+        accuracy_score, classification_report, confusion_matrix, f1_score, precision_score, recall_score, roc_auc_score,
     )
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    # Split data with stratification
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=seed, stratify=y)
+    
+    # Scale features
+    scaler = StandardScaler().fit(X_train)
+    joblib.dump(scaler, scaler_filename)
+    X_train_scaled = scaler.transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+    
+    model, history, train_rows = fit_network(X_train_scaled, y_train, params, seed=seed, verbose=verbose)
     
     # Evaluate model
-    y_pred_proba = model.predict(X_test_scaled)
+    y_pred_proba = model.predict(X_test_scaled, verbose=verbose)
     y_pred = (y_pred_proba > 0.5).astype(int)
     
     # Calculate metrics
@@ -94,401 +238,993 @@ def train_model_with_improvements(X, y, scaler_filename, model_filename, feature
     f1 = f1_score(y_test, y_pred, zero_division=0)
     roc_auc = roc_auc_score(y_test, y_pred_proba)
     
-    # Print evaluation metrics
-    print(f"\nModel Evaluation Metrics for {model_filename}:")
-    print(f"Accuracy: {accuracy:.4f}")
-    print(f"Precision: {precision:.4f}")
-    print(f"Recall: {recall:.4f}")
-    print(f"F1 Score: {f1:.4f}")
-    print(f"ROC AUC: {roc_auc:.4f}")
-    
-    print("\nClassification Report:")
-    print(classification_report(y_test, y_pred))
-    
-    print("\nConfusion Matrix:")
-    cm = confusion_matrix(y_test, y_pred)
-    print(cm)
+    # Log evaluation metrics
+    logger.info(
+        "Model evaluation metrics for %s: accuracy %.4f, precision %.4f, recall %.4f, F1 %.4f, ROC AUC %.4f",
+        model_filename, accuracy, precision, recall, f1, roc_auc,
+        extra={'model_file': str(model_filename), 'accuracy': accuracy, 'precision': precision,
+               'recall': recall, 'f1': f1, 'roc_auc': roc_auc},
+    )
+    logger.info("Classification report:\n%s", classification_report(y_test, y_pred))
+    logger.info("Confusion matrix:\n%s", confusion_matrix(y_test, y_pred))
     
     # Save model and feature names if provided
     model.save(model_filename)
     if feature_names is not None and features_filename is not None:
         joblib.dump(feature_names, features_filename)
     
-    return model
+    metrics = {
+        'accuracy': float(accuracy),
+        'precision': float(precision),
+        'recall': float(recall),
+        'f1': float(f1),
+        'roc_auc': float(roc_auc),
+        'epochs': len(history.history['loss']),
+        'train_rows': int(train_rows),
+        'test_rows': int(len(y_test)),
+        'seed': seed,
+    }
+    return model, metrics
+
+def training_artifact_paths(name, output_dir=None):
+    """Scaler, model and feature-name files written by train_<name>_model (cwd by default)"""
+    return tuple(os.path.join(output_dir or '', filename) for filename in
+                 (f'{name}_scaler.pkl', f'{name}_model.h5', f'{name}_model_features.pkl'))
+
+def engineer_training_features(name, data):
+    """Model inputs and feature names for a training table, via the serving pipeline.
+
+    ``data`` is anything indexable by the schema's raw feature names that
+    yields columns (a DataFrame, or a dict of arrays).
+    """
+    schema = SCHEMAS[name]
+    raw = np.column_stack([np.asarray(data[field.feature], dtype=np.float64) for field in schema.fields])
+    return schema.engineer(raw), list(schema.model_inputs)
 
 # Heart Disease Prediction Model
-def train_heart_model():
-    url = "https://archive.ics.uci.edu/ml/machine-learning-databases/heart-disease/processed.cleveland.data"
-    column_names = [
-        "age", "sex", "cp", "trestbps", "chol", "fbs", "restecg", "thalach", "exang",
-        "oldpeak", "slope", "ca", "thal", "target"
-    ]
-    data = pd.read_csv(url, names=column_names, na_values="?").dropna()
+def heart_training_data(seed=42):
+    from .datasets import load_dataset
+    columns, _ = load_dataset('heart')
+    # Drop rows with missing values ('?' in the UCI file)
+    complete = np.isfinite(np.column_stack(list(columns.values()))).all(axis=1)
+    data = {column: values[complete] for column, values in columns.items()}
     
-    # Feature engineering for heart disease
-    data['age_sex'] = data['age'] * data['sex']  # Interaction between age and sex
-    data['chol_age'] = data['chol'] / data['age']  # Cholesterol adjusted for age
-    data['trestbps_chol'] = data['trestbps'] * data['chol'] / 10000  # BP and cholesterol interaction
-    data['exang_oldpeak'] = data['exang'] * data['oldpeak']  # Exercise angina and ST depression
-    data['risk_factors'] = data['fbs'] + data['exang']  # Sum of binary risk factors
-    
-    # Define features
-    features = ['age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg', 'thalach', 'exang',
-                'oldpeak', 'slope', 'ca', 'thal', 'age_sex', 'chol_age', 'trestbps_chol', 
-                'exang_oldpeak', 'risk_factors']
-    
-    X = data[features].values
-    y = (data['target'] > 0).astype(int).values
+    # Feature engineering for heart disease, shared with serving
+    X, features = engineer_training_features('heart', data)
+    y = (data['target'] > 0).astype(int)
+    return X, y, features
+
+def train_heart_model(output_dir=None, seed=42, verbose=1, params=None):
+    X, y, features = heart_training_data(seed)
     
     # Train model with improvements
-    return train_model_with_improvements(X, y, 'heart_scaler.pkl', 'heart_model.h5', 'heart_model_features.pkl', features)
+    return train_model_with_improvements(X, y, *training_artifact_paths('heart', output_dir), features,
+                                         seed=seed, verbose=verbose, params=params)
 
 # Lung Disease Prediction Model
-def train_lung_model():
+def lung_training_data(seed=42):
+    # Generate synthetic data with realistic patterns
+    np.random.seed(seed)
+    n_samples = 1000
+    
+    # Base features
+    age = np.random.normal(50, 15, n_samples).clip(20, 80)
+    smoking = np.random.binomial(1, 0.3, n_samples)  # 30% smokers
+    air_quality = np.random.normal(100, 50, n_samples).clip(20, 300)
+    alcohol = np.random.binomial(1, 0.4, n_samples)  # 40% drinkers
+    bmi = np.random.normal(25, 5, n_samples).clip(18, 40)
+    family_history = np.random.binomial(1, 0.2, n_samples)  # 20% with family history
+    activity = np.random.randint(0, 4, n_samples)  # 0-3 activity levels
+    occupation = np.random.binomial(1, 0.25, n_samples)  # 25% with occupational exposure
+    
+    # Raw columns in form order; engineered features come from the shared schema
+    raw = np.column_stack([
+        age, smoking, air_quality, alcohol, bmi, family_history,
+        activity, occupation
+    ])
+    X = SCHEMAS['lung'].engineer(raw)
+    
+    # Generate target variable with realistic risk patterns
+    base_risk = (
+        (age - 20) / 60 * 0.3 +  # Age contribution
+        smoking * 0.3 +           # Smoking contribution
+        (air_quality - 20) / 280 * 0.2 +  # Air quality contribution
+        alcohol * 0.1 +           # Alcohol contribution
+        (bmi - 18) / 22 * 0.2 +  # BMI contribution
+        family_history * 0.2 +    # Family history contribution
+        (3 - activity) / 3 * 0.2 +  # Activity level contribution
+        occupation * 0.2          # Occupation contribution
+    )
+    
+    # Add some noise and ensure values are between 0 and 1
+    base_risk = base_risk + np.random.normal(0, 0.1, n_samples)
+    base_risk = base_risk.clip(0, 1)
+    
+    # Convert to binary target with probability based on risk
+    y = np.random.binomial(1, base_risk)
+    
+    # Save feature names
+    features = list(SCHEMAS['lung'].model_inputs)
+    return X, y, features
+
+def train_lung_model(output_dir=None, seed=42, verbose=1, params=None):
     try:
-        # Generate synthetic data with realistic patterns
-        np.random.seed(42)
-        n_samples = 1000
-        
-        # Base features
-        age = np.random.normal(50, 15, n_samples).clip(20, 80)
-        smoking = np.random.binomial(1, 0.3, n_samples)  # 30% smokers
-        air_quality = np.random.normal(100, 50, n_samples).clip(20, 300)
-        alcohol = np.random.binomial(1, 0.4, n_samples)  # 40% drinkers
-        bmi = np.random.normal(25, 5, n_samples).clip(18, 40)
-        family_history = np.random.binomial(1, 0.2, n_samples)  # 20% with family history
-        activity = np.random.randint(0, 4, n_samples)  # 0-3 activity levels
-        occupation = np.random.binomial(1, 0.25, n_samples)  # 25% with occupational exposure
-        
-        # Create engineered features
-        age_smoking = age * smoking * 2
-        smoking_air_quality = smoking * air_quality / 100
-        bmi_activity = bmi / (activity + 1)
-        risk_factor_sum = (smoking * 2 + 
-                          family_history * 1.5 + 
-                          occupation * 1.5 + 
-                          alcohol * 1)
-        
-        # Combine all features
-        X = np.column_stack([
-            age, smoking, air_quality, alcohol, bmi, family_history,
-            activity, occupation, age_smoking, smoking_air_quality,
-            bmi_activity, risk_factor_sum
-        ])
-        
-        # Generate target variable with realistic risk patterns
-        base_risk = (
-            (age - 20) / 60 * 0.3 +  # Age contribution
-            smoking * 0.3 +           # Smoking contribution
-            (air_quality - 20) / 280 * 0.2 +  # Air quality contribution
-            alcohol * 0.1 +           # Alcohol contribution
-            (bmi - 18) / 22 * 0.2 +  # BMI contribution
-            family_history * 0.2 +    # Family history contribution
-            (3 - activity) / 3 * 0.2 +  # Activity level contribution
-            occupation * 0.2          # Occupation contribution
-        )
-        
-        # Add some noise and ensure values are between 0 and 1
-        base_risk = base_risk + np.random.normal(0, 0.1, n_samples)
-        base_risk = base_risk.clip(0, 1)
-        
-        # Convert to binary target with probability based on risk
-        y = np.random.binomial(1, base_risk)
-        
-        # Save feature names
-        features = ['Age', 'Smoking Status', 'Area Air Quality Index', 'Alcohol Consumption',
-                   'BMI', 'Family History', 'Physical Activity Level', 'Occupation Exposure',
-                   'Age_Smoking', 'Smoking_AirQuality', 'BMI_Activity', 'Risk_Factor_Sum']
+        X, y, features = lung_training_data(seed)
         
         # Train model with improvements
-        model = train_model_with_improvements(X, y, 'lung_scaler.pkl', 'lung_model.h5', 'lung_model_features.pkl', features)
-        
-        return model
+        return train_model_with_improvements(X, y, *training_artifact_paths('lung', output_dir), features,
+                                             seed=seed, verbose=verbose, params=params)
         
-    except Exception as e:
-        print(f"Error training lung model: {str(e)}")
+    except Exception:
+        logger.exception("Error training lung model")
         raise ValueError("Error training lung disease model. Please check the training data.")
 
-# Global variables for lazy loading models
-heart_model = None
-heart_scaler = None
-liver_model = None
-liver_scaler = None
-diabetes_model = None
-diabetes_scaler = None
-lung_model = None
-lung_scaler = None
+# Model artifacts live in the project root; bundles in model_bundles/
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Calibration applied to raw network outputs (see calibrate_prediction);
+# stored in each bundle so a model always ships with the calibration it was validated with
+DEFAULT_CALIBRATION = {
+    'type': 'piecewise_linear',
+    'low_threshold': 0.2,
+    'low_slope': 1.3,
+    'high_threshold': 0.8,
+    'high_slope': 0.7,
+}
+
+def get_bundle_dir():
+    return Path(getattr(settings, 'ML_BUNDLE_DIR', BASE_DIR / 'model_bundles'))
+
+def get_bundle_path(name):
+    return get_bundle_dir() / f'{name}.bundle'
+
+def get_forest_bundle_path(name):
+    return get_bundle_dir() / f'{name}-forest.bundle'
+
+def get_cascade_path(name):
+    return get_bundle_dir() / f'{name}-cascade.json'
+
+def get_precision_record_path(name):
+    return get_bundle_dir() / f'{name}-precision.json'
+
+def get_served_bundle_path(name):
+    """The bundle load_model_artifacts reads for ``name`` per ML_MODEL_BACKEND, or None for the Keras backend"""
+    return get_backend(name).bundle_path()
+
+def get_legacy_paths(name):
+    return [BASE_DIR / f'{name}_model.h5', BASE_DIR / f'{name}_scaler.pkl']
+
+def artifact_fingerprint(name):
+    """(path, inode, size, mtime) of the files load_model_artifacts would read; changes when they are replaced"""
+    paths = get_backend(name).artifact_paths()
+    if get_cascade_margin(name) is not None:
+        paths = paths + [get_cascade_path(name)]
+    fingerprint = []
+    for artifact in paths:
+        try:
+            stat = os.stat(artifact)
+            fingerprint.append((str(artifact), stat.st_ino, stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            fingerprint.append((str(artifact), None, None, None))
+    return tuple(fingerprint)
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def build_bundle_from_artifacts(name, source_dir, path, precision='float32'):
+    """Write a bundle for the .h5 / scaler .pkl / features .pkl files that training produces"""
+    import joblib
+    scaler_path, model_path, features_path = training_artifact_paths(name, source_dir)
+    files = {'model': model_path, 'scaler': scaler_path, 'features': features_path}
+    network = DenseNetwork.from_h5(files['model']).with_precision(precision)
+    scaler = joblib.load(files['scaler'])
+    feature_names = list(joblib.load(files['features']))
+    return build_bundle(
+        path,
+        name,
+        network,
+        scaler.mean_,
+        scaler.scale_,
+        feature_names,
+        DEFAULT_CALIBRATION,
+        source={kind: {'file': os.path.basename(file), 'sha256': file_sha256(file)}
+                for kind, file in files.items()},
+    )
+
+def build_forest_bundle_from_pickle(name, source_dir, path):
+    """Flatten the RandomForest <name>_model.pkl (fitted on the scaled model inputs) into a forest bundle"""
+    import joblib
+    from .forest_inference import FlatForest
+    scaler_path, _, features_path = training_artifact_paths(name, source_dir)
+    forest_path = os.path.join(source_dir or '', f'{name}_model.pkl')
+    files = {'forest': forest_path, 'scaler': scaler_path, 'features': features_path}
+    forest = FlatForest.from_sklearn(joblib.load(forest_path))
+    scaler = joblib.load(scaler_path)
+    feature_names = list(joblib.load(features_path))
+    return build_forest_bundle(
+        path,
+        name,
+        forest,
+        scaler.mean_,
+        scaler.scale_,
+        feature_names,
+        DEFAULT_CALIBRATION,
+        source={kind: {'file': os.path.basename(file), 'sha256': file_sha256(file)}
+                for kind, file in files.items()},
+    )
+
+def parse_model_setting(value):
+    """A per-model setting as {model: value}: 'int8' applies to every model, 'heart=int8,lung=float16' per model"""
+    if isinstance(value, dict):
+        return dict(value)
+    value = (value or '').strip()
+    if not value:
+        return {}
+    if '=' not in value:
+        return {name: value for name in SCHEMAS}
+    precisions = {}
+    for item in value.split(','):
+        if item.strip():
+            name, _, precision = item.partition('=')
+            precisions[name.strip()] = precision.strip()
+    return precisions
+
+def get_model_precision(name):
+    """Weight storage precision for a served model; 'float32' serves the bundle as stored"""
+    precision = parse_model_setting(getattr(settings, 'ML_MODEL_PRECISION', '')).get(name, 'float32')
+    if precision not in PRECISIONS:
+        raise BundleError(f"ML_MODEL_PRECISION for {name} must be one of {', '.join(PRECISIONS)}, got '{precision}'")
+    return precision
+
+def precision_parity(name, precision, version):
+    """What 'check_reduced_precision --record' measured for ``version`` of a model at ``precision``, or None"""
+    try:
+        with open(get_precision_record_path(name)) as f:
+            record = json.load(f)
+    except FileNotFoundError:
+        return None
+    if record.get('model_version') != version:
+        return None
+    return record.get('precisions', {}).get(precision)
+
+def apply_model_precision(name, network, version):
+    """``network`` at the ML_MODEL_PRECISION of the model.
+
+    A reduced precision that check_reduced_precision measured outside its
+    tolerance for this model version is refused: the float32 weights are
+    served instead, so a precision setting never moves risk categories.
+    """
+    precision = get_model_precision(name)
+    if precision == 'float32' or network.precision == precision:
+        return network
+    if network.precision != 'float32':
+        raise BundleError(
+            f"the {name} weights are stored as {network.precision} but ML_MODEL_PRECISION asks for {precision}; "
+            f"rebuild the bundle at float32 or {precision}"
+        )
+    parity = precision_parity(name, precision, version)
+    if parity is None:
+        logger.warning("%s weights at %s have not been checked for version %s; run 'manage.py "
+                       "check_reduced_precision --record'", name, precision, version, extra={'model': name})
+    elif not parity['within_tolerance']:
+        logger.error("Serving %s at float32: at %s its risk moved by up to %.2f points with %d category flips",
+                     name, precision, parity['max_delta'], parity['flips'], extra={'model': name})
+        return network
+    return network.with_precision(precision)
+
+class ModelBackend:
+    """One way of serving a disease model: its weights, scaler and calibration behind a common interface.
+
+    ``load`` reads the artifacts, ``predict_proba_batch`` turns scaled feature
+    rows into raw positive-class probabilities, ``version`` identifies the
+    loaded weights and ``memory_footprint`` is the bytes they hold. ``predict``
+    returns the (n, 1) array the rest of the serving path expects from a model.
+    """
+
+    kind = None
+    precision = 'float32'
+
+    def __init__(self, name):
+        self.name = name
+        self.scaler = None
+        self.calibration = DEFAULT_CALIBRATION
+        self.bundle = None
+        self.source = None
+        self._version = None
+
+    def bundle_path(self):
+        return None
+
+    def artifact_paths(self):
+        """Files ``load`` reads, for artifact_fingerprint"""
+        return [self.bundle_path()]
+
+    def load(self):
+        raise NotImplementedError
+
+    def predict_proba_batch(self, X_scaled):
+        raise NotImplementedError
+
+    def memory_footprint(self):
+        raise NotImplementedError
+
+    def predict_proba_samples(self, X_scaled, samples, rng):
+        """(samples, n) raw probabilities with dropout active (Monte Carlo dropout), or None without dropout"""
+        return None
+
+    @property
+    def version(self):
+        return self._version
+
+    @property
+    def nbytes(self):
+        return self.memory_footprint()
+
+    def predict(self, X, verbose=0):
+        return np.asarray(self.predict_proba_batch(X), dtype=np.float64).reshape(-1, 1)
+
+    def load_bundle(self, path, bundle_backend):
+        bundle = ModelBundle.load(path)
+        if bundle.name != self.name:
+            raise BundleError(f"{path} contains the '{bundle.name}' model, expected '{self.name}'")
+        if bundle.calibration.get('type') != DEFAULT_CALIBRATION['type']:
+            raise BundleError(f"{path} uses unsupported calibration '{bundle.calibration.get('type')}'")
+        if bundle.feature_names != SCHEMAS[self.name].model_inputs:
+            raise BundleError(f"{path} feature order does not match the {self.name} feature schema")
+        if bundle.backend != bundle_backend:
+            raise BundleError(f"{path} holds a {bundle.backend} model, ML_MODEL_BACKEND asks for {self.kind}")
+        self.bundle = bundle
+        self.scaler = bundle.scaler
+        self.calibration = bundle.calibration
+        self.source = str(path)
+        self._version = bundle.version
+        return bundle
+
+    def load_legacy_scaler(self, scaler_path):
+        import joblib
+        scaler = joblib.load(scaler_path)
+        if scaler.n_features_in_ != len(SCHEMAS[self.name].model_inputs):
+            raise BundleError(f"{self.name}_scaler.pkl does not match the {self.name} feature schema")
+        self.scaler = scaler
+
+
+class NumpyBackend(ModelBackend):
+    """The networks evaluated with NumPy (DenseNetwork), from <name>.bundle or else the legacy .h5/.pkl files"""
+
+    kind = 'numpy'
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.network = None
+
+    @property
+    def precision(self):
+        return self.network.precision if self.network is not None else 'float32'
+
+    def bundle_path(self):
+        return get_bundle_path(self.name)
+
+    def artifact_paths(self):
+        path = self.bundle_path()
+        return [path] if path.exists() else get_legacy_paths(self.name)
+
+    def load(self):
+        path = self.bundle_path()
+        if path.exists():
+            network = self.load_bundle(path, 'network').network
+            self.network = apply_model_precision(self.name, network, self.version)
+        else:
+            # Legacy layout: separate .h5 and scaler .pkl files in the project root
+            model_path, scaler_path = get_legacy_paths(self.name)
+            self._version = 'legacy'
+            self.network = apply_model_precision(self.name, DenseNetwork.from_h5(model_path), self.version)
+            self.load_legacy_scaler(scaler_path)
+            self.source = 'legacy'
+        return self
+
+    def predict_proba_batch(self, X_scaled):
+        return self.network.predict(X_scaled)[:, 0]
+
+    def predict_proba_samples(self, X_scaled, samples, rng):
+        if not self.network.has_dropout:
+            return None
+        return self.network.predict_samples(X_scaled, samples, rng)[:, :, 0]
+
+    def memory_footprint(self):
+        if self.bundle is not None and self.network is self.bundle.network:
+            return self.bundle.nbytes
+        return self.network.nbytes
+
+
+class ForestBackend(ModelBackend):
+    """The RandomForest <name>_model.pkl flattened into <name>-forest.bundle (FlatForest)"""
+
+    kind = 'forest'
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.forest = None
+
+    def bundle_path(self):
+        return get_forest_bundle_path(self.name)
+
+    def load(self):
+        path = self.bundle_path()
+        if not path.exists():
+            raise BundleError(f"{path} does not exist; build it with 'manage.py build_model_bundles --forest {self.name}'")
+        self.forest = self.load_bundle(path, 'forest').network
+        return self
+
+    def predict_proba_batch(self, X_scaled):
+        return self.forest.predict(X_scaled)[:, 0]
+
+    def memory_footprint(self):
+        return self.bundle.nbytes
+
+
+class KerasBackend(ModelBackend):
+    """The trained <name>_model.h5 network run by TensorFlow, with <name>_scaler.pkl.
+
+    Imports TensorFlow on first load; meant for comparing against the NumPy
+    copies and for networks with layers DenseNetwork doesn't implement.
+    """
+
+    kind = 'keras'
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.keras_model = None
+
+    def artifact_paths(self):
+        return get_legacy_paths(self.name)
+
+    def load(self):
+        import tensorflow as tf
+        model_path, scaler_path = get_legacy_paths(self.name)
+        self.keras_model = tf.keras.models.load_model(model_path, compile=False)
+        self.load_legacy_scaler(scaler_path)
+        self.source = str(model_path)
+        self._version = f'keras-{file_sha256(model_path)[:12]}'
+        return self
+
+    def predict_proba_batch(self, X_scaled):
+        # Calling the model directly skips predict()'s per-call dataset setup, which dominates small batches
+        output = self.keras_model(np.asarray(X_scaled, dtype=np.float32), training=False)
+        return np.asarray(output, dtype=np.float64)[:, 0]
+
+    def predict_proba_samples(self, X_scaled, samples, rng):
+        # Keras draws the masks from its own seed generator; rng is not used
+        if not any(type(layer).__name__ == 'Dropout' for layer in self.keras_model.layers):
+            return None
+        X_scaled = np.asarray(X_scaled, dtype=np.float32)
+        output = self.keras_model(np.tile(X_scaled, (samples, 1)), training=True)
+        return np.asarray(output, dtype=np.float64)[:, 0].reshape(samples, len(X_scaled))
+
+    def memory_footprint(self):
+        return int(sum(weight.nbytes for weight in self.keras_model.get_weights()))
+
+
+# Serving backends, chosen per model with ML_MODEL_BACKEND
+MODEL_BACKENDS = {backend.kind: backend for backend in (NumpyBackend, KerasBackend, ForestBackend)}
+
+def get_model_backend(name):
+    """Serving backend for a model from ML_MODEL_BACKEND ('forest', or 'heart=forest,lung=keras'); default 'numpy'"""
+    backend = parse_model_setting(getattr(settings, 'ML_MODEL_BACKEND', '')).get(name, 'numpy')
+    if backend not in MODEL_BACKENDS:
+        raise BundleError(f"ML_MODEL_BACKEND for {name} must be one of {', '.join(MODEL_BACKENDS)}, got '{backend}'")
+    return backend
+
+def forest_bundle_problem(name):
+    """Why <name>-forest.bundle can't serve the model, or None if it can"""
+    path = get_forest_bundle_path(name)
+    if not path.exists():
+        return f"{path} does not exist; build it with 'manage.py build_model_bundles --forest {name}'"
+    try:
+        header = read_bundle_header(path)
+    except (BundleError, OSError, ValueError) as e:
+        return str(e)
+    if header.get('name') != name or header.get('backend') != 'forest':
+        return f"{path} does not hold a forest for the {name} model"
+    if header.get('feature_names') != SCHEMAS[name].model_inputs:
+        return f"{path} was built for {len(header.get('feature_names') or [])} features that don't match the {name} schema"
+    return None
+
+# Models whose ML_MODEL_BACKEND=forest was refused, so the error is logged once
+_refused_forest_models = set()
+
+def get_backend(name, kind=None):
+    """An unloaded ModelBackend for ``name``: ``kind``, or the one ML_MODEL_BACKEND selects.
+
+    A forest selected by ML_MODEL_BACKEND whose bundle is missing or doesn't
+    match the schema is refused and the model is served by the NumPy network.
+    """
+    if kind is None:
+        kind = get_model_backend(name)
+        if kind == 'forest':
+            problem = forest_bundle_problem(name)
+            if problem is not None:
+                if name not in _refused_forest_models:
+                    _refused_forest_models.add(name)
+                    logger.error("Serving %s with the numpy backend instead of forest: %s", name, problem,
+                                 extra={'model': name})
+                kind = 'numpy'
+    return MODEL_BACKENDS[kind](name)
+
+class CascadeBackend(ModelBackend):
+    """A LogisticScreen in front of another backend.
+
+    The screen scores every row; rows whose calibrated risk is more than
+    ``margin`` percentage points from both category thresholds keep the
+    screen's probability, the rest are rescored by the full backend.
+    """
+
+    def __init__(self, full, screen, margin, stats):
+        super().__init__(full.name)
+        self.full = full
+        self.screen = screen
+        self.margin = float(margin)
+        self.stats = stats
+        self.kind = f'{full.kind}+cascade'
+        self.scaler = full.scaler
+        self.calibration = full.calibration
+        self.bundle = full.bundle
+        self.source = full.source
+        self._version = full.version
+
+    @property
+    def precision(self):
+        return self.full.precision
+
+    def artifact_paths(self):
+        return self.full.artifact_paths() + [get_cascade_path(self.name)]
+
+    def predict_proba_batch(self, X_scaled):
+        X_scaled = np.asarray(X_scaled)
+        probabilities = self.screen.predict_proba_batch(X_scaled)
+        risk = np.round(calibrate_predictions(probabilities, self.calibration) * 100, 2)
+        escalate = threshold_distance(risk) <= self.margin
+        escalated = int(escalate.sum())
+        if escalated:
+            probabilities[escalate] = self.full.predict_proba_batch(X_scaled[escalate])
+        self.stats.record(len(probabilities), escalated)
+        return probabilities
+
+    def predict_proba_samples(self, X_scaled, samples, rng):
+        # Uncertainty always comes from the full model
+        return self.full.predict_proba_samples(X_scaled, samples, rng)
+
+    def memory_footprint(self):
+        return self.full.memory_footprint() + self.screen.nbytes
+
+
+def get_cascade_margin(name):
+    """Cascade margin for a model from ML_CASCADE_MARGIN, in risk percentage points.
+
+    None leaves the model uncascaded; 'auto' uses the margin stored with the screen.
+    """
+    setting = parse_model_setting(getattr(settings, 'ML_CASCADE_MARGIN', '')).get(name, '')
+    if setting in ('', 'off'):
+        return None
+    if setting == 'auto':
+        return setting
+    try:
+        margin = float(setting)
+    except ValueError:
+        margin = None
+    if margin is None or not 0.0 <= margin <= 100.0:
+        raise BundleError(f"ML_CASCADE_MARGIN for {name} must be 'auto', 'off' or percentage points, got '{setting}'")
+    return margin
+
+# Short-circuit counters per model, kept across reloads
+_cascade_stats = {}
+_cascade_stats_lock = threading.Lock()
+
+def get_cascade_stats():
+    """How often each cascaded model answered from its screen"""
+    return {name: stats.stats() for name, stats in _cascade_stats.items()}
+
+def with_cascade(backend):
+    """``backend`` behind its screen when ML_CASCADE_MARGIN asks for one and the screen matches it"""
+    name = backend.name
+    margin = get_cascade_margin(name)
+    if margin is None:
+        return backend
+    path = get_cascade_path(name)
+    if not path.exists():
+        raise BundleError(f"{path} does not exist; build it with 'manage.py build_cascade_models {name}'")
+    screen = LogisticScreen.load(path)
+    if screen.name != name or screen.input_dim != len(SCHEMAS[name].model_inputs):
+        raise BundleError(f"{path} does not hold a screen for the {name} model inputs")
+    if screen.distilled_from != backend.version:
+        # A screen only vouches for the model it was distilled from
+        logger.warning("Cascade screen for %s was distilled from version %s, not %s; serving without the cascade",
+                       name, screen.distilled_from, backend.version, extra={'model': name})
+        return backend
+    if margin == 'auto':
+        if screen.margin is None:
+            raise BundleError(f"{path} has no stored margin; set ML_CASCADE_MARGIN for {name} to a number")
+        margin = screen.margin
+    with _cascade_stats_lock:
+        stats = _cascade_stats.setdefault(name, CascadeStats())
+    return CascadeBackend(backend, screen, margin, stats)
+
+# Results of recent single-row predictions, keyed by disease, model version and feature vector
+prediction_cache = PredictionCache(
+    maxsize=getattr(settings, 'ML_PREDICTION_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'ML_PREDICTION_CACHE_TTL', None),
+)
+
+def load_model_artifacts(name):
+    """Load a disease model from disk through the backend ML_MODEL_BACKEND selects for it"""
+    # Taken before reading, so a file replaced mid-load shows up as changed on the next poll
+    fingerprint = artifact_fingerprint(name)
+    try:
+        backend = with_cascade(get_backend(name).load())
+        loaded = LoadedModel(name, backend, backend.scaler, backend.version, backend.calibration,
+                             bundle=backend.bundle, source=backend.source)
+    except BundleError as e:
+        raise RuntimeError(f"The {name} model bundle is invalid: {e}") from e
+    except Exception as e:
+        raise RuntimeError(f"Pretrained {name} model files are missing. Please upload them.") from e
+
+    loaded.fingerprint = fingerprint
+    prediction_cache.invalidate(name)
+    logger.info("Successfully loaded %s model (version %s, %s backend)", name, loaded.version, backend.kind,
+                extra={'model': name, 'model_version': loaded.version, 'model_backend': backend.kind})
+    return loaded
+
+MODEL_NAMES = list(SCHEMAS)
+
+# Loads every model at most once per process, even with threaded workers
+model_registry = ModelRegistry(
+    {name: partial(load_model_artifacts, name) for name in MODEL_NAMES},
+    retry_backoff=getattr(settings, 'ML_LOAD_RETRY_BACKOFF', 1.0),
+    max_retry_backoff=getattr(settings, 'ML_LOAD_MAX_RETRY_BACKOFF', 60.0),
+)
 
 def load_heart_model():
     """Lazy load heart disease model"""
-    global heart_model, heart_scaler
-    if heart_model is None or heart_scaler is None:
-        try:
-            heart_model = load_model('heart_model.h5', compile=False)
-            heart_scaler = joblib.load('heart_scaler.pkl')
-            print("Successfully loaded heart model")
-        except Exception as e:
-            raise RuntimeError("Pretrained heart model files are missing. Please upload them.") from e
-    return heart_model, heart_scaler
+    loaded = model_registry.get('heart')
+    return loaded.model, loaded.scaler
 
 def load_liver_model():
     """Lazy load liver disease model"""
-    global liver_model, liver_scaler
-    if liver_model is None or liver_scaler is None:
-        try:
-            liver_model = load_model('liver_model.h5', compile=False)
-            liver_scaler = joblib.load('liver_scaler.pkl')
-            print("Successfully loaded liver model")
-        except Exception as e:
-            raise RuntimeError("Pretrained liver model files are missing. Please upload them.") from e
-    return liver_model, liver_scaler
+    loaded = model_registry.get('liver')
+    return loaded.model, loaded.scaler
 
 def load_diabetes_model():
     """Lazy load diabetes model"""
-    global diabetes_model, diabetes_scaler
-    if diabetes_model is None or diabetes_scaler is None:
-        try:
-            diabetes_model = load_model('diabetes_model.h5', compile=False)
-            diabetes_scaler = joblib.load('diabetes_scaler.pkl')
-            print("Successfully loaded diabetes model")
-        except Exception as e:
-            raise RuntimeError("Pretrained diabetes model files are missing. Please upload them.") from e
-    return diabetes_model, diabetes_scaler
+    loaded = model_registry.get('diabetes')
+    return loaded.model, loaded.scaler
 
 def load_lung_model():
     """Lazy load lung disease model"""
-    global lung_model, lung_scaler
-    if lung_model is None or lung_scaler is None:
+    loaded = model_registry.get('lung')
+    return loaded.model, loaded.scaler
+
+# Micro-batchers, one per disease model, created on first use
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+def microbatching_enabled():
+    return getattr(settings, 'ML_MICROBATCH_ENABLED', False)
+
+def get_batcher(name):
+    """Return the micro-batcher for a disease model, creating it on first use"""
+    batcher = _batchers.get(name)
+    if batcher is None:
+        with _batchers_lock:
+            batcher = _batchers.get(name)
+            if batcher is None:
+                batcher = MicroBatcher(
+                    name,
+                    lambda model, X: model.predict(X),
+                    max_batch_size=getattr(settings, 'ML_MICROBATCH_MAX_BATCH_SIZE', 32),
+                    max_wait_ms=getattr(settings, 'ML_MICROBATCH_MAX_WAIT_MS', 2.0),
+                    timeout=getattr(settings, 'ML_MICROBATCH_TIMEOUT', 5.0),
+                )
+                _batchers[name] = batcher
+    return batcher
+
+def get_microbatch_stats():
+    """Queue depth and batch size statistics for every active micro-batcher"""
+    return {name: batcher.stats() for name, batcher in _batchers.items()}
+
+def run_model(name, model, scaled_features):
+    """Forward pass for a disease model, coalesced with other callers when micro-batching is on.
+
+    ``model`` is the caller's loaded model, the one its features were scaled
+    for; the batch runs on it even if a reload has swapped the registry since.
+    """
+    if microbatching_enabled() and len(scaled_features) == 1:
         try:
-            lung_model = load_model('lung_model.h5', compile=False)
-            lung_scaler = joblib.load('lung_scaler.pkl')
-            print("Successfully loaded lung model")
-        except Exception as e:
-            raise RuntimeError("Pretrained lung model files are missing. Please upload them.") from e
-    return lung_model, lung_scaler
-
-def calibrate_prediction(raw_prediction):
-    if raw_prediction > 0.8:
+            return np.asarray([get_batcher(name).submit(scaled_features[0], model)])
+        except TimeoutError:
+            logger.warning("Micro-batch for %s timed out; predicting directly", name, extra={'disease': name})
+    return model.predict(scaled_features)
+
+def calibrate_prediction(raw_prediction, calibration=DEFAULT_CALIBRATION):
+    high = calibration['high_threshold']
+    low = calibration['low_threshold']
+    if raw_prediction > high:
         # High predictions are slightly reduced to avoid overconfidence
-        return 0.8 + (raw_prediction - 0.8) * 0.7
-    elif raw_prediction < 0.2:
+        return high + (raw_prediction - high) * calibration['high_slope']
+    elif raw_prediction < low:
         # Low predictions are slightly increased to avoid underestimation
-        return raw_prediction * 1.3
+        return raw_prediction * calibration['low_slope']
     else:
         # Mid-range predictions are kept as is
         return raw_prediction
 
+def calibrate_predictions(raw_predictions, calibration=DEFAULT_CALIBRATION):
+    """Vectorized calibrate_prediction"""
+    raw = np.asarray(raw_predictions, dtype=np.float64)
+    high = calibration['high_threshold']
+    low = calibration['low_threshold']
+    return np.where(
+        raw > high,
+        high + (raw - high) * calibration['high_slope'],
+        np.where(raw < low, raw * calibration['low_slope'], raw),
+    )
+
+def score_features(loaded, features):
+    """Scale, score, calibrate and categorise one engineered feature vector.
+
+    Identical inputs for the same model version are answered from prediction_cache.
+    """
+    name = loaded.name
+    cache_key = (name, loaded.version, canonical_feature_key(features))
+    cached = prediction_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    with stage('scale'):
+        scaled_features = loaded.scaler.transform(np.asarray(features, dtype=np.float64).reshape(1, -1))
+    with stage('predict'):
+        prediction = run_model(name, loaded.model, scaled_features)
+
+    raw_prediction = float(prediction[0][0])
+    calibrated_prediction = calibrate_prediction(raw_prediction, loaded.calibration)
+
+    risk_percentage = round(calibrated_prediction * 100, 2)
+    category = get_risk_category(risk_percentage)
+    advice = get_health_advice(category)
+
+    result = (risk_percentage, category, advice)
+    prediction_cache.set(cache_key, result)
+    return result
+
+def get_prediction_cache_stats():
+    return prediction_cache.stats()
+
+def predict_single(name, features):
+    """Score one patient from raw form values (or an already engineered feature list)"""
+    schema = SCHEMAS[name]
+    set_disease(name)
+    with stage('model_load'):
+        loaded = model_registry.get(name)
+
+    if len(features) == schema.raw_count:
+        with stage('engineer'), np.errstate(divide='ignore', invalid='ignore'):
+            engineered = schema.engineer_row(features)
+    elif len(features) == len(schema.model_inputs):
+        engineered = np.asarray(features, dtype=np.float64)
+    else:
+        raise ValueError(f"Expected {schema.raw_count} {name} features, got {len(features)}")
+    if not np.isfinite(engineered).all():
+        raise ValueError(f"Input values produce invalid {name} features")
+
+    return score_features(loaded, engineered)
+
 def predict_lung_disease(features):
-    # Lazy load model and scaler
-    model, scaler = load_lung_model()
-    
     try:
-        # Convert input features to appropriate types
-        age = float(features[0])
-        smoking = int(features[1])
-        air_quality = float(features[2])
-        alcohol = int(features[3])
-        bmi = float(features[4])
-        family_history = int(features[5])
-        activity = int(features[6])
-        occupation = int(features[7])
-        
-        # Create engineered features with adjusted weights
-        age_smoking = age * smoking * 2
-        smoking_air_quality = smoking * air_quality / 100
-        bmi_activity = bmi / (activity + 1)
-        risk_factor_sum = (smoking * 2 + 
-                          family_history * 1.5 + 
-                          occupation * 1.5 + 
-                          alcohol * 1)
-        
-        # Combine all features in the same order as training (12 features)
-        features_array = np.array([[
-            age, smoking, air_quality, alcohol, bmi, family_history, 
-            activity, occupation, age_smoking, smoking_air_quality, 
-            bmi_activity, risk_factor_sum
-        ]])
-        
-        # Scale features
-        scaled_features = scaler.transform(features_array)
-        
-        # Make prediction
-        prediction = model.predict(scaled_features)
-        raw_prediction = float(prediction[0][0])
-        calibrated_prediction = calibrate_prediction(raw_prediction)
-        
-        # Calculate risk metrics
-        risk_percentage = round(calibrated_prediction * 100, 2)
-        category = get_risk_category(risk_percentage)
-        advice = get_health_advice(category)
-        
-        return risk_percentage, category, advice
-        
+        return predict_single('lung', features)
+    except ValueError:
+        # Bad input, not a bad model
+        raise
     except Exception as e:
-        print(f"Error in lung disease prediction: {str(e)}")
-        # If prediction fails, retrain the model and try again
+        logger.exception("Error in lung disease prediction")
+        # Retraining takes minutes, so it runs in the background job runner
+        # ('manage.py run_training_jobs') rather than inside this request
+        from .training_jobs import enqueue_training
         try:
-            print("Retraining lung model...")
-            lung_model = train_lung_model()
-            lung_scaler = joblib.load('lung_scaler.pkl')
-            return predict_lung_disease(features)  # Try prediction again
-        except Exception as retrain_error:
-            raise ValueError(f"Error in lung disease prediction after retraining: {str(retrain_error)}")
+            job = enqueue_training('lung', reason=str(e))
+            logger.warning("Queued lung model retraining (job %s)", job.pk, extra={'job_id': job.pk})
+        except Exception:
+            logger.exception("Could not queue lung model retraining")
+        raise RuntimeError("The lung disease model is unavailable. It is being retrained, please try again later.") from e
 
 # Liver Disease Prediction Model
-def train_liver_model():
-    df = pd.read_csv('HealthOracle/indian_liver_patient.csv')
-    df['Gender'] = (df['Gender'] == 'Male').astype(int)
+def liver_training_data(seed=42):
+    from .datasets import load_dataset
+    data, _ = load_dataset('liver')
     
     # Handle missing values if any
-    df = df.fillna(df.median())
-    
-    # Feature engineering for liver disease
-    df['Age_Gender'] = df['Age'] * df['Gender']  # Interaction between age and gender
-    df['Bilirubin_Ratio'] = df['Direct_Bilirubin'] / (df['Total_Bilirubin'] + 0.001)  # Ratio of direct to total bilirubin
-    df['Enzyme_Ratio'] = df['Aspartate_Aminotransferase'] / (df['Alamine_Aminotransferase'] + 0.001)  # AST/ALT ratio
-    df['Protein_Ratio'] = df['Albumin'] / (df['Total_Protiens'] + 0.001)  # Albumin to total protein ratio
-    df['Liver_Score'] = (df['Total_Bilirubin'] + df['Direct_Bilirubin']) * df['Enzyme_Ratio']  # Combined liver score
+    for values in data.values():
+        values[np.isnan(values)] = np.nanmedian(values)
     
-    features = ['Age', 'Gender', 'Total_Bilirubin', 'Direct_Bilirubin', 'Alkaline_Phosphotase',
-                'Alamine_Aminotransferase', 'Aspartate_Aminotransferase', 'Total_Protiens',
-                'Albumin', 'Albumin_and_Globulin_Ratio', 'Age_Gender', 'Bilirubin_Ratio', 
-                'Enzyme_Ratio', 'Protein_Ratio', 'Liver_Score']
-    
-    X = df[features].values
-    y = (df['Dataset'] == 1).astype(int).values
+    # Feature engineering for liver disease, shared with serving
+    X, features = engineer_training_features('liver', data)
+    y = (data['Dataset'] == 1).astype(int)
+    return X, y, features
+
+def train_liver_model(output_dir=None, seed=42, verbose=1, params=None):
+    X, y, features = liver_training_data(seed)
     
     # Train model with improvements
-    return train_model_with_improvements(X, y, 'liver_scaler.pkl', 'liver_model.h5', 'liver_model_features.pkl', features)
+    return train_model_with_improvements(X, y, *training_artifact_paths('liver', output_dir), features,
+                                         seed=seed, verbose=verbose, params=params)
 
 # Diabetes Prediction Model
-def train_diabetes_model():
-    url = "https://raw.githubusercontent.com/jbrownlee/Datasets/master/pima-indians-diabetes.data.csv"
-    column_names = ["Pregnancies", "Glucose", "BloodPressure", "SkinThickness", "Insulin", 
-                     "BMI", "DiabetesPedigreeFunction", "Age", "Outcome"]
-    data = pd.read_csv(url, names=column_names)
+def diabetes_training_data(seed=42):
+    from .datasets import load_dataset
+    data, _ = load_dataset('diabetes')
     
     # Handle missing values (zeros in some columns are likely missing values)
     for column in ['Glucose', 'BloodPressure', 'SkinThickness', 'Insulin', 'BMI']:
-        data[column] = data[column].replace(0, np.nan)
-        data[column] = data[column].fillna(data[column].median())
+        values = data[column]
+        values[values == 0] = np.nan
+        values[np.isnan(values)] = np.nanmedian(values)
     
-    # Feature engineering for diabetes
-    data['Glucose_BMI'] = data['Glucose'] * data['BMI'] / 100  # Interaction between glucose and BMI
-    data['Age_BMI'] = data['Age'] * data['BMI'] / 100  # Age adjusted for BMI
-    data['Glucose_Insulin'] = data['Glucose'] / (data['Insulin'] + 1)  # Glucose to insulin ratio
-    data['Preg_Age'] = data['Pregnancies'] / (data['Age'] + 1)  # Pregnancies adjusted for age
-    data['Risk_Score'] = data['Glucose'] / 100 + data['BMI'] / 30 + data['Age'] / 50  # Combined risk score
-    
-    features = ['Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness', 'Insulin',
-                'BMI', 'DiabetesPedigreeFunction', 'Age', 'Glucose_BMI', 'Age_BMI',
-                'Glucose_Insulin', 'Preg_Age', 'Risk_Score']
-    
-    X = data[features].values
-    y = data['Outcome'].values
+    # Feature engineering for diabetes, shared with serving
+    X, features = engineer_training_features('diabetes', data)
+    y = data['Outcome'].astype(int)
+    return X, y, features
+
+def train_diabetes_model(output_dir=None, seed=42, verbose=1, params=None):
+    X, y, features = diabetes_training_data(seed)
     
     # Train model with improvements
-    return train_model_with_improvements(X, y, 'diabetes_scaler.pkl', 'diabetes_model.h5', 'diabetes_model_features.pkl', features)
+    return train_model_with_improvements(X, y, *training_artifact_paths('diabetes', output_dir), features,
+                                         seed=seed, verbose=verbose, params=params)
+
+# (X, y, feature names) per model, as used by train_<name>_model
+TRAINING_DATA = {
+    'heart': heart_training_data,
+    'lung': lung_training_data,
+    'liver': liver_training_data,
+    'diabetes': diabetes_training_data,
+}
 
 # Prediction Functions with calibration
 def predict_heart_disease(features):
-    # Lazy load model and scaler
-    model, scaler = load_heart_model()
-    
-    try:
-        feature_names = joblib.load('heart_model_features.pkl')
-        
-        if len(features) == 13:  # Original features count
-            age, sex, cp, trestbps, chol, fbs, restecg, thalach, exang, oldpeak, slope, ca, thal = features
-            
-            # Create engineered features
-            age_sex = age * sex
-            chol_age = chol / age
-            trestbps_chol = trestbps * chol / 10000
-            exang_oldpeak = exang * oldpeak
-            risk_factors = fbs + exang
-            
-            # Combine all features
-            features = features + [age_sex, chol_age, trestbps_chol, exang_oldpeak, risk_factors]
-    except:
-        pass
-    
-    scaled_features = scaler.transform([features])
-    prediction = model.predict(scaled_features)
-    
-    raw_prediction = float(prediction[0][0])
-    calibrated_prediction = calibrate_prediction(raw_prediction)
-    
-    risk_percentage = round(calibrated_prediction * 100, 2)
-    category = get_risk_category(risk_percentage)
-    advice = get_health_advice(category)
-    
-    return risk_percentage, category, advice
+    return predict_single('heart', features)
 
 def predict_liver_disease(features):
-    # Lazy load model and scaler
-    model, scaler = load_liver_model()
-    
-    try:
-        feature_names = joblib.load('liver_model_features.pkl')
-        
-        if len(features) == 10:  # Original features count
-            age, gender, total_bili, direct_bili, alk_phos, alt, ast, total_proteins, albumin, ag_ratio = features
-            
-            # Create engineered features
-            age_gender = age * gender
-            bili_ratio = direct_bili / (total_bili + 0.001)
-            enzyme_ratio = ast / (alt + 0.001)
-            protein_ratio = albumin / (total_proteins + 0.001)
-            liver_score = (total_bili + direct_bili) * enzyme_ratio
-            
-            # Combine all features
-            features = features + [age_gender, bili_ratio, enzyme_ratio, protein_ratio, liver_score]
-    except:
-        pass
-    
-    scaled_features = scaler.transform([features])
-    prediction = model.predict(scaled_features)
-    
-    raw_prediction = float(prediction[0][0])
-    calibrated_prediction = calibrate_prediction(raw_prediction)
-    
-    risk_percentage = round(calibrated_prediction * 100, 2)
-    category = get_risk_category(risk_percentage)
-    advice = get_health_advice(category)
-    
-    return risk_percentage, category, advice
+    return predict_single('liver', features)
 
 def predict_diabetes(features):
-    # Lazy load model and scaler
-    model, scaler = load_diabetes_model()
-    
-    try:
-        feature_names = joblib.load('diabetes_model_features.pkl')
-        
-        if len(features) == 8:  # Original features count
-            pregnancies, glucose, blood_pressure, skin_thickness, insulin, bmi, pedigree, age = features
-            
-            # Create engineered features
-            glucose_bmi = glucose * bmi / 100
-            age_bmi = age * bmi / 100
-            glucose_insulin = glucose / (insulin + 1)
-            preg_age = pregnancies / (age + 1)
-            risk_score = glucose / 100 + bmi / 30 + age / 50
-            
-            # Combine all features
-            features = features + [glucose_bmi, age_bmi, glucose_insulin, preg_age, risk_score]
-    except:
-        pass
-    
-    scaled_features = scaler.transform([features])
-    prediction = model.predict(scaled_features)
-    
-    raw_prediction = float(prediction[0][0])
-    calibrated_prediction = calibrate_prediction(raw_prediction)
-    
-    risk_percentage = round(calibrated_prediction * 100, 2)
-    category = get_risk_category(risk_percentage)
-    advice = get_health_advice(category)
-    
-    return risk_percentage, category, advice
+    return predict_single('diabetes', features)
+
+# Batch prediction
+def predict_batch(name, X):
+    """Score an (n, k) array of raw inputs for one disease model in a single pass.
+
+    Returns (risk_percentages, categories, advice) as arrays of length n.
+    """
+    set_disease(name)
+    with stage('model_load'):
+        loaded = model_registry.get(name)
+    with stage('engineer'), np.errstate(divide='ignore', invalid='ignore'):
+        features = SCHEMAS[name].engineer(X)
+    invalid_rows = np.flatnonzero(~np.isfinite(features).all(axis=1))
+    if invalid_rows.size:
+        raise ValueError(f"Inputs produce invalid {name} features in rows: {invalid_rows[:20].tolist()}")
+    with stage('scale'):
+        scaled_features = loaded.scaler.transform(features)
+    with stage('predict'):
+        raw_predictions = loaded.model.predict_proba_batch(scaled_features)
+
+    risk_percentages = np.round(calibrate_predictions(raw_predictions, loaded.calibration) * 100, 2)
+    codes = get_risk_category_codes(risk_percentages)
+    return risk_percentages, RISK_CATEGORIES[codes], HEALTH_ADVICE[codes]
+
+def uncertainty_enabled():
+    return getattr(settings, 'ML_UNCERTAINTY_ENABLED', False)
+
+def risk_intervals(loaded, scaled_features, risk_percentages, samples=None, level=None):
+    """Monte Carlo dropout interval for each scaled row: an (n, 2) array of (low, high) risk percentages.
+
+    The central ``level`` interval of the calibrated risk over ``samples``
+    dropout passes, widened where needed to contain the served (dropout-free)
+    risk. The masks are seeded from the inputs, so repeating a request gives
+    the same intervals. None when the served model has no dropout.
+    """
+    samples = samples or getattr(settings, 'ML_UNCERTAINTY_SAMPLES', 100)
+    level = level or getattr(settings, 'ML_UNCERTAINTY_LEVEL', 0.9)
+    rng = np.random.default_rng(zlib.crc32(np.ascontiguousarray(scaled_features, dtype=np.float64).tobytes()))
+    raw_samples = loaded.model.predict_proba_samples(scaled_features, samples, rng)
+    if raw_samples is None:
+        return None
+    risk_samples = calibrate_predictions(raw_samples, loaded.calibration) * 100
+    low, high = np.percentile(risk_samples, [50 * (1 - level), 50 * (1 + level)], axis=0)
+    risk = np.asarray(risk_percentages, dtype=np.float64)
+    return np.round(np.column_stack([np.minimum(low, risk), np.maximum(high, risk)]), 2)
+
+def predict_interval(name, X, risk_percentages):
+    """risk_intervals for raw input rows X whose risks were already computed, e.g. by predict_batch"""
+    loaded = model_registry.get(name)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        features = SCHEMAS[name].engineer(np.asarray(X, dtype=np.float64).reshape(-1, SCHEMAS[name].raw_count))
+    with stage('uncertainty'):
+        return risk_intervals(loaded, loaded.scaler.transform(features), risk_percentages)
+
+def sweep_values(loaded, field_index, low=None, high=None, steps=50):
+    """Values one raw input takes in a what-if sweep.
+
+    Yes/no and male/female fields take both values. Other fields take
+    ``steps`` evenly spaced values from ``low`` to ``high``, which default to
+    two training standard deviations either side of the training mean (never
+    below zero); integer fields are rounded, dropping repeats.
+    """
+    field = SCHEMAS[loaded.name].fields[field_index]
+    if field.display is not None:
+        return np.array([0.0, 1.0])
+    mean = float(loaded.scaler.mean_[field_index])
+    scale = float(loaded.scaler.scale_[field_index])
+    low = max(mean - 2 * scale, 0.0) if low is None else float(low)
+    high = mean + 2 * scale if high is None else float(high)
+    if not np.isfinite([low, high]).all() or low > high:
+        raise ValueError(f"Invalid range for {field.name}: {low} to {high}")
+    values = np.linspace(low, high, steps)
+    if field.dtype is int:
+        values = np.unique(np.rint(values))
+    return values
+
+def predict_surface(name, base_values, axes):
+    """Risk surface over a grid of one or two raw inputs, every other input held at ``base_values``.
+
+    ``axes`` is a list of (field name, low, high, steps); see sweep_values.
+    The whole grid is built as one (rows, raw_count) array, engineered and
+    scored in a single batched pass. Returns the values of each axis and a
+    risk-percentage array shaped like the grid, NaN where the inputs give
+    invalid features (a ratio over zero, say).
+    """
+    schema = SCHEMAS[name]
+    set_disease(name)
+    with stage('model_load'):
+        loaded = model_registry.get(name)
+
+    indices = []
+    for field_name, _, _, _ in axes:
+        if field_name not in schema.field_names:
+            raise ValueError(f"Unknown {name} field: {field_name}")
+        if schema.field_names.index(field_name) in indices:
+            raise ValueError(f"{field_name} can only be swept once")
+        indices.append(schema.field_names.index(field_name))
+    axis_values = [sweep_values(loaded, index, low, high, steps) for index, (_, low, high, steps) in zip(indices, axes)]
+    shape = tuple(len(values) for values in axis_values)
+
+    with stage('engineer'):
+        X = np.empty((int(np.prod(shape)), schema.raw_count), dtype=np.float64)
+        X[:] = np.asarray(base_values, dtype=np.float64)
+        for index, column in zip(indices, np.meshgrid(*axis_values, indexing='ij')):
+            X[:, index] = column.ravel()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            features = schema.engineer(X)
+        valid = np.isfinite(features).all(axis=1)
+    risk = np.full(len(X), np.nan)
+    if not valid.any():
+        return axis_values, risk.reshape(shape)
+    with stage('scale'):
+        scaled_features = loaded.scaler.transform(features[valid])
+    with stage('predict'):
+        raw_predictions = loaded.model.predict_proba_batch(scaled_features)
+    risk[valid] = np.round(calibrate_predictions(raw_predictions, loaded.calibration) * 100, 2)
+    return axis_values, risk.reshape(shape)
+
+def predict_heart_disease_batch(X):
+    return predict_batch('heart', X)
+
+def predict_liver_disease_batch(X):
+    return predict_batch('liver', X)
+
+def predict_diabetes_batch(X):
+    return predict_batch('diabetes', X)
+
+def predict_lung_disease_batch(X):
+    return predict_batch('lung', X)
@@ -0,0 +1,268 @@
+import hashlib
+import json
+import os
+import struct
+import tempfile
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .forest_inference import FOREST_ARRAYS, FlatForest
+from .numpy_inference import DenseNetwork, ReducedPrecisionNetwork
+
+# File layout:
+#   8 bytes   magic
+#   4 bytes   format version (little-endian uint32)
+#   4 bytes   reserved
+#   8 bytes   header length (little-endian uint64)
+#   header    UTF-8 JSON (metadata plus name/dtype/shape/offset of every array)
+#   payload   raw little-endian arrays, each starting on an ALIGNMENT boundary
+BUNDLE_MAGIC = b'HOBUNDLE'
+BUNDLE_FORMAT_VERSION = 1
+ALIGNMENT = 64
+_PREFIX = struct.Struct('<8sII Q')
+
+# Header keys added by write_bundle, excluded from the content hash
+_GENERATED_KEYS = ('format_version', 'content_sha256', 'model_version', 'created', 'arrays')
+
+
+class BundleError(Exception):
+    pass
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _content_hash(arrays, metadata):
+    digest = hashlib.sha256()
+    digest.update(json.dumps(metadata, sort_keys=True).encode('utf-8'))
+    for name in sorted(arrays):
+        array = arrays[name]
+        digest.update(name.encode('utf-8'))
+        digest.update(array.dtype.str.encode('ascii'))
+        digest.update(str(array.shape).encode('ascii'))
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+
+def write_bundle(path, arrays, metadata):
+    """Write arrays and JSON metadata to a single bundle file.
+
+    The file is written next to ``path`` and moved into place with
+    ``os.replace``, so readers never see a half-written bundle and processes
+    that already mapped the old file keep using it until they reload.
+    Returns the header that was written.
+    """
+    arrays = {
+        name: np.ascontiguousarray(array, dtype=np.asarray(array).dtype.newbyteorder('<'))
+        for name, array in arrays.items()
+    }
+    content_hash = _content_hash(arrays, {k: v for k, v in metadata.items() if k not in _GENERATED_KEYS})
+
+    header = dict(metadata)
+    header['format_version'] = BUNDLE_FORMAT_VERSION
+    header['content_sha256'] = content_hash
+    header.setdefault('model_version', content_hash[:12])
+    header.setdefault('created', datetime.now(timezone.utc).isoformat())
+
+    # Offsets depend on the header size, which depends on the offsets, so
+    # lay out the arrays relative to a header budget that is big enough
+    layout = {name: {'dtype': a.dtype.str, 'shape': list(a.shape)} for name, a in arrays.items()}
+    header['arrays'] = layout
+    budget = _align(_PREFIX.size + len(json.dumps(header).encode('utf-8')) + 32 * len(arrays) + 256)
+    offset = budget
+    for name in sorted(arrays):
+        layout[name]['offset'] = offset
+        offset = _align(offset + arrays[name].nbytes)
+    header_bytes = json.dumps(header).encode('utf-8')
+    if _PREFIX.size + len(header_bytes) > budget:
+        raise BundleError("Bundle header exceeded its reserved space")
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.bundle')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_PREFIX.pack(BUNDLE_MAGIC, BUNDLE_FORMAT_VERSION, 0, len(header_bytes)))
+            f.write(header_bytes)
+            for name in sorted(arrays):
+                f.seek(layout[name]['offset'])
+                f.write(arrays[name].tobytes())
+            f.truncate(offset)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return header
+
+
+def read_bundle_header(path):
+    """Read and validate only the bundle header"""
+    with open(path, 'rb') as f:
+        prefix = f.read(_PREFIX.size)
+        if len(prefix) != _PREFIX.size:
+            raise BundleError(f"{path} is too short to be a model bundle")
+        magic, format_version, _, header_length = _PREFIX.unpack(prefix)
+        if magic != BUNDLE_MAGIC:
+            raise BundleError(f"{path} is not a model bundle")
+        if format_version != BUNDLE_FORMAT_VERSION:
+            raise BundleError(
+                f"{path} has bundle format version {format_version}, "
+                f"this build reads version {BUNDLE_FORMAT_VERSION}. Rebuild it with 'manage.py build_model_bundles'."
+            )
+        header = json.loads(f.read(header_length).decode('utf-8'))
+    return header
+
+
+def open_bundle_arrays(path, header=None, verify=True):
+    """Memory-map every array in a bundle read-only.
+
+    The returned arrays are views into one shared ``np.memmap``, so every
+    worker process that opens the same file shares its page-cache pages.
+    """
+    header = header or read_bundle_header(path)
+    buffer = np.memmap(path, dtype=np.uint8, mode='r')
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'], dtype=np.int64))
+        start = spec['offset']
+        end = start + count * dtype.itemsize
+        if end > buffer.shape[0]:
+            raise BundleError(f"{path} is truncated (array '{name}' ends past end of file)")
+        arrays[name] = buffer[start:end].view(dtype).reshape(spec['shape'])
+
+    if verify:
+        metadata = {k: v for k, v in header.items() if k not in _GENERATED_KEYS}
+        if _content_hash(arrays, metadata) != header['content_sha256']:
+            raise BundleError(f"{path} failed its content hash check")
+    return arrays
+
+
+class ArrayScaler:
+    """StandardScaler.transform from stored mean/scale arrays"""
+
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    @property
+    def n_features_in_(self):
+        return self.mean_.shape[0]
+
+    def transform(self, X):
+        X = np.array(X, dtype=np.float64)
+        X -= self.mean_
+        X /= self.scale_
+        return X
+
+
+class ModelBundle:
+    """A disease model loaded from a bundle: network (or forest), scaler, features and calibration"""
+
+    def __init__(self, path, header, arrays):
+        self.path = path
+        self.header = header
+        self.arrays = arrays
+        self.name = header['name']
+        self.version = header['model_version']
+        self.feature_names = header['feature_names']
+        self.calibration = header['calibration']
+        self.precision = header.get('precision', 'float32')
+        self.backend = header.get('backend', 'network')
+        self.scaler = ArrayScaler(arrays['scaler/mean'], arrays['scaler/scale'])
+        if self.backend == 'forest':
+            self.network = FlatForest(*(arrays[f'forest/{name}'] for name in FOREST_ARRAYS),
+                                      header['forest']['max_depth'], header['forest']['n_features'])
+        elif self.precision == 'float32':
+            self.network = DenseNetwork([
+                (arrays[layer['kernel']], arrays[layer['bias']], layer['activation'])
+                for layer in header['layers']
+            ], [layer.get('dropout', 0.0) for layer in header['layers']])
+        else:
+            self.network = ReducedPrecisionNetwork([
+                (arrays[layer['kernel']], layer.get('kernel_scale', 1.0), arrays[layer['bias']], layer['activation'])
+                for layer in header['layers']
+            ], self.precision, [layer.get('dropout', 0.0) for layer in header['layers']])
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays.values())
+
+    @classmethod
+    def load(cls, path, verify=True):
+        header = read_bundle_header(path)
+        return cls(path, header, open_bundle_arrays(path, header, verify=verify))
+
+
+def build_bundle(path, name, network, scaler_mean, scaler_scale, feature_names, calibration, source=None):
+    """Write a ModelBundle file from an in-memory network and scaler parameters"""
+    arrays = {
+        'scaler/mean': np.asarray(scaler_mean, dtype=np.float64),
+        'scaler/scale': np.asarray(scaler_scale, dtype=np.float64),
+    }
+    precision = getattr(network, 'precision', 'float32')
+    layers = []
+    for i, layer in enumerate(network.layers):
+        if precision == 'float32':
+            kernel, bias, activation = layer
+            kernel_scale = None
+        else:
+            kernel, kernel_scale, bias, activation = layer
+        arrays[f'dense_{i}/kernel'] = kernel
+        arrays[f'dense_{i}/bias'] = bias
+        spec = {'kernel': f'dense_{i}/kernel', 'bias': f'dense_{i}/bias', 'activation': activation}
+        if kernel_scale is not None and kernel_scale != 1.0:
+            spec['kernel_scale'] = kernel_scale
+        # Kept for Monte Carlo dropout; inference without it ignores the rate
+        if network.dropout_rates[i]:
+            spec['dropout'] = network.dropout_rates[i]
+        layers.append(spec)
+
+    if len(feature_names) != network.input_dim or len(feature_names) != len(arrays['scaler/mean']):
+        raise BundleError(
+            f"{name}: {len(feature_names)} feature names, scaler has {len(arrays['scaler/mean'])} "
+            f"features and the network expects {network.input_dim}"
+        )
+
+    metadata = {
+        'name': name,
+        'feature_names': list(feature_names),
+        'calibration': calibration,
+        'layers': layers,
+        'source': source or {},
+    }
+    if precision != 'float32':
+        # Only written when reduced, so float32 bundles keep their content hash
+        metadata['precision'] = precision
+    return write_bundle(path, arrays, metadata)
+
+
+def build_forest_bundle(path, name, forest, scaler_mean, scaler_scale, feature_names, calibration, source=None):
+    """Write a ModelBundle file holding a FlatForest instead of a network"""
+    arrays = {
+        'scaler/mean': np.asarray(scaler_mean, dtype=np.float64),
+        'scaler/scale': np.asarray(scaler_scale, dtype=np.float64),
+    }
+    arrays.update({f'forest/{key}': array for key, array in forest.arrays().items()})
+    if len(feature_names) != forest.input_dim or len(feature_names) != len(arrays['scaler/mean']):
+        raise BundleError(
+            f"{name}: {len(feature_names)} feature names, scaler has {len(arrays['scaler/mean'])} "
+            f"features and the forest expects {forest.input_dim}"
+        )
+
+    metadata = {
+        'name': name,
+        'backend': 'forest',
+        'feature_names': list(feature_names),
+        'calibration': calibration,
+        'forest': {'n_trees': forest.n_trees, 'max_depth': forest.max_depth, 'n_features': forest.input_dim,
+                   'node_count': forest.node_count},
+        'source': source or {},
+    }
+    return write_bundle(path, arrays, metadata)
@@ -0,0 +1,183 @@
+import threading
+import time
+
+
+class LoadedModel:
+    """A disease model ready for scoring, plus what is known about how it was loaded"""
+
+    def __init__(self, name, model, scaler, version, calibration, bundle=None, source=None):
+        self.name = name
+        self.model = model
+        self.scaler = scaler
+        self.version = version
+        self.calibration = calibration
+        self.bundle = bundle
+        self.source = source
+        self.fingerprint = None
+        self.loaded_at = None
+        self.load_seconds = None
+
+    @property
+    def precision(self):
+        return getattr(self.model, 'precision', 'float32')
+
+    @property
+    def backend(self):
+        return getattr(self.model, 'kind', None)
+
+    @property
+    def nbytes(self):
+        if hasattr(self.model, 'memory_footprint'):
+            return self.model.memory_footprint()
+        if self.bundle is not None and self.model is self.bundle.network:
+            return self.bundle.nbytes
+        return getattr(self.model, 'nbytes', 0)
+
+
+class _Failure:
+    __slots__ = ('error', 'attempts', 'retry_at')
+
+    def __init__(self, error, attempts, retry_at):
+        self.error = error
+        self.attempts = attempts
+        self.retry_at = retry_at
+
+
+class ModelRegistry:
+    """Loads each model at most once per process, however many threads ask for it.
+
+    ``get`` is lock-free once a model is loaded. On a cold model the first
+    caller loads it while holding that model's lock; concurrent callers block
+    on the same lock and receive the same ``LoadedModel`` (single flight).
+    A failed load is cached and re-raised without retrying until an
+    exponential backoff has elapsed, so a missing artifact doesn't turn
+    every request into another slow load attempt.
+    """
+
+    def __init__(self, loaders, retry_backoff=1.0, max_retry_backoff=60.0):
+        self.loaders = dict(loaders)
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self._models = {}
+        self._failures = {}
+        self._loading = set()
+        self._locks = {name: threading.Lock() for name in self.loaders}
+        self.load_counts = {name: 0 for name in self.loaders}
+
+    def get(self, name):
+        loaded = self._models.get(name)
+        if loaded is not None:
+            return loaded
+        if name not in self.loaders:
+            raise KeyError(f"Unknown model: {name}")
+
+        with self._locks[name]:
+            # Another thread may have finished loading while we waited
+            loaded = self._models.get(name)
+            if loaded is not None:
+                return loaded
+
+            failure = self._failures.get(name)
+            if failure is not None and time.monotonic() < failure.retry_at:
+                raise failure.error
+
+            self._loading.add(name)
+            started = time.perf_counter()
+            try:
+                self.load_counts[name] += 1
+                loaded = self.loaders[name]()
+            except Exception as e:
+                attempts = failure.attempts + 1 if failure is not None else 1
+                delay = min(self.retry_backoff * 2 ** (attempts - 1), self.max_retry_backoff)
+                self._failures[name] = _Failure(e, attempts, time.monotonic() + delay)
+                raise
+            finally:
+                self._loading.discard(name)
+
+            loaded.load_seconds = time.perf_counter() - started
+            loaded.loaded_at = time.time()
+            self._failures.pop(name, None)
+            self._models[name] = loaded
+            return loaded
+
+    def peek(self, name):
+        """The loaded model, or None, without triggering a load"""
+        return self._models.get(name)
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def swap(self, name, loaded):
+        """Install ``loaded`` as the current model and return the one it replaces.
+
+        Readers that already hold the previous ``LoadedModel`` finish with it;
+        every ``get`` after the assignment sees the new one.
+        """
+        if name not in self.loaders:
+            raise KeyError(f"Unknown model: {name}")
+        if loaded.loaded_at is None:
+            loaded.loaded_at = time.time()
+        with self._locks[name]:
+            previous = self._models.get(name)
+            self._models[name] = loaded
+            self._failures.pop(name, None)
+        return previous
+
+    def reload(self, name):
+        """Load a fresh copy of a model and swap it in.
+
+        The previous model keeps serving ``get`` until the new one has loaded;
+        if loading fails it stays in place and the error is raised.
+        """
+        if name not in self.loaders:
+            raise KeyError(f"Unknown model: {name}")
+        started = time.perf_counter()
+        with self._locks[name]:
+            self._loading.add(name)
+            try:
+                self.load_counts[name] += 1
+                loaded = self.loaders[name]()
+            finally:
+                self._loading.discard(name)
+        loaded.load_seconds = time.perf_counter() - started
+        return self.swap(name, loaded)
+
+    def unload(self, name):
+        with self._locks[name]:
+            self._models.pop(name, None)
+            self._failures.pop(name, None)
+
+    def state(self, name):
+        if name in self._models:
+            return 'loaded'
+        if name in self._loading:
+            return 'loading'
+        if name in self._failures:
+            return 'failed'
+        return 'unloaded'
+
+    def status(self):
+        """Per-model load state, for health checks and diagnostics"""
+        report = {}
+        for name in self.loaders:
+            loaded = self._models.get(name)
+            failure = self._failures.get(name)
+            entry = {'state': self.state(name), 'load_attempts': self.load_counts[name]}
+            if loaded is not None:
+                entry.update({
+                    'version': loaded.version,
+                    'source': loaded.source,
+                    'backend': loaded.backend,
+                    'precision': loaded.precision,
+                    'load_seconds': round(loaded.load_seconds, 4) if loaded.load_seconds is not None else None,
+                    'loaded_at': loaded.loaded_at,
+                    'nbytes': loaded.nbytes,
+                })
+            elif failure is not None:
+                entry.update({
+                    'error': str(failure.error),
+                    'failed_attempts': failure.attempts,
+                    'retry_in_seconds': round(max(0.0, failure.retry_at - time.monotonic()), 2),
+                })
+            report[name] = entry
+        return report
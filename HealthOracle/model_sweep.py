@@ -0,0 +1,191 @@
+"""Stratified k-fold evaluation of training-parameter grids ('manage.py sweep_models').
+
+Every (configuration, fold) pair is an independent task that trains one
+network exactly as train_model_with_improvements does (scaling, SMOTE, early
+stopping) with the configuration's parameters, then scores the held-out fold
+with the NumPy network that serving would use. Finished tasks are appended to
+a JSONL results store, so an interrupted sweep resumes where it stopped.
+"""
+import hashlib
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+
+from .ml_models import DEFAULT_TRAINING_PARAMS, TRAINING_DATA, fit_network
+from .numpy_inference import DenseNetwork
+
+
+def parse_hidden_units(value):
+    """'24-12-6' -> (24, 12, 6)"""
+    units = tuple(int(part) for part in str(value).split('-') if part)
+    if not units or min(units) < 1:
+        raise ValueError(f"Invalid hidden_units {value!r}; use widths joined by '-', e.g. 32-16")
+    return units
+
+
+PARAM_PARSERS = {
+    'hidden_units': parse_hidden_units,
+    'dropout': float,
+    'l1': float,
+    'l2': float,
+    'class_weight': float,
+    'batch_size': int,
+    'epochs': int,
+    'patience': int,
+}
+
+
+def parse_grid(items):
+    """['hidden_units=24-12-6,32-16', 'l2=0.001,0.01'] -> {'hidden_units': [(24, 12, 6), (32, 16)], 'l2': [...]}"""
+    grid = {}
+    for item in items:
+        key, _, values = item.partition('=')
+        key = key.strip()
+        if key not in PARAM_PARSERS:
+            raise ValueError(f"Unknown parameter {key!r}; expected one of {', '.join(PARAM_PARSERS)}")
+        if not values.strip():
+            raise ValueError(f"No values given for {key}")
+        grid[key] = [PARAM_PARSERS[key](value.strip()) for value in values.split(',') if value.strip()]
+    return grid
+
+
+def expand_grid(grid):
+    """Every combination of the grid, each a full parameter dict over DEFAULT_TRAINING_PARAMS"""
+    keys = sorted(grid)
+    configs = []
+    for values in itertools.product(*(grid[key] for key in keys)):
+        params = dict(DEFAULT_TRAINING_PARAMS, **dict(zip(keys, values)))
+        params['hidden_units'] = list(params['hidden_units'])
+        if params not in configs:
+            configs.append(params)
+    return configs
+
+
+def config_id(params):
+    """Stable short id of a parameter dict, the key of its results in the store"""
+    encoded = json.dumps(params, sort_keys=True, default=list)
+    return hashlib.sha1(encoded.encode()).hexdigest()[:10]
+
+
+def measure_latency(network, X, rows=200):
+    """Single-row latency percentiles (microseconds) and whole-batch throughput of a NumPy network"""
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    network.predict(X[:1])
+    timings = np.empty(rows)
+    for i in range(rows):
+        row = X[i % len(X)][None, :]
+        started = time.perf_counter_ns()
+        network.predict(row)
+        timings[i] = time.perf_counter_ns() - started
+    started = time.perf_counter()
+    repeats = max(1, 2000 // len(X))
+    for _ in range(repeats):
+        network.predict(X)
+    batch_seconds = time.perf_counter() - started
+    return {
+        'p50_us': round(float(np.percentile(timings, 50)) / 1000, 2),
+        'p95_us': round(float(np.percentile(timings, 95)) / 1000, 2),
+        'rows_per_s': round(repeats * len(X) / batch_seconds, 1),
+    }
+
+
+def evaluate_fold(name, params, fold, folds, seed=42, verbose=0):
+    """Train on all folds but ``fold`` and score the held-out one; returns a results-store record"""
+    import tensorflow as tf
+    from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
+    from sklearn.model_selection import StratifiedKFold
+    from sklearn.preprocessing import StandardScaler
+
+    X, y, _ = TRAINING_DATA[name](seed)
+    splits = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed).split(X, y)
+    train_index, test_index = next(itertools.islice(splits, fold, None))
+    scaler = StandardScaler().fit(X[train_index])
+
+    started = time.perf_counter()
+    model, history, _ = fit_network(scaler.transform(X[train_index]), y[train_index], params,
+                                    seed=seed, verbose=verbose)
+    fit_seconds = time.perf_counter() - started
+
+    network = DenseNetwork.from_keras(model)
+    X_test = scaler.transform(X[test_index])
+    proba = network.predict(X_test)[:, 0]
+    y_pred = (proba > 0.5).astype(int)
+    tf.keras.backend.clear_session()
+
+    return {
+        'model': name,
+        'config': config_id(params),
+        'params': params,
+        'fold': fold,
+        'folds': folds,
+        'seed': seed,
+        'accuracy': float(accuracy_score(y[test_index], y_pred)),
+        'f1': float(f1_score(y[test_index], y_pred, zero_division=0)),
+        'roc_auc': float(roc_auc_score(y[test_index], proba)),
+        'epochs': len(history.history['loss']),
+        'fit_seconds': round(fit_seconds, 3),
+        'weight_bytes': network.nbytes,
+        'latency': measure_latency(network, X_test),
+        'pid': os.getpid(),
+    }
+
+
+def load_results(path):
+    """Records of a results store keyed by (config id, fold); a torn last line is ignored"""
+    results = {}
+    if not os.path.exists(path):
+        return results
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            results[(record['config'], record['fold'])] = record
+    return results
+
+
+def append_result(path, record):
+    with open(path, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def summarise(configs, results):
+    """Per-configuration means over its finished folds, best ROC AUC first.
+
+    ``pareto`` marks configurations that no other configuration beats on both
+    mean ROC AUC and single-row latency.
+    """
+    summaries = []
+    for params in configs:
+        key = config_id(params)
+        records = [record for (config, _), record in results.items() if config == key]
+        if not records:
+            continue
+        column = lambda field: np.array([record[field] for record in records], dtype=float)  # noqa: E731
+        summaries.append({
+            'config': key,
+            'params': params,
+            'folds_done': len(records),
+            'accuracy': round(float(column('accuracy').mean()), 4),
+            'f1': round(float(column('f1').mean()), 4),
+            'roc_auc': round(float(column('roc_auc').mean()), 4),
+            'roc_auc_std': round(float(column('roc_auc').std()), 4),
+            'epochs': round(float(column('epochs').mean()), 1),
+            'fit_seconds': round(float(column('fit_seconds').sum()), 1),
+            'weight_bytes': records[0]['weight_bytes'],
+            'p50_us': round(float(np.median([record['latency']['p50_us'] for record in records])), 2),
+            'rows_per_s': round(float(np.median([record['latency']['rows_per_s'] for record in records])), 1),
+        })
+    for summary in summaries:
+        summary['pareto'] = not any(
+            other['roc_auc'] >= summary['roc_auc'] and other['p50_us'] <= summary['p50_us']
+            and (other['roc_auc'] > summary['roc_auc'] or other['p50_us'] < summary['p50_us'])
+            for other in summaries
+        )
+    return sorted(summaries, key=lambda summary: summary['roc_auc'], reverse=True)
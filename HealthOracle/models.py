@@ -12,6 +12,9 @@ class PredictionHistory(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     test_type = models.CharField(max_length=20, choices=TEST_TYPES)
     risk_percentage = models.FloatField()
+    # Monte Carlo dropout interval around risk_percentage, when uncertainty estimates are on
+    risk_interval_low = models.FloatField(null=True, blank=True)
+    risk_interval_high = models.FloatField(null=True, blank=True)
     category = models.CharField(max_length=20)
     advice = models.TextField()
     input_data = models.JSONField()
@@ -21,4 +24,35 @@ class PredictionHistory(models.Model):
         ordering = ['-date_created']
     
     def __str__(self):
-        return f"{self.user.username}'s {self.get_test_type_display()} Prediction"
\ No newline at end of file
+        return f"{self.user.username}'s {self.get_test_type_display()} Prediction"
+
+
+class ModelTrainingJob(models.Model):
+    """A queued model retraining, run by 'manage.py run_training_jobs' outside the web workers"""
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUSES = (
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    )
+    
+    model_name = models.CharField(max_length=20, choices=PredictionHistory.TEST_TYPES)
+    status = models.CharField(max_length=20, choices=STATUSES, default=STATUS_QUEUED, db_index=True)
+    reason = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    model_version = models.CharField(max_length=64, blank=True)
+    bundle_path = models.CharField(max_length=500, blank=True)
+    error = models.TextField(blank=True)
+    date_created = models.DateTimeField(auto_now_add=True)
+    date_started = models.DateTimeField(null=True, blank=True)
+    date_finished = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['date_created']
+    
+    def __str__(self):
+        return f"{self.get_model_name_display()} training job #{self.pk} ({self.status})"
@@ -0,0 +1,294 @@
+import json
+
+import numpy as np
+
+
+def _relu(x):
+    return np.maximum(x, 0.0, out=x)
+
+
+def _sigmoid(x):
+    # Split on sign so large negative logits don't overflow np.exp
+    out = np.empty_like(x)
+    positive = x >= 0
+    out[positive] = 1.0 / (1.0 + np.exp(-x[positive]))
+    exp_x = np.exp(x[~positive])
+    out[~positive] = exp_x / (1.0 + exp_x)
+    return out
+
+
+def _linear(x):
+    return x
+
+
+ACTIVATIONS = {
+    'relu': _relu,
+    'sigmoid': _sigmoid,
+    'linear': _linear,
+}
+
+# Weight storage modes; activations and accumulation are always float32
+PRECISIONS = ('float32', 'float16', 'int8')
+
+
+def quantize_int8(kernel):
+    """Symmetric per-tensor int8 quantisation: kernel ~= q * scale"""
+    kernel = np.asarray(kernel, dtype=np.float32)
+    max_abs = float(np.max(np.abs(kernel))) if kernel.size else 0.0
+    scale = max_abs / 127.0 if max_abs > 0 else 1.0
+    q = np.clip(np.rint(kernel / scale), -127, 127).astype(np.int8)
+    return q, scale
+
+
+class DenseNetwork:
+    """Inference-only copy of a Keras Sequential stack of Dense layers.
+
+    Dropout layers are skipped (inference mode) and every layer computes
+    ``activation(x @ kernel + bias)`` in float32, which is exactly what Keras
+    does on CPU for these models. ``dropout_rates`` keeps the rate of the
+    Dropout layer after each Dense layer (0.0 for none) for ``predict_samples``.
+    """
+
+    precision = 'float32'
+
+    def __init__(self, layers, dropout_rates=None):
+        # layers: list of (kernel, bias, activation_name)
+        self.dropout_rates = _dropout_rates(dropout_rates, len(layers))
+        self.layers = [
+            (np.ascontiguousarray(kernel, dtype=np.float32),
+             np.ascontiguousarray(bias, dtype=np.float32),
+             activation)
+            for kernel, bias, activation in layers
+        ]
+        for _, _, activation in self.layers:
+            if activation not in ACTIVATIONS:
+                raise ValueError(f"Unsupported activation: {activation}")
+
+    @property
+    def input_dim(self):
+        return self.layers[0][0].shape[0]
+
+    @property
+    def nbytes(self):
+        return sum(kernel.nbytes + bias.nbytes for kernel, bias, _ in self.layers)
+
+    @property
+    def has_dropout(self):
+        return any(self.dropout_rates)
+
+    def with_precision(self, precision):
+        """This network with its kernels stored in ``precision`` (one of PRECISIONS)"""
+        if precision == 'float32':
+            return self
+        return ReducedPrecisionNetwork.from_network(self, precision)
+
+    @classmethod
+    def from_h5(cls, path):
+        """Read Dense weights from a Keras ``.h5`` file without TensorFlow"""
+        import h5py
+
+        with h5py.File(path, 'r') as f:
+            config = json.loads(_as_str(f.attrs['model_config']))
+            weights = f['model_weights'] if 'model_weights' in f else f
+            layers = []
+            dropout_rates = []
+            for layer in config['config']['layers']:
+                class_name = layer['class_name']
+                if class_name == 'Dropout' and layers:
+                    dropout_rates[-1] = float(layer['config']['rate'])
+                    continue
+                if class_name in ('InputLayer', 'Dropout'):
+                    continue
+                if class_name != 'Dense':
+                    raise ValueError(f"Unsupported layer type in {path}: {class_name}")
+                name = layer['config']['name']
+                group = weights[name]
+                weight_names = [_as_str(n) for n in group.attrs['weight_names']]
+                kernel = group[_weight_path(weight_names, 'kernel')][()]
+                if layer['config'].get('use_bias', True):
+                    bias = group[_weight_path(weight_names, 'bias')][()]
+                else:
+                    bias = np.zeros(kernel.shape[1], dtype=np.float32)
+                layers.append((kernel, bias, layer['config'].get('activation', 'linear')))
+                dropout_rates.append(0.0)
+        if not layers:
+            raise ValueError(f"No Dense layers found in {path}")
+        return cls(layers, dropout_rates)
+
+    @classmethod
+    def from_keras(cls, model):
+        """Copy the Dense weights of an in-memory Keras Sequential model"""
+        layers = []
+        dropout_rates = []
+        for layer in model.layers:
+            class_name = type(layer).__name__
+            if class_name == 'Dropout' and layers:
+                dropout_rates[-1] = float(layer.rate)
+                continue
+            if class_name in ('InputLayer', 'Dropout'):
+                continue
+            if class_name != 'Dense':
+                raise ValueError(f"Unsupported layer type: {class_name}")
+            weights = layer.get_weights()
+            bias = weights[1] if len(weights) > 1 else np.zeros(weights[0].shape[1], dtype=np.float32)
+            layers.append((weights[0], bias, layer.get_config().get('activation', 'linear')))
+            dropout_rates.append(0.0)
+        if not layers:
+            raise ValueError("No Dense layers found in the model")
+        return cls(layers, dropout_rates)
+
+    def apply_layer(self, i, x):
+        kernel, bias, activation = self.layers[i]
+        x = x @ kernel
+        x += bias
+        return ACTIVATIONS[activation](x)
+
+    def predict(self, X, verbose=0):
+        """Forward pass returning an (n, units) array, like ``model.predict``"""
+        x = np.asarray(X, dtype=np.float32)
+        if x.ndim == 1:
+            x = x.reshape(1, -1)
+        for kernel, bias, activation in self.layers:
+            x = x @ kernel
+            x += bias
+            x = ACTIVATIONS[activation](x)
+        return x
+
+    def predict_samples(self, X, samples, rng=None, max_rows=1 << 18):
+        """(samples, n, units) outputs with dropout active (Monte Carlo dropout); see mc_dropout_samples"""
+        return mc_dropout_samples(self, X, samples, rng, max_rows)
+
+
+class ReducedPrecisionNetwork:
+    """DenseNetwork whose kernels are stored as float16 or per-tensor int8.
+
+    Kernels are widened to float32 one layer at a time inside ``predict``, so
+    only the small stored copy stays resident; biases (a few dozen floats)
+    stay float32. For int8 the per-tensor scale is applied to the matmul
+    output rather than to the kernel.
+    """
+
+    def __init__(self, layers, precision, dropout_rates=None):
+        # layers: list of (kernel, kernel_scale, bias, activation_name)
+        if precision not in ('float16', 'int8'):
+            raise ValueError(f"Unsupported reduced precision: {precision}")
+        self.dropout_rates = _dropout_rates(dropout_rates, len(layers))
+        dtype = np.float16 if precision == 'float16' else np.int8
+        self.precision = precision
+        self.layers = [
+            (np.ascontiguousarray(kernel, dtype=dtype),
+             float(kernel_scale),
+             np.ascontiguousarray(bias, dtype=np.float32),
+             activation)
+            for kernel, kernel_scale, bias, activation in layers
+        ]
+        for _, _, _, activation in self.layers:
+            if activation not in ACTIVATIONS:
+                raise ValueError(f"Unsupported activation: {activation}")
+
+    @classmethod
+    def from_network(cls, network, precision):
+        layers = []
+        for kernel, bias, activation in network.layers:
+            if precision == 'int8':
+                q, scale = quantize_int8(kernel)
+                layers.append((q, scale, bias, activation))
+            else:
+                layers.append((kernel.astype(np.float16), 1.0, bias, activation))
+        return cls(layers, precision, network.dropout_rates)
+
+    @property
+    def input_dim(self):
+        return self.layers[0][0].shape[0]
+
+    @property
+    def nbytes(self):
+        return sum(kernel.nbytes + bias.nbytes for kernel, _, bias, _ in self.layers)
+
+    @property
+    def has_dropout(self):
+        return any(self.dropout_rates)
+
+    def with_precision(self, precision):
+        if precision != self.precision:
+            raise ValueError(f"Network weights are stored as {self.precision}, not {precision}")
+        return self
+
+    def apply_layer(self, i, x):
+        kernel, kernel_scale, bias, activation = self.layers[i]
+        x = x @ kernel.astype(np.float32)
+        if kernel_scale != 1.0:
+            x *= np.float32(kernel_scale)
+        x += bias
+        return ACTIVATIONS[activation](x)
+
+    def predict(self, X, verbose=0):
+        x = np.asarray(X, dtype=np.float32)
+        if x.ndim == 1:
+            x = x.reshape(1, -1)
+        for kernel, kernel_scale, bias, activation in self.layers:
+            x = x @ kernel.astype(np.float32)
+            if kernel_scale != 1.0:
+                x *= np.float32(kernel_scale)
+            x += bias
+            x = ACTIVATIONS[activation](x)
+        return x
+
+    def predict_samples(self, X, samples, rng=None, max_rows=1 << 18):
+        return mc_dropout_samples(self, X, samples, rng, max_rows)
+
+
+def mc_dropout_samples(network, X, samples, rng=None, max_rows=1 << 18):
+    """(samples, n, units) outputs of ``network`` with its Dropout layers active.
+
+    The ``samples`` stochastic passes run as one tiled batch of samples * n
+    rows: each Dropout layer draws its whole keep mask with one vectorised
+    ``rng.random`` call and scales kept units by 1 / (1 - rate), as Keras does
+    in training mode. Layers before the first dropout are deterministic, so
+    they run once on the n input rows before tiling. Rows are processed in
+    blocks of at most ``max_rows`` tiled rows to bound memory.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    x = np.asarray(X, dtype=np.float32)
+    if x.ndim == 1:
+        x = x.reshape(1, -1)
+    n = len(x)
+    rates = network.dropout_rates
+    first_dropout = next((i for i, rate in enumerate(rates) if rate), len(rates))
+    for i in range(min(first_dropout + 1, len(network.layers))):
+        x = network.apply_layer(i, x)
+    out = None
+    block = max(1, max_rows // max(1, samples))
+    for start in range(0, n, block):
+        # Sample-major, so each sample's rows stay contiguous
+        h = np.tile(x[start:start + block], (samples, 1))
+        for i in range(first_dropout, len(network.layers)):
+            if i > first_dropout:
+                h = network.apply_layer(i, h)
+            if rates[i]:
+                keep = rng.random(h.shape, dtype=np.float32) >= np.float32(rates[i])
+                h *= keep
+                h *= np.float32(1.0 / (1.0 - rates[i]))
+        h = h.reshape(samples, -1, h.shape[1])
+        if out is None:
+            out = np.empty((samples, n, h.shape[2]), dtype=np.float32)
+        out[:, start:start + block] = h
+    return out
+
+
+def _dropout_rates(rates, n_layers):
+    rates = [0.0] * n_layers if rates is None else [float(rate) for rate in rates]
+    if len(rates) != n_layers or not all(0.0 <= rate < 1.0 for rate in rates):
+        raise ValueError(f"Expected {n_layers} dropout rates in [0, 1), got {rates}")
+    return rates
+
+
+def _as_str(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+def _weight_path(weight_names, suffix):
+    for name in weight_names:
+        if name.split('/')[-1].split(':')[0] == suffix:
+            return name
+    raise KeyError(f"No '{suffix}' weight in {weight_names}")
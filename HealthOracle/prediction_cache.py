@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def canonical_feature_key(features):
+    """Stable bytes for a feature vector: float64, little-endian, -0.0 folded into 0.0"""
+    array = np.asarray(features, dtype='<f8').reshape(-1) + 0.0
+    return array.tobytes()
+
+
+class PredictionCache:
+    """Thread-safe bounded LRU cache with an optional TTL.
+
+    Keys are ``(disease, model_version, canonical_feature_key(features))`` so a
+    new model version can never be served a stale result; ``invalidate`` also
+    drops a disease's entries eagerly when its model is reloaded.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = max(0, int(maxsize))
+        self.ttl = float(ttl) if ttl else None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, disease=None):
+        """Drop every entry, or only the entries for one disease"""
+        with self._lock:
+            if disease is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                stale = [key for key in self._entries if key[0] == disease]
+                for key in stale:
+                    del self._entries[key]
+                removed = len(stale)
+            self.invalidations += removed
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
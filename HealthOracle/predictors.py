@@ -0,0 +1,40 @@
+"""Lazy entry points to the disease models for views.
+
+Importing this module costs nothing: ml_models and the serving stack behind it
+(model bundles, NumPy inference, prediction cache) are imported by the first
+scoring call. Training dependencies (scikit-learn, TensorFlow, joblib) are only
+imported inside the training functions, so serving never loads them.
+"""
+
+
+def _ml_models():
+    from . import ml_models
+    return ml_models
+
+
+def predict_heart_disease(features):
+    return _ml_models().predict_heart_disease(features)
+
+
+def predict_lung_disease(features):
+    return _ml_models().predict_lung_disease(features)
+
+
+def predict_liver_disease(features):
+    return _ml_models().predict_liver_disease(features)
+
+
+def predict_diabetes(features):
+    return _ml_models().predict_diabetes(features)
+
+
+def predict_batch(name, X):
+    return _ml_models().predict_batch(name, X)
+
+
+def predict_interval(name, X, risk_percentages):
+    return _ml_models().predict_interval(name, X, risk_percentages)
+
+
+def predict_surface(name, base_values, axes):
+    return _ml_models().predict_surface(name, base_values, axes)
@@ -0,0 +1,77 @@
+import numpy as np
+
+from .feature_schema import SCHEMAS
+
+
+def history_inputs(name, limit=None):
+    """Raw input rows recovered from saved PredictionHistory entries for one disease"""
+    from .models import PredictionHistory
+
+    schema = SCHEMAS[name]
+    queryset = PredictionHistory.objects.filter(test_type=name).values_list('input_data', flat=True)
+    if limit:
+        queryset = queryset[:limit]
+    rows = []
+    for input_data in queryset:
+        try:
+            rows.append([field.decode_history_value(input_data[field.history_key]) for field in schema.fields])
+        except (KeyError, TypeError, ValueError):
+            # Entries saved before a field existed, or hand-edited ones
+            continue
+    return np.asarray(rows, dtype=np.float64).reshape(-1, schema.raw_count)
+
+
+def _sample_around_training(schema, mean, scale, n, rng):
+    X = rng.normal(mean, scale, size=(n, schema.raw_count))
+    for i, field in enumerate(schema.fields):
+        if field.display is not None:
+            X[:, i] = rng.random(n) < np.clip(mean[i], 0.0, 1.0)
+        elif field.dtype is int:
+            X[:, i] = np.rint(X[:, i])
+        X[:, i] = np.maximum(X[:, i], 0.0)
+    return X
+
+
+def synthetic_inputs(name, scaler, n, rng, max_z=8.0):
+    """Raw rows drawn around the training distribution recorded in a model's scaler.
+
+    Each raw column is sampled from N(mean, scale) of its training data, then
+    snapped to what the form can submit: 0/1 for yes/no and male/female
+    fields, non-negative whole numbers for integer fields. Rows whose
+    engineered features land more than ``max_z`` training standard deviations
+    out (a ratio over a near-zero lab value, say) are redrawn, so comparisons
+    measure the model rather than nonsense inputs.
+    """
+    schema = SCHEMAS[name]
+    mean = np.asarray(scaler.mean_[:schema.raw_count], dtype=np.float64)
+    scale = np.asarray(scaler.scale_[:schema.raw_count], dtype=np.float64)
+    kept = []
+    remaining = n
+    for _ in range(100):
+        X = _sample_around_training(schema, mean, scale, max(remaining * 2, 64), rng)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = scaler.transform(schema.engineer(X))
+        X = X[(np.abs(z) <= max_z).all(axis=1)][:remaining]
+        kept.append(X)
+        remaining -= len(X)
+        if remaining <= 0:
+            break
+    return np.concatenate(kept, axis=0)
+
+
+def reference_inputs(name, scaler, n=5000, seed=42, include_history=True):
+    """Saved history rows followed by synthetic rows: the fixed input set for accuracy comparisons"""
+    rng = np.random.default_rng(seed)
+    parts = []
+    if include_history:
+        parts.append(history_inputs(name))
+    parts.append(synthetic_inputs(name, scaler, n, rng))
+    return np.concatenate(parts, axis=0)
+
+
+def scaled_reference_rows(name, scaler, n=5000, seed=42):
+    """reference_inputs engineered and scaled into model inputs, without the rows that give invalid features"""
+    X = reference_inputs(name, scaler, n, seed)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        features = SCHEMAS[name].engineer(X)
+    return scaler.transform(features[np.isfinite(features).all(axis=1)])
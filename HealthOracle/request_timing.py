@@ -0,0 +1,257 @@
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+# Method label values; any other client-supplied method is recorded as 'other'
+HTTP_METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'})
+
+# Upper bounds in seconds; stages are sub-millisecond to multi-second (Gemini)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_local = threading.local()
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTimer:
+    """Stage timings collected while one request is handled"""
+
+    __slots__ = ('started', 'stages', 'disease', 'db_queries')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.disease = None
+        self.db_queries = 0
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name):
+    """Time a block as stage ``name`` of the current request (no-op outside a request)"""
+    timer = getattr(_local, 'timer', None)
+    if timer is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - started)
+
+
+def set_disease(name):
+    """Label the current request's stages with the disease model it scored"""
+    timer = getattr(_local, 'timer', None)
+    if timer is not None:
+        timer.disease = name
+
+
+class Histogram:
+    """Cumulative Prometheus-style histogram keyed by a tuple of label values"""
+
+    def __init__(self, name, help_text, label_names, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts (not cumulative) plus +Inf, then sum
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {labels: (list(counts), total) for labels, (counts, total) in self._series.items()}
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+request_duration = Histogram(
+    'healthoracle_request_duration_seconds', "Time to handle a request, by view, method and status class",
+    ('view', 'method', 'status'),
+)
+stage_duration = Histogram(
+    'healthoracle_stage_duration_seconds', "Time spent in one stage of a request, by view, disease and stage",
+    ('view', 'disease', 'stage'),
+)
+HISTOGRAMS = (request_duration, stage_duration)
+
+
+def timing_enabled():
+    return getattr(settings, 'REQUEST_TIMING_ENABLED', True)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_float(value):
+    return repr(float(value)) if value != float('inf') else '+Inf'
+
+
+def render_metrics(snapshots):
+    """Prometheus text exposition for {histogram: {labels: (counts, sum)}}"""
+    lines = []
+    for histogram, series in snapshots:
+        lines.append(f"# HELP {histogram.name} {histogram.help_text}")
+        lines.append(f"# TYPE {histogram.name} histogram")
+        for labels in sorted(series):
+            counts, total = series[labels]
+            label_text = ','.join(f'{key}="{_escape(value)}"' for key, value in zip(histogram.label_names, labels))
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + (float('inf'),), counts):
+                cumulative += count
+                lines.append(f'{histogram.name}_bucket{{{label_text},le="{_format_float(bound)}"}} {cumulative}')
+            lines.append(f"{histogram.name}_sum{{{label_text}}} {total!r}")
+            lines.append(f"{histogram.name}_count{{{label_text}}} {cumulative}")
+    return '\n'.join(lines) + '\n'
+
+
+# Multi-worker export: with METRICS_DIR set, each worker writes its histograms
+# to METRICS_DIR/<pid>.json at most every METRICS_FLUSH_INTERVAL seconds, and
+# /metrics adds up every worker's file, so any worker can answer a scrape.
+_last_flush = 0.0
+_flush_lock = threading.Lock()
+
+
+def get_metrics_dir():
+    return getattr(settings, 'METRICS_DIR', None)
+
+
+def flush_metrics(force=False):
+    global _last_flush
+    metrics_dir = get_metrics_dir()
+    if not metrics_dir:
+        return
+    now = time.monotonic()
+    if not force and now - _last_flush < getattr(settings, 'METRICS_FLUSH_INTERVAL', 5.0):
+        return
+    if not _flush_lock.acquire(blocking=False):
+        return
+    try:
+        _last_flush = now
+        payload = {
+            histogram.name: [[list(labels), counts, total] for labels, (counts, total) in histogram.snapshot().items()]
+            for histogram in HISTOGRAMS
+        }
+        os.makedirs(metrics_dir, exist_ok=True)
+        path = os.path.join(metrics_dir, f'{os.getpid()}.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        logger.exception("Could not write request metrics")
+    finally:
+        _flush_lock.release()
+
+
+def collect_metrics():
+    """Histogram snapshots for this worker, or summed over every worker's file when METRICS_DIR is set"""
+    metrics_dir = get_metrics_dir()
+    if not metrics_dir:
+        return [(histogram, histogram.snapshot()) for histogram in HISTOGRAMS]
+
+    flush_metrics(force=True)
+    merged = {histogram.name: {} for histogram in HISTOGRAMS}
+    for filename in os.listdir(metrics_dir):
+        if not filename.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(metrics_dir, filename)) as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for histogram in HISTOGRAMS:
+            series = merged[histogram.name]
+            for labels, counts, total in payload.get(histogram.name, []):
+                labels = tuple(labels)
+                if labels in series and len(counts) == len(series[labels][0]):
+                    existing_counts, existing_total = series[labels]
+                    series[labels] = ([a + b for a, b in zip(existing_counts, counts)], existing_total + total)
+                else:
+                    series[labels] = (counts, total)
+    return [(histogram, merged[histogram.name]) for histogram in HISTOGRAMS]
+
+
+def server_timing_header(timer, total):
+    entries = []
+    for name, seconds in timer.stages.items():
+        entry = f'{name};dur={seconds * 1000:.2f}'
+        if name == 'db':
+            entry += f';desc="{timer.db_queries} queries"'
+        entries.append(entry)
+    entries.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(entries)
+
+
+class RequestTimingMiddleware:
+    """Records per-stage timings of every request.
+
+    Views and ml_models mark stages with ``stage('name')``; database time is
+    collected for every query as the ``db`` stage. Stages can overlap (a query
+    issued while a template renders counts in both ``render`` and ``db``).
+    The timings are sent back in a ``Server-Timing`` header and added to the
+    histograms served by ``/metrics``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not timing_enabled():
+            return self.get_response(request)
+
+        timer = _local.timer = RequestTimer()
+        try:
+            with connection.execute_wrapper(self.time_query):
+                response = self.get_response(request)
+        finally:
+            _local.timer = None
+        total = time.perf_counter() - timer.started
+
+        match = getattr(request, 'resolver_match', None)
+        view = (match.url_name or match.view_name) if match else 'unmatched'
+        if view == 'metrics':
+            return response
+        disease = timer.disease or ''
+        method = request.method if request.method in HTTP_METHODS else 'other'
+        request_duration.observe((view, method, f'{response.status_code // 100}xx'), total)
+        for name, seconds in timer.stages.items():
+            stage_duration.observe((view, disease, name), seconds)
+        if getattr(settings, 'SERVER_TIMING_HEADER', True):
+            response['Server-Timing'] = server_timing_header(timer, total)
+        flush_metrics()
+        return response
+
+    def time_query(self, execute, sql, params, many, context):
+        timer = getattr(_local, 'timer', None)
+        if timer is None:
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            timer.add('db', time.perf_counter() - started)
+            timer.db_queries += 1
+
@@ -53,11 +53,12 @@ INSTALLED_APPS = [
     'crispy_forms',
     'crispy_bootstrap5',
     'widget_tweaks',
-    'HealthOracle',
+    'HealthOracle.apps.HealthOracleConfig',
 ]
 
 MIDDLEWARE = [
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'HealthOracle.request_timing.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -92,7 +93,10 @@ WSGI_APPLICATION = 'HealthOracle.wsgi.application'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
 # Use persistent disk on Render, local file otherwise
-if os.environ.get('RENDER'):
+if os.environ.get('SQLITE_PATH'):
+    # Explicit database file, e.g. the throwaway copy used by loadtest/run_loadtest.py
+    DB_PATH = Path(os.environ['SQLITE_PATH'])
+elif os.environ.get('RENDER'):
     # On Render, use persistent disk mounted at /data
     from pathlib import Path as PathLib
     DB_DIR = PathLib('/data')
@@ -113,6 +117,146 @@ DATABASES = {
 # Gemini API Configuration
 # IMPORTANT: Set GEMINI_API_KEY in your environment variables or .env file
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
+# Optional override of the Gemini API endpoint (e.g. the local stub in loadtest/gemini_stub.py)
+GEMINI_BASE_URL = os.environ.get('GEMINI_BASE_URL') or None
+
+# ML micro-batching
+# Coalesces concurrent predictions for the same model into one forward pass.
+# Only worth enabling with threaded workers (gunicorn worker_class = 'gthread').
+ML_MICROBATCH_ENABLED = os.environ.get('ML_MICROBATCH_ENABLED', 'false').lower() == 'true'
+ML_MICROBATCH_MAX_BATCH_SIZE = int(os.environ.get('ML_MICROBATCH_MAX_BATCH_SIZE', '32'))
+ML_MICROBATCH_MAX_WAIT_MS = float(os.environ.get('ML_MICROBATCH_MAX_WAIT_MS', '2'))
+# Seconds a request waits for its batch before predicting on its own (0 waits forever)
+ML_MICROBATCH_TIMEOUT = float(os.environ.get('ML_MICROBATCH_TIMEOUT', '5'))
+
+# Directory holding the <model>.bundle files (see 'manage.py build_model_bundles')
+ML_BUNDLE_DIR = os.environ.get('ML_BUNDLE_DIR') or str(BASE_DIR / 'model_bundles')
+
+# Offline training ('manage.py train_models'): local dataset cache (<name>.npz, imported
+# once with --download or --import-csv) and the parent of the per-run output directories
+ML_DATASET_DIR = os.environ.get('ML_DATASET_DIR') or str(BASE_DIR / 'datasets')
+ML_TRAINING_OUTPUT_DIR = os.environ.get('ML_TRAINING_OUTPUT_DIR') or str(BASE_DIR / 'training_runs')
+
+# Weight precision per served model: float32 (default), float16 or int8 (per-tensor).
+# 'int8' applies to every model; 'heart=int8,lung=float16' picks per model.
+# Check the accuracy cost first with 'manage.py check_reduced_precision --record'; a precision
+# it records outside tolerance is refused and the model is served at float32.
+ML_MODEL_PRECISION = os.environ.get('ML_MODEL_PRECISION', '')
+
+# Serving backend per model: 'numpy' (default, the networks in the bundles), 'keras'
+# (the .h5 networks run by TensorFlow) or 'forest' (the RandomForest <name>_model.pkl
+# flattened by 'manage.py build_model_bundles --forest').
+# 'heart=forest,diabetes=forest' picks per model; compare with 'manage.py compare_backends'.
+ML_MODEL_BACKEND = os.environ.get('ML_MODEL_BACKEND', '')
+
+# Cascade inference: a logistic screen distilled from each model ('manage.py
+# build_cascade_models') answers rows whose risk is more than ML_CASCADE_MARGIN
+# percentage points from the 30 % and 60 % thresholds; the rest go to the full model.
+# '' disables it, 'auto' uses the margin measured when the screen was built, a number
+# sets it ('heart=auto,lung=20' per model). 'manage.py check_cascade' reports agreement.
+ML_CASCADE_MARGIN = os.environ.get('ML_CASCADE_MARGIN', '')
+
+# Uncertainty estimates: Monte Carlo dropout over ML_UNCERTAINTY_SAMPLES passes (run
+# as one tiled batch) gives a central ML_UNCERTAINTY_LEVEL interval around each risk,
+# shown on the result pages and returned by the batch API as risk_interval.
+# Benchmark the cost with 'manage.py bench_uncertainty'.
+ML_UNCERTAINTY_ENABLED = os.environ.get('ML_UNCERTAINTY_ENABLED', 'false').lower() == 'true'
+ML_UNCERTAINTY_SAMPLES = int(os.environ.get('ML_UNCERTAINTY_SAMPLES', '100'))
+ML_UNCERTAINTY_LEVEL = float(os.environ.get('ML_UNCERTAINTY_LEVEL', '0.9'))
+
+# Model loading
+# A failed model load is retried after ML_LOAD_RETRY_BACKOFF seconds, doubling per failure up to the maximum.
+ML_LOAD_RETRY_BACKOFF = float(os.environ.get('ML_LOAD_RETRY_BACKOFF', '1'))
+ML_LOAD_MAX_RETRY_BACKOFF = float(os.environ.get('ML_LOAD_MAX_RETRY_BACKOFF', '60'))
+
+# Hot reload: each worker checks the artifacts of its loaded models every
+# ML_RELOAD_POLL_INTERVAL seconds and swaps in new versions (0 disables polling).
+ML_RELOAD_POLL_INTERVAL = float(os.environ.get('ML_RELOAD_POLL_INTERVAL', '30'))
+
+# Models to load and warm up in the background when a gunicorn worker starts
+# (comma-separated names, 'all', or empty to keep loading fully lazy).
+# /healthz/ready returns 503 until they are warm.
+ML_WARMUP_MODELS = os.environ.get('ML_WARMUP_MODELS', '')
+
+# Prediction result cache (per worker process)
+# Size 0 disables the cache; TTL 0 keeps entries until they are evicted or the model reloads.
+ML_PREDICTION_CACHE_SIZE = int(os.environ.get('ML_PREDICTION_CACHE_SIZE', '1024'))
+ML_PREDICTION_CACHE_TTL = float(os.environ.get('ML_PREDICTION_CACHE_TTL', '0'))
+
+# Maximum number of records accepted by /api/predict/<disease>/batch/
+ML_BATCH_MAX_RECORDS = int(os.environ.get('ML_BATCH_MAX_RECORDS', '10000'))
+# Partner tokens for the batch API, 'username=token,username=token'. Each client sends
+# 'Authorization: Bearer <token>' and its saved predictions go to that user's history.
+ML_BATCH_API_TOKENS = os.environ.get('ML_BATCH_API_TOKENS', '')
+
+# Largest number of values per swept input accepted by /prediction/<id>/what-if/
+# (two inputs of 200 values score a 40,000-row grid in one pass)
+ML_WHAT_IF_MAX_STEPS = int(os.environ.get('ML_WHAT_IF_MAX_STEPS', '200'))
+
+# Background model retraining ('manage.py run_training_jobs')
+# The runner polls the job table every ML_TRAINING_POLL_INTERVAL seconds; a job still
+# running after ML_TRAINING_JOB_TIMEOUT seconds is assumed dead and marked failed.
+ML_TRAINING_POLL_INTERVAL = float(os.environ.get('ML_TRAINING_POLL_INTERVAL', '5'))
+ML_TRAINING_JOB_TIMEOUT = float(os.environ.get('ML_TRAINING_JOB_TIMEOUT', '3600'))
+
+# Request timing (HealthOracle.request_timing)
+# Per-stage timings of every request, returned in a Server-Timing header and
+# aggregated into the histograms served at /metrics (Prometheus text format).
+REQUEST_TIMING_ENABLED = os.environ.get('REQUEST_TIMING_ENABLED', 'true').lower() == 'true'
+SERVER_TIMING_HEADER = os.environ.get('SERVER_TIMING_HEADER', 'true').lower() == 'true'
+# With several gunicorn workers, set METRICS_DIR so every worker writes its
+# histograms there (at most every METRICS_FLUSH_INTERVAL seconds) and /metrics
+# reports all of them. Without it /metrics only covers the worker that answers.
+METRICS_DIR = os.environ.get('METRICS_DIR') or None
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', '5'))
+# When set, /metrics requires 'Authorization: Bearer <METRICS_TOKEN>'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+
+# Logging
+# Records go through a bounded queue to a background writer thread, so request
+# threads never block on stdout. LOG_FORMAT is 'json' (one object per line) or
+# 'plain'. LOG_SAMPLE_RATES keeps only a fraction of DEBUG records for noisy
+# loggers, e.g. 'HealthOracle.ml_models=0.01,HealthOracle.views=0.1'.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'plain').lower()
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
+LOG_SAMPLE_RATES = os.environ.get('LOG_SAMPLE_RATES', '')
+
+
+_LOG_SAMPLE_RATES = {
+    name.strip(): float(rate)
+    for name, _, rate in (item.partition('=') for item in LOG_SAMPLE_RATES.split(',') if item.strip())
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'HealthOracle.structured_logging.JSONFormatter'},
+        'plain': {'format': '[{asctime}] {levelname} {name}: {message}', 'style': '{'},
+    },
+    'filters': {
+        f'sample:{name}': {'()': 'HealthOracle.structured_logging.SamplingFilter', 'rate': rate}
+        for name, rate in _LOG_SAMPLE_RATES.items()
+    },
+    'handlers': {
+        'queue': {
+            '()': 'HealthOracle.structured_logging.QueueStreamHandler',
+            'maxsize': LOG_QUEUE_SIZE,
+            'formatter': 'json' if LOG_FORMAT == 'json' else 'plain',
+        },
+    },
+    'root': {'handlers': ['queue'], 'level': 'WARNING'},
+    'loggers': {
+        'django': {'handlers': ['queue'], 'level': 'INFO', 'propagate': False},
+        'HealthOracle': {'handlers': ['queue'], 'level': LOG_LEVEL, 'propagate': False},
+        'users': {'handlers': ['queue'], 'level': LOG_LEVEL, 'propagate': False},
+        **{
+            name: {'handlers': ['queue'], 'level': LOG_LEVEL, 'propagate': False, 'filters': [f'sample:{name}']}
+            for name in _LOG_SAMPLE_RATES
+        },
+    },
+}
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -0,0 +1,130 @@
+"""Logging building blocks referenced from settings.LOGGING.
+
+Request threads never write to stdout themselves: QueueStreamHandler puts the
+record on a bounded in-memory queue and a background thread formats and
+writes it. Messages use %-style arguments (``logger.info("Saved %s", pk)``) so
+the message is only rendered for records that pass the level and sampling
+filters; it is rendered in the calling thread, before its arguments can change.
+"""
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+
+# Attributes every LogRecord has; anything else came from ``extra=``
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, plus any ``extra`` fields"""
+
+    def format(self, record):
+        payload = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'pid': record.process,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload['exception'] = record.exc_text
+        return json.dumps(payload, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a ``rate`` fraction of records at or below ``max_level``; more severe records always pass"""
+
+    def __init__(self, rate=1.0, max_level='DEBUG'):
+        super().__init__()
+        self.rate = float(rate)
+        self.max_level = logging.getLevelName(max_level) if isinstance(max_level, str) else int(max_level)
+
+    def filter(self, record):
+        if record.levelno > self.max_level or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+class QueueStreamHandler(logging.handlers.QueueHandler):
+    """Non-blocking handler: enqueue in the caller, format and write on a listener thread.
+
+    The queue is bounded; when the writer falls behind, records are dropped
+    and counted instead of blocking the request. The listener is started
+    lazily in each process, so it also works after gunicorn forks.
+    """
+
+    def __init__(self, stream=None, maxsize=10000):
+        super().__init__(queue.Queue(maxsize=maxsize))
+        self.target = logging.StreamHandler(stream or sys.stdout)
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def setFormatter(self, fmt):
+        # Formatting happens on the listener thread, in the target handler
+        self.target.setFormatter(fmt)
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # A forked child inherits the queue but not the listener thread
+            self.queue = queue.Queue(maxsize=self.queue.maxsize)
+            self._listener = logging.handlers.QueueListener(self.queue, self.target, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def prepare(self, record):
+        # Render the message and traceback now, as the stdlib QueueHandler
+        # does: the args may be mutable objects the caller changes next, and
+        # the frames are gone once the caller returns. Timestamps, JSON and
+        # the line format are still done on the listener thread.
+        message = record.getMessage()
+        record = copy.copy(record)
+        record.message = message
+        record.msg = message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def emit(self, record):
+        self._ensure_listener()
+        try:
+            self.enqueue(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        self.target.flush()
+
+    def close(self):
+        listener = self._listener
+        if listener is not None and self._pid == os.getpid():
+            listener.stop()
+            self._listener = None
+            self._pid = None
+        self.target.close()
+        super().close()
+
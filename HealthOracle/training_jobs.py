@@ -0,0 +1,151 @@
+import os
+import shutil
+import socket
+import tempfile
+import traceback
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .ml_models import (
+    build_bundle_from_artifacts,
+    get_bundle_dir,
+    get_bundle_path,
+    load_model_artifacts,
+    model_registry,
+    train_diabetes_model,
+    train_heart_model,
+    train_liver_model,
+    train_lung_model,
+)
+from .feature_schema import SCHEMAS
+from .model_bundle import ModelBundle
+from .models import ModelTrainingJob
+
+TRAINERS = {
+    'heart': train_heart_model,
+    'lung': train_lung_model,
+    'liver': train_liver_model,
+    'diabetes': train_diabetes_model,
+}
+
+ACTIVE_STATUSES = (ModelTrainingJob.STATUS_QUEUED, ModelTrainingJob.STATUS_RUNNING)
+
+
+def get_versions_dir():
+    """Every bundle a training job has produced, named <model>-<version>.bundle"""
+    return get_bundle_dir() / 'versions'
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue_training(name, reason=''):
+    """Queue a retraining of ``name`` unless one is already queued or running"""
+    if name not in TRAINERS:
+        raise KeyError(f"Unknown model: {name}")
+    with transaction.atomic():
+        job = ModelTrainingJob.objects.filter(model_name=name, status__in=ACTIVE_STATUSES).first()
+        if job is None:
+            job = ModelTrainingJob.objects.create(model_name=name, reason=reason[:2000])
+    return job
+
+
+def claim_next_job(worker=None):
+    """Mark the oldest queued job as running and return it, or None if the queue is empty.
+
+    The claim is a conditional UPDATE, so two runners polling the same
+    database never pick up the same job.
+    """
+    worker = worker or worker_name()
+    for job in ModelTrainingJob.objects.filter(status=ModelTrainingJob.STATUS_QUEUED)[:10]:
+        claimed = ModelTrainingJob.objects.filter(pk=job.pk, status=ModelTrainingJob.STATUS_QUEUED).update(
+            status=ModelTrainingJob.STATUS_RUNNING, worker=worker, date_started=timezone.now(),
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def fail_stale_jobs(timeout):
+    """Fail running jobs older than ``timeout`` seconds, e.g. after a runner was killed"""
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    return ModelTrainingJob.objects.filter(status=ModelTrainingJob.STATUS_RUNNING, date_started__lt=cutoff).update(
+        status=ModelTrainingJob.STATUS_FAILED,
+        error=f"Runner did not finish the job within {timeout:g} seconds",
+        date_finished=timezone.now(),
+    )
+
+
+def publish_bundle(name, versioned_path):
+    """Point <name>.bundle at a versioned bundle with one atomic rename.
+
+    Workers that have the previous bundle mapped keep reading it (the old
+    inode lives on until they let go of it), and the next load sees the new
+    file. The versioned copy is kept for rollback.
+    """
+    path = get_bundle_path(name)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-', suffix='.bundle')
+    os.close(fd)
+    os.unlink(tmp_path)
+    try:
+        try:
+            os.link(versioned_path, tmp_path)
+        except OSError:
+            shutil.copy2(versioned_path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return path
+
+
+def smoke_test_bundle(name, path):
+    """Load a freshly trained bundle and check it scores the scaler mean to a finite risk"""
+    bundle = ModelBundle.load(path)
+    if bundle.feature_names != SCHEMAS[name].model_inputs:
+        raise ValueError(f"{path} feature order does not match the {name} feature schema")
+    output = bundle.network.predict(bundle.scaler.transform(bundle.scaler.mean_[None, :]))
+    if not (0.0 <= float(output[0, 0]) <= 1.0):
+        raise ValueError(f"{path} produced an out-of-range probability: {output[0, 0]}")
+    return bundle
+
+
+def run_training_job(job):
+    """Train, bundle, verify and publish one job's model, recording the outcome on the job.
+
+    Training writes into a scratch directory, never over the files being
+    served; the result only becomes visible through ``publish_bundle``.
+    """
+    name = job.model_name
+    versions_dir = get_versions_dir()
+    versions_dir.mkdir(parents=True, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix=f'.train-{name}-', dir=versions_dir)
+    try:
+        TRAINERS[name](output_dir=work_dir)
+        staged_path = os.path.join(work_dir, f'{name}.bundle')
+        header = build_bundle_from_artifacts(name, work_dir, staged_path)
+        smoke_test_bundle(name, staged_path)
+
+        versioned_path = versions_dir / f"{name}-{header['model_version']}.bundle"
+        os.replace(staged_path, versioned_path)
+        publish_bundle(name, versioned_path)
+
+        # Swap this process over too; readers mid-request keep the model they already hold
+        model_registry.swap(name, load_model_artifacts(name))
+
+        job.status = ModelTrainingJob.STATUS_SUCCEEDED
+        job.model_version = header['model_version']
+        job.bundle_path = str(versioned_path)
+    except Exception as e:
+        job.status = ModelTrainingJob.STATUS_FAILED
+        job.error = f"{type(e).__name__}: {e}\n\n{traceback.format_exc()}"
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        job.date_finished = timezone.now()
+        job.save(update_fields=['status', 'model_version', 'bundle_path', 'error', 'date_finished'])
+    return job
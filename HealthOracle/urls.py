@@ -17,19 +17,23 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.contrib.auth import views as auth_views
-from . import views, chatbot_views
+from . import views, chatbot_views, health_views
 from users import views as user_views
 from django.conf import settings
 from django.conf.urls.static import static
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('healthz/ready', health_views.readiness, name='readiness'),
+    path('metrics', health_views.metrics, name='metrics'),
+    path('ops/models/reload', health_views.reload_models, name='reload_models'),
     path('', views.home, name='home'),
     path('about/', views.about, name='about'),
     path('heart/', views.heart_prediction, name='heart'),
     path('lung/', views.lung_prediction, name='lung'),
     path('diabetes/', views.diabetes_prediction, name='diabetes'),
     path('liver/', views.liver_prediction, name='liver'),
+    path('api/predict/<str:disease>/batch/', views.batch_prediction_api, name='batch_prediction_api'),
     
     # Authentication URLs
     path('register/', user_views.register, name='register'),
@@ -38,6 +42,7 @@ urlpatterns = [
     path('profile/', user_views.profile, name='profile'),
     path('history/', user_views.patient_history, name='history'),
     path('prediction/<int:prediction_id>/', views.prediction_detail, name='prediction_detail'),
+    path('prediction/<int:prediction_id>/what-if/', views.prediction_what_if, name='prediction_what_if'),
     path('chatbot/', chatbot_views.chatbot_view, name='chatbot'),
     path('chatbot/query/', chatbot_views.handle_chatbot_query, {'prediction_id': None}, name='chatbot_query_general'),
     path('chatbot/<int:prediction_id>/', chatbot_views.chatbot_view, name='chatbot_prediction'),
@@ -1,13 +1,22 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .ml_models import predict_heart_disease, predict_lung_disease, predict_diabetes, predict_liver_disease
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from .predictors import predict_heart_disease, predict_lung_disease, predict_diabetes, predict_liver_disease, predict_batch, predict_interval, predict_surface
+from .feature_schema import SCHEMAS
 from .models import PredictionHistory
+from .request_timing import stage
 import numpy as np
+import hmac
 import json
+import logging
+from django.contrib.auth.models import User
 from django.http import JsonResponse
 from django.conf import settings
 
+logger = logging.getLogger(__name__)
+
 # Lazy load Gemini client
 _gemini_client = None
 
@@ -33,258 +42,261 @@ def prediction_detail(request, prediction_id):
     prediction = get_object_or_404(PredictionHistory, id=prediction_id, user=request.user)
     return render(request, 'prediction_detail.html', {'prediction': prediction})
 
-# Heart Prediction
-@login_required
-def heart_prediction(request):
+def _prediction_view(request, disease, predict):
+    """Form view shared by every disease; parsing and history encoding come from its feature schema"""
+    schema = SCHEMAS[disease]
     prediction_result = None
     risk_percentage = None
     category = None
     advice = None
+    risk_interval = None
 
     if request.method == 'POST':
         try:
-            features = [
-                int(request.POST.get('age')),
-                int(request.POST.get('sex')),
-                int(request.POST.get('cp')),
-                int(request.POST.get('trestbps')),
-                int(request.POST.get('chol')),
-                int(request.POST.get('fbs')),
-                int(request.POST.get('restecg')),
-                int(request.POST.get('thalach')),
-                int(request.POST.get('exang')),
-                float(request.POST.get('oldpeak')),
-                int(request.POST.get('slope')),
-                int(request.POST.get('ca')),
-                int(request.POST.get('thal')),
-            ]
-            risk_percentage, category, advice = predict_heart_disease(features)
+            with stage('parse'):
+                features = schema.parse_post(request.POST)
+            risk_percentage, category, advice = predict(features)
             prediction_result = 1 if category == "High Risk" else 0
+            if getattr(settings, 'ML_UNCERTAINTY_ENABLED', False):
+                intervals = predict_interval(disease, [features], [risk_percentage])
+                if intervals is not None:
+                    risk_interval = intervals[0].tolist()
             
             # Save prediction to history
             if request.user.is_authenticated:
-                input_data = {
-                    'age': request.POST.get('age'),
-                    'sex': 'Male' if request.POST.get('sex') == '1' else 'Female',
-                    'chest_pain_type': request.POST.get('cp'),
-                    'resting_blood_pressure': request.POST.get('trestbps'),
-                    'cholesterol': request.POST.get('chol'),
-                    'fasting_blood_sugar': 'Yes' if request.POST.get('fbs') == '1' else 'No',
-                    'resting_ecg': request.POST.get('restecg'),
-                    'max_heart_rate': request.POST.get('thalach'),
-                    'exercise_induced_angina': 'Yes' if request.POST.get('exang') == '1' else 'No',
-                    'st_depression': request.POST.get('oldpeak'),
-                    'st_slope': request.POST.get('slope'),
-                    'num_major_vessels': request.POST.get('ca'),
-                    'thalassemia': request.POST.get('thal')
-                }
+                input_data = schema.history_input_data(request.POST.get(name) for name in schema.field_names)
                 
-                print(f"Saving prediction for user {request.user.username}")
-                prediction = PredictionHistory.objects.create(
-                    user=request.user,
-                    test_type='heart',
-                    risk_percentage=risk_percentage,
-                    category=category,
-                    advice=advice,
-                    input_data=input_data
-                )
-                print(f"Prediction saved with ID: {prediction.id}")
-                messages.success(request, 'Heart disease prediction completed and saved to your history.')
-        except Exception as e:
-            print(f"Error during heart disease prediction: {e}")
+                with stage('history_insert'):
+                    prediction = PredictionHistory.objects.create(
+                        user=request.user,
+                        test_type=disease,
+                        risk_percentage=risk_percentage,
+                        risk_interval_low=risk_interval[0] if risk_interval else None,
+                        risk_interval_high=risk_interval[1] if risk_interval else None,
+                        category=category,
+                        advice=advice,
+                        input_data=input_data
+                    )
+                logger.debug("Saved %s prediction %s for user %s", disease, prediction.id, request.user.pk,
+                             extra={'disease': disease, 'prediction_id': prediction.id, 'user_id': request.user.pk})
+                messages.success(request, f'{schema.label} prediction completed and saved to your history.')
+        except Exception:
+            logger.exception("Error during %s prediction", disease, extra={'disease': disease})
             prediction_result = "Error"
             messages.error(request, 'An error occurred during prediction. Please try again.')
 
-    return render(request, 'heart.html', {
-        'prediction_result': prediction_result,
-        'risk_percentage': risk_percentage,
-        'category': category,
-        'advice': advice
-    })
+    with stage('render'):
+        return render(request, f'{disease}.html', {
+            'prediction_result': prediction_result,
+            'risk_percentage': risk_percentage,
+            'risk_interval': risk_interval,
+            'category': category,
+            'advice': advice
+        })
 
+# Heart Prediction
+@login_required
+def heart_prediction(request):
+    return _prediction_view(request, 'heart', predict_heart_disease)
 
 # Diabetes Prediction
 @login_required
 def diabetes_prediction(request):
-    prediction_result = None
-    risk_percentage = None
-    category = None
-    advice = None
-
-    if request.method == 'POST':
-        try:
-            features = [
-                float(request.POST.get('pregnancies')),
-                float(request.POST.get('glucose')),
-                float(request.POST.get('blood_pressure')),
-                float(request.POST.get('skin_thickness')),
-                float(request.POST.get('insulin')),
-                float(request.POST.get('bmi')),
-                float(request.POST.get('diabetes_pedigree')),
-                float(request.POST.get('age')),
-            ]
-            risk_percentage, category, advice = predict_diabetes(features)
-            prediction_result = 1 if category == "High Risk" else 0
-            
-            # Save prediction to history
-            if request.user.is_authenticated:
-                input_data = {
-                    'pregnancies': request.POST.get('pregnancies'),
-                    'glucose': request.POST.get('glucose'),
-                    'blood_pressure': request.POST.get('blood_pressure'),
-                    'skin_thickness': request.POST.get('skin_thickness'),
-                    'insulin': request.POST.get('insulin'),
-                    'bmi': request.POST.get('bmi'),
-                    'diabetes_pedigree': request.POST.get('diabetes_pedigree'),
-                    'age': request.POST.get('age')
-                }
-                
-                PredictionHistory.objects.create(
-                    user=request.user,
-                    test_type='diabetes',
-                    risk_percentage=risk_percentage,
-                    category=category,
-                    advice=advice,
-                    input_data=input_data
-                )
-                messages.success(request, 'Diabetes prediction completed and saved to your history.')
-        except Exception as e:
-            print(f"Error during diabetes prediction: {e}")
-            prediction_result = "Error"
-            messages.error(request, 'An error occurred during prediction. Please try again.')
-
-    return render(request, 'diabetes.html', {
-        'prediction_result': prediction_result,
-        'risk_percentage': risk_percentage,
-        'category': category,
-        'advice': advice
-    })
-
+    return _prediction_view(request, 'diabetes', predict_diabetes)
 
 # Lung Prediction
 @login_required
 def lung_prediction(request):
-    prediction_result = None
-    risk_percentage = None
-    category = None
-    advice = None
+    return _prediction_view(request, 'lung', predict_lung_disease)
 
-    if request.method == 'POST':
-        try:
-            # Convert input features to appropriate format
-            features = [
-                float(request.POST.get('age')),
-                int(request.POST.get('smoking_status')),  # Convert to int (1 or 0)
-                float(request.POST.get('area_air_quality_index')),
-                int(request.POST.get('alcohol_consumption')),  # Convert to int (1 or 0)
-                float(request.POST.get('bmi')),
-                int(request.POST.get('family_history')),  # Convert to int (1 or 0)
-                int(request.POST.get('physical_activity_level')),  # Convert to int (days)
-                int(request.POST.get('occupation_exposure'))  # Convert to int (1 or 0)
-            ]
-            
-            print("Input features:", features)  # Debug print
-            
-            risk_percentage, category, advice = predict_lung_disease(features)
-            prediction_result = 1 if category == "High Risk" else 0
-            
-            # Save prediction to history
-            if request.user.is_authenticated:
-                input_data = {
-                    'age': request.POST.get('age'),
-                    'smoking_status': 'Yes' if request.POST.get('smoking_status') == '1' else 'No',
-                    'area_air_quality_index': request.POST.get('area_air_quality_index'),
-                    'alcohol_consumption': 'Yes' if request.POST.get('alcohol_consumption') == '1' else 'No',
-                    'bmi': request.POST.get('bmi'),
-                    'family_history': 'Yes' if request.POST.get('family_history') == '1' else 'No',
-                    'physical_activity_level': request.POST.get('physical_activity_level'),
-                    'occupation_exposure': 'Yes' if request.POST.get('occupation_exposure') == '1' else 'No'
-                }
-                
-                print(f"Saving prediction for user {request.user.username}")
-                prediction = PredictionHistory.objects.create(
-                    user=request.user,
-                    test_type='lung',
-                    risk_percentage=risk_percentage,
-                    category=category,
-                    advice=advice,
-                    input_data=input_data
+# Liver Prediction
+@login_required
+def liver_prediction(request):
+    return _prediction_view(request, 'liver', predict_liver_disease)
+
+def _batch_records_to_array(records, fields):
+    """Convert a list of records (dicts keyed by field name, or lists in field order) to an (n, k) array.
+
+    Integer fields must hold whole numbers, so the values saved to history are exactly the values scored.
+    """
+    names = [field.name for field in fields]
+    rows = []
+    for i, record in enumerate(records):
+        if isinstance(record, dict):
+            missing = [name for name in names if name not in record]
+            if missing:
+                raise ValueError(f"Record {i} is missing fields: {', '.join(missing)}")
+            record = [record[name] for name in names]
+        elif not isinstance(record, list) or len(record) != len(names):
+            raise ValueError(f"Record {i} must be an object or a list of {len(names)} values")
+        rows.append(record)
+    try:
+        X = np.array(rows, dtype=np.float64).reshape(len(rows), len(names))
+    except (TypeError, ValueError):
+        raise ValueError("All field values must be numeric")
+    if not np.isfinite(X).all():
+        raise ValueError("All field values must be finite numbers")
+    for j, field in enumerate(fields):
+        if field.dtype is int:
+            fractional = np.flatnonzero(X[:, j] != np.rint(X[:, j]))
+            if fractional.size:
+                raise ValueError(f"{field.name} must be a whole number (records {fractional[:20].tolist()})")
+    return X
+
+def _parse_api_tokens(value):
+    """{token: username} from 'username=token,username=token'"""
+    tokens = {}
+    for entry in (value or '').split(','):
+        username, _, token = entry.strip().partition('=')
+        if username and token:
+            tokens[token.strip()] = username.strip()
+    return tokens
+
+def _api_user(request):
+    """The active user whose ML_BATCH_API_TOKENS token is in the Authorization header, or None"""
+    header = request.headers.get('Authorization', '')
+    if not header.startswith('Bearer '):
+        return None
+    presented = header[len('Bearer '):].strip()
+    for token, username in _parse_api_tokens(getattr(settings, 'ML_BATCH_API_TOKENS', '')).items():
+        if hmac.compare_digest(token.encode(), presented.encode()):
+            return User.objects.filter(username=username, is_active=True).first()
+    return None
+
+# Batch Prediction API
+@csrf_exempt
+@require_POST
+def batch_prediction_api(request, disease):
+    """Score many records for one disease in a single vectorized pass.
+
+    Partner clients authenticate with 'Authorization: Bearer <token>', one
+    token per partner account in ML_BATCH_API_TOKENS; saved results go to
+    that account's history.
+    Body: {"records": [{...} or [...], ...], "save": false}
+    Record fields are the form field names of the disease's single prediction view.
+    With ML_UNCERTAINTY_ENABLED each result also carries "risk_interval": [low, high].
+    """
+    user = _api_user(request)
+    if user is None:
+        response = JsonResponse({'error': 'A valid API token is required.'}, status=401)
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+
+    schema = SCHEMAS.get(disease)
+    if schema is None:
+        return JsonResponse({'error': f'Unknown disease: {disease}'}, status=404)
+
+    try:
+        with stage('parse'):
+            data = json.loads(request.body)
+            records = data['records']
+            if not isinstance(records, list) or not records:
+                raise ValueError("'records' must be a non-empty list")
+            max_records = getattr(settings, 'ML_BATCH_MAX_RECORDS', 10000)
+            if len(records) > max_records:
+                raise ValueError(f"At most {max_records} records can be scored per request")
+            X = _batch_records_to_array(records, schema.fields)
+        risk_percentages, categories, advice = predict_batch(disease, X)
+        intervals = None
+        if getattr(settings, 'ML_UNCERTAINTY_ENABLED', False):
+            intervals = predict_interval(disease, X, risk_percentages)
+    except (json.JSONDecodeError, KeyError, TypeError):
+        return JsonResponse({'error': 'Invalid request format. Expected {"records": [...]}.'}, status=400)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception:
+        logger.exception("Error during %s batch prediction", disease, extra={'disease': disease})
+        return JsonResponse({'error': 'An error occurred during prediction.'}, status=500)
+
+    results = [
+        {'risk_percentage': float(risk), 'category': str(category), 'advice': str(text)}
+        for risk, category, text in zip(risk_percentages, categories, advice)
+    ]
+    if intervals is not None:
+        for result, (low, high) in zip(results, intervals.tolist()):
+            result['risk_interval'] = [low, high]
+
+    saved = 0
+    if data.get('save'):
+        with stage('history_insert'):
+            PredictionHistory.objects.bulk_create([
+                PredictionHistory(
+                    user=user,
+                    test_type=disease,
+                    risk_percentage=result['risk_percentage'],
+                    risk_interval_low=result['risk_interval'][0] if 'risk_interval' in result else None,
+                    risk_interval_high=result['risk_interval'][1] if 'risk_interval' in result else None,
+                    category=result['category'],
+                    advice=result['advice'],
+                    input_data=schema.history_input_data(schema.parse_values(row.tolist())),
                 )
-                print(f"Prediction saved with ID: {prediction.id}")
-                messages.success(request, 'Lung disease prediction completed and saved to your history.')
-        except Exception as e:
-            print(f"Error during lung disease prediction: {e}")
-            prediction_result = "Error"
-            messages.error(request, 'An error occurred during prediction. Please try again.')
+                for result, row in zip(results, X)
+            ], batch_size=500)
+        saved = len(results)
 
-    return render(request, 'lung.html', {
-        'prediction_result': prediction_result,
-        'risk_percentage': risk_percentage,
-        'category': category,
-        'advice': advice
-    })
+    with stage('render'):
+        return JsonResponse({'disease': disease, 'count': len(results), 'saved': saved, 'results': results})
 
+def _what_if_axis(params, prefix, max_steps):
+    """(field, low, high, steps) for one swept axis from the query string, or None if it isn't given"""
+    field = params.get(prefix)
+    if not field:
+        return None
+    try:
+        low = float(params[f'{prefix}_min']) if params.get(f'{prefix}_min') else None
+        high = float(params[f'{prefix}_max']) if params.get(f'{prefix}_max') else None
+        steps = int(params.get(f'{prefix}_steps') or 50)
+    except ValueError:
+        raise ValueError(f"{prefix}_min, {prefix}_max and {prefix}_steps must be numbers")
+    if not 2 <= steps <= max_steps:
+        raise ValueError(f"{prefix}_steps must be between 2 and {max_steps}")
+    return field, low, high, steps
 
-# Liver Prediction
+# What-if sensitivity API
 @login_required
-def liver_prediction(request):
-    prediction_result = None
-    risk_percentage = None
-    category = None
-    advice = None
+@require_GET
+def prediction_what_if(request, prediction_id):
+    """Risk surface for a saved prediction with one or two inputs swept over a grid.
 
-    if request.method == 'POST':
-        try:
-            features = [
-                int(request.POST.get('age')),
-                int(request.POST.get('gender')),
-                float(request.POST.get('total_bilirubin')),
-                float(request.POST.get('direct_bilirubin')),
-                int(request.POST.get('alkaline_phosphotase')),
-                int(request.POST.get('alamine_aminotransferase')),
-                int(request.POST.get('aspartate_aminotransferase')),
-                float(request.POST.get('total_proteins')),
-                float(request.POST.get('albumin')),
-                float(request.POST.get('albumin_globulin_ratio')),
-            ]
-            risk_percentage, category, advice = predict_liver_disease(features)
-            prediction_result = 1 if category == "High Risk" else 0
-            
-            # Save prediction to history
-            if request.user.is_authenticated:
-                input_data = {
-                    'age': request.POST.get('age'),
-                    'gender': 'Male' if request.POST.get('gender') == '1' else 'Female',
-                    'total_bilirubin': request.POST.get('total_bilirubin'),
-                    'direct_bilirubin': request.POST.get('direct_bilirubin'),
-                    'alkaline_phosphotase': request.POST.get('alkaline_phosphotase'),
-                    'alamine_aminotransferase': request.POST.get('alamine_aminotransferase'),
-                    'aspartate_aminotransferase': request.POST.get('aspartate_aminotransferase'),
-                    'total_proteins': request.POST.get('total_proteins'),
-                    'albumin': request.POST.get('albumin'),
-                    'albumin_globulin_ratio': request.POST.get('albumin_globulin_ratio')
-                }
-                
-                PredictionHistory.objects.create(
-                    user=request.user,
-                    test_type='liver',
-                    risk_percentage=risk_percentage,
-                    category=category,
-                    advice=advice,
-                    input_data=input_data
-                )
-                messages.success(request, 'Liver disease prediction completed and saved to your history.')
-        except Exception as e:
-            print(f"Error during liver disease prediction: {e}")
-            prediction_result = "Error"
-            messages.error(request, 'An error occurred during prediction. Please try again.')
+    Query: ?x=<field>&x_min=&x_max=&x_steps=50, plus the same for an optional y.
+    Fields are the form field names of the prediction's disease; the other
+    inputs keep the values saved with the prediction. Ranges default to the
+    training mean +/- two standard deviations, and yes/no fields take both
+    values. "risk" is indexed [x] or [x][y], null where the inputs are invalid.
+    """
+    prediction = get_object_or_404(PredictionHistory, id=prediction_id, user=request.user)
+    schema = SCHEMAS.get(prediction.test_type)
+    if schema is None:
+        return JsonResponse({'error': f'Unknown disease: {prediction.test_type}'}, status=404)
+
+    try:
+        with stage('parse'):
+            base_values = [field.decode_history_value(prediction.input_data[field.history_key])
+                           for field in schema.fields]
+            max_steps = getattr(settings, 'ML_WHAT_IF_MAX_STEPS', 200)
+            axes = [axis for axis in (_what_if_axis(request.GET, prefix, max_steps) for prefix in ('x', 'y')) if axis]
+            if not axes:
+                raise ValueError(f"Give the field to sweep as ?x=<field>, one of: {', '.join(schema.field_names)}")
+        axis_values, risk = predict_surface(prediction.test_type, base_values, axes)
+    except (KeyError, TypeError):
+        return JsonResponse({'error': 'The inputs saved with this prediction cannot be replayed.'}, status=400)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception:
+        logger.exception("Error during %s what-if prediction", prediction.test_type,
+                         extra={'disease': prediction.test_type, 'prediction_id': prediction.id})
+        return JsonResponse({'error': 'An error occurred during prediction.'}, status=500)
 
-    return render(request, 'liver.html', {
-        'prediction_result': prediction_result,
-        'risk_percentage': risk_percentage,
-        'category': category,
-        'advice': advice
-    })
+    with stage('render'):
+        return JsonResponse({
+            'prediction_id': prediction.id,
+            'disease': prediction.test_type,
+            'risk_percentage': prediction.risk_percentage,
+            'inputs': dict(zip(schema.field_names, base_values)),
+            'axes': [{'field': field, 'values': values.tolist()} for (field, _, _, _), values in zip(axes, axis_values)],
+            'risk': np.where(np.isnan(risk), None, risk).tolist(),
+            'category_thresholds': [30, 60],
+        })
 
 def get_suggestions(prediction_type, risk_percentage, category):
     suggestions = {
@@ -613,8 +625,8 @@ def handle_chatbot_query(request, prediction_id):
                 
                 return JsonResponse({'response': formatted_response})
                 
-            except Exception as e:
-                print(f"Gemini API Error: {str(e)}")
+            except Exception:
+                logger.exception("Gemini API error")
                 return JsonResponse({
                     'response': 'I apologize, but I encountered an error processing your question. Please try rephrasing your question or try again later.'
                 })
@@ -627,8 +639,8 @@ def handle_chatbot_query(request, prediction_id):
             return JsonResponse({
                 'response': 'Prediction not found. Please try again.'
             })
-        except Exception as e:
-            print(f"General Error: {str(e)}")
+        except Exception:
+            logger.exception("Unexpected error answering a chatbot question")
             return JsonResponse({
                 'response': 'An unexpected error occurred. Please try again later.'
             })
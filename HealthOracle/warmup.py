@@ -0,0 +1,62 @@
+import logging
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from .feature_schema import SCHEMAS
+from .ml_models import MODEL_NAMES, model_registry, predict_batch
+
+logger = logging.getLogger(__name__)
+
+# Per-model warm-up results, filled in by warm_up()
+warmup_status = {}
+_warmup_thread = None
+_warmup_lock = threading.Lock()
+
+
+def get_warmup_models():
+    """Models named in ML_WARMUP_MODELS ('all' for every model, empty to disable)"""
+    configured = getattr(settings, 'ML_WARMUP_MODELS', '')
+    if isinstance(configured, str):
+        configured = [name.strip() for name in configured.split(',') if name.strip()]
+    if 'all' in configured:
+        return list(MODEL_NAMES)
+    return [name for name in configured if name in MODEL_NAMES]
+
+
+def warm_up(names):
+    """Load each model and run one dummy prediction through the batch path"""
+    for name in names:
+        warmup_status[name] = {'state': 'warming'}
+        started = time.perf_counter()
+        try:
+            loaded = model_registry.get(name)
+            # The scaler's training means for the raw columns make a realistic input row
+            raw_row = np.asarray(loaded.scaler.mean_[:SCHEMAS[name].raw_count], dtype=np.float64)
+            predict_batch(name, raw_row.reshape(1, -1))
+            warmup_status[name] = {'state': 'warm', 'seconds': round(time.perf_counter() - started, 4)}
+        except Exception as e:
+            warmup_status[name] = {'state': 'failed', 'error': str(e)}
+            logger.exception("Warm-up failed for %s model", name, extra={'model': name})
+
+
+def start_warmup():
+    """Warm the configured models on a background thread; safe to call more than once"""
+    global _warmup_thread
+    names = get_warmup_models()
+    if not names:
+        return None
+    with _warmup_lock:
+        if _warmup_thread is None:
+            for name in names:
+                warmup_status[name] = {'state': 'pending'}
+            _warmup_thread = threading.Thread(target=warm_up, args=(names,), name='model-warmup', daemon=True)
+            _warmup_thread.start()
+    return _warmup_thread
+
+
+def is_ready():
+    """True once every model configured for warm-up is warm"""
+    return all(warmup_status.get(name, {}).get('state') == 'warm' for name in get_warmup_models())
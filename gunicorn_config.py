@@ -37,6 +37,25 @@ tmp_upload_dir = None
 # Preload app to save memory (but may cause issues with lazy loading)
 preload_app = False  # Set to False to allow lazy loading
 
+# Server hooks
+def on_starting(server):
+    # Per-worker request metrics files from a previous run would be added to this one's
+    metrics_dir = os.getenv('METRICS_DIR')
+    if metrics_dir and os.path.isdir(metrics_dir):
+        for filename in os.listdir(metrics_dir):
+            if filename.endswith('.json'):
+                os.remove(os.path.join(metrics_dir, filename))
+
+def post_worker_init(worker):
+    # Django is set up once the worker has loaded the app; warm the models
+    # listed in ML_WARMUP_MODELS in the background so the first requests after
+    # a start or a max_requests recycle don't pay the model load
+    from HealthOracle.warmup import start_warmup
+    start_warmup()
+    # Pick up rebuilt model bundles without restarting the worker
+    from HealthOracle.hot_reload import start_reload_watcher
+    start_reload_watcher()
+
 # SSL (if needed)
 keyfile = None
 certfile = None
@@ -0,0 +1,211 @@
+"""Local stand-in for the Gemini generateContent API, for load tests.
+
+Point the app at it with GEMINI_BASE_URL=http://127.0.0.1:<port> (any
+GEMINI_API_KEY works). It answers
+
+    POST /<version>/models/<model>:generateContent
+    POST /<version>/models/<model>:streamGenerateContent?alt=sse
+
+with a canned bullet-point reply after a configurable delay. With --chunks > 1
+the reply is streamed: as SSE events for streamGenerateContent, or as a
+chunked response body trickled out for generateContent, which is how a slow
+generation looks to a non-streaming client.
+
+    python loadtest/gemini_stub.py --port 8790 --latency-ms 800 --jitter-ms 300 --chunks 8 --chunk-delay-ms 50
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROUTE = re.compile(r'^/(?:v1|v1beta|v1alpha)/models/(?P<model>[^/:]+):(?P<method>generateContent|streamGenerateContent)$')
+
+REPLY_LINES = [
+    "• **Schedule a check-up** with your doctor to review these results.",
+    "• Aim for **150 minutes** of moderate exercise each week.",
+    "• Choose whole grains, vegetables and lean protein; limit **salt and sugar**.",
+    "• Keep track of blood pressure and weight at home.",
+    "• Avoid smoking and keep alcohol within recommended limits.",
+    "• Sleep 7-9 hours a night and manage stress with regular breaks.",
+    "• Seek **immediate care** for chest pain, shortness of breath or fainting.",
+    "• This is general information, not a medical diagnosis.",
+]
+
+
+class StubStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def enter(self):
+        with self.lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def leave(self, error=False):
+        with self.lock:
+            self.in_flight -= 1
+            if error:
+                self.errors += 1
+
+    def as_dict(self):
+        with self.lock:
+            return {'requests': self.requests, 'errors': self.errors, 'in_flight': self.in_flight,
+                    'max_in_flight': self.max_in_flight}
+
+
+def reply_text(prompt, words):
+    lines = []
+    while sum(len(line.split()) for line in lines) < words:
+        lines.append(REPLY_LINES[len(lines) % len(REPLY_LINES)])
+    return '\n'.join(lines)
+
+
+def response_payload(model, text):
+    return {
+        'candidates': [{
+            'content': {'parts': [{'text': text}], 'role': 'model'},
+            'finishReason': 'STOP',
+            'index': 0,
+        }],
+        'usageMetadata': {'promptTokenCount': 0, 'candidatesTokenCount': len(text.split()),
+                          'totalTokenCount': len(text.split())},
+        'modelVersion': model,
+    }
+
+
+def split_text(text, pieces):
+    pieces = max(1, pieces)
+    size = max(1, -(-len(text) // pieces))
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class GeminiStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'GeminiStub/1.0'
+
+    def log_message(self, format, *args):
+        if self.server.options.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        if self.path == '/stats':
+            return self.send_json(200, self.server.stats.as_dict())
+        return self.send_json(404, {'error': {'code': 404, 'message': 'Not found', 'status': 'NOT_FOUND'}})
+
+    def do_POST(self):
+        path, _, query = self.path.partition('?')
+        match = ROUTE.match(path)
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if match is None:
+            return self.send_json(404, {'error': {'code': 404, 'message': f'No route for {path}', 'status': 'NOT_FOUND'}})
+
+        options = self.server.options
+        stats = self.server.stats
+        stats.enter()
+        failed = False
+        try:
+            delay = max(0.0, options.latency_ms + random.uniform(-options.jitter_ms, options.jitter_ms)) / 1000.0
+            time.sleep(delay)
+            if random.random() < options.error_rate:
+                failed = True
+                return self.send_json(503, {'error': {'code': 503, 'message': 'The model is overloaded (stub).',
+                                                      'status': 'UNAVAILABLE'}})
+            try:
+                prompt = json.loads(body or b'{}')
+            except ValueError:
+                prompt = {}
+            text = reply_text(prompt, options.response_words)
+            model = match.group('model')
+            if match.group('method') == 'streamGenerateContent':
+                self.send_sse(model, text, options)
+            elif options.chunks > 1:
+                self.send_trickled(json.dumps(response_payload(model, text)).encode('utf-8'), options)
+            else:
+                self.send_json(200, response_payload(model, text))
+        except (BrokenPipeError, ConnectionResetError):
+            failed = True
+        finally:
+            stats.leave(error=failed)
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_chunk(self, data):
+        self.wfile.write(f'{len(data):X}\r\n'.encode('ascii') + data + b'\r\n')
+        self.wfile.flush()
+
+    def send_trickled(self, data, options):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        size = max(1, -(-len(data) // options.chunks))
+        for i in range(0, len(data), size):
+            if i:
+                time.sleep(options.chunk_delay_ms / 1000.0)
+            self.send_chunk(data[i:i + size])
+        self.wfile.write(b'0\r\n\r\n')
+
+    def send_sse(self, model, text, options):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for i, piece in enumerate(split_text(text, options.chunks)):
+            if i:
+                time.sleep(options.chunk_delay_ms / 1000.0)
+            self.send_chunk(f"data: {json.dumps(response_payload(model, piece))}\r\n\r\n".encode('utf-8'))
+        self.wfile.write(b'0\r\n\r\n')
+
+
+def make_server(host='127.0.0.1', port=0, latency_ms=500.0, jitter_ms=0.0, chunks=1, chunk_delay_ms=0.0,
+                error_rate=0.0, response_words=120, verbose=False):
+    server = ThreadingHTTPServer((host, port), GeminiStubHandler)
+    server.daemon_threads = True
+    server.options = argparse.Namespace(latency_ms=latency_ms, jitter_ms=jitter_ms, chunks=chunks,
+                                        chunk_delay_ms=chunk_delay_ms, error_rate=error_rate,
+                                        response_words=response_words, verbose=verbose)
+    server.stats = StubStats()
+    return server
+
+
+def add_stub_arguments(parser):
+    parser.add_argument('--latency-ms', type=float, default=500.0, help="Delay before the first byte")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="Uniform +/- jitter on the delay")
+    parser.add_argument('--chunks', type=int, default=1, help="Stream the reply in this many pieces")
+    parser.add_argument('--chunk-delay-ms', type=float, default=0.0, help="Delay between streamed pieces")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument('--response-words', type=int, default=120)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8790)
+    parser.add_argument('--verbose', action='store_true')
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    server = make_server(args.host, args.port, args.latency_ms, args.jitter_ms, args.chunks, args.chunk_delay_ms,
+                         args.error_rate, args.response_words, args.verbose)
+    print(f"Gemini stub listening on http://{args.host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,478 @@
+"""End-to-end HTTP load test of the Django app under gunicorn.
+
+Starts the local Gemini stub and gunicorn (with gunicorn_config.py) against a
+throwaway copy of the database, creates test users with some saved
+predictions, then runs concurrent logged-in sessions that send a weighted mix of
+requests:
+
+    heart        POST /heart/                              (prediction form)
+    lung         POST /lung/                               (prediction form)
+    history      GET  /history/
+    chat         POST /chatbot/<id>/query/                 (Gemini stub)
+    suggestions  POST /chatbot/<id>/suggestions/           (Gemini stub once per prediction, then DB)
+
+It reports throughput, latency percentiles and error rates per endpoint, and
+samples the RSS of every gunicorn worker over time. Results are written as JSON.
+
+    python loadtest/run_loadtest.py --duration 60 --concurrency 16 --workers 2 \\
+        --mix heart=4,lung=3,history=2,chat=1,suggestions=1 --stub-latency-ms 800 --stub-chunks 8
+
+Arguments after ``--`` are passed straight to gunicorn (e.g. ``-- --worker-class gthread --threads 4``).
+Everything runs locally; no real Gemini key or network access is needed.
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timezone
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from gemini_stub import add_stub_arguments  # noqa: E402
+
+ENDPOINTS = ('heart', 'lung', 'history', 'chat', 'suggestions')
+DEFAULT_MIX = 'heart=4,lung=3,history=2,chat=1,suggestions=1'
+PASSWORD = 'loadtest-Passw0rd!'
+# Rendered by the prediction views when scoring fails (they still answer 200)
+PREDICTION_ERROR_MARKER = b'An error occurred during prediction'
+CHAT_ERROR_PREFIX = 'I apologize'
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint in --mix: {name} (choose from {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def rss_bytes(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def child_pids(pid):
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            if int(fields[1]) == pid:
+                children.append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    return children
+
+
+def prepare_database(path, users, predictions_per_user):
+    """Migrate the copied database and create load-test users with saved predictions"""
+    import django
+    django.setup()
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from HealthOracle.feature_schema import SCHEMAS
+    from HealthOracle.ml_models import model_registry, predict_batch
+    from HealthOracle.models import PredictionHistory
+    from HealthOracle.reference_data import synthetic_inputs
+
+    call_command('migrate', verbosity=0)
+    rng = np.random.default_rng(0)
+    form_rows = {}
+    for disease in ('heart', 'lung'):
+        schema = SCHEMAS[disease]
+        X = synthetic_inputs(disease, model_registry.get(disease).scaler, 500, rng)
+        form_rows[disease] = [
+            {field.name: str(int(value)) if field.dtype is int else f'{value:.3f}'
+             for field, value in zip(schema.fields, row)}
+            for row in X
+        ]
+
+    schema = SCHEMAS['heart']
+    seed_rows = synthetic_inputs('heart', model_registry.get('heart').scaler, predictions_per_user, rng)
+    risks, categories, advice = predict_batch('heart', seed_rows)
+    accounts = []
+    for i in range(users):
+        username = f'loadtest{i:03d}'
+        user, _ = User.objects.get_or_create(username=username, defaults={'email': f'{username}@example.com'})
+        user.set_password(PASSWORD)
+        user.save()
+        PredictionHistory.objects.filter(user=user).delete()
+        PredictionHistory.objects.bulk_create([
+            PredictionHistory(user=user, test_type='heart', risk_percentage=float(risk), category=str(category),
+                              advice=str(text), input_data=schema.history_input_data(schema.parse_values(row.tolist())))
+            for risk, category, text, row in zip(risks, categories, advice, seed_rows)
+        ])
+        ids = list(PredictionHistory.objects.filter(user=user).values_list('id', flat=True))
+        accounts.append({'username': username, 'prediction_ids': ids})
+    from django.db import connections
+    connections.close_all()
+    return accounts, form_rows
+
+
+class Session:
+    """One logged-in browser: cookie jar plus CSRF token"""
+
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+
+    def csrf_token(self):
+        for cookie in self.cookies:
+            if cookie.name == 'csrftoken':
+                return cookie.value
+        return ''
+
+    def request(self, method, path, data=None, json_body=None):
+        headers = {'User-Agent': 'healthoracle-loadtest'}
+        body = None
+        if json_body is not None:
+            body = json.dumps(json_body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+            headers['X-CSRFToken'] = self.csrf_token()
+        elif data is not None:
+            body = urllib.parse.urlencode(dict(data, csrfmiddlewaretoken=self.csrf_token())).encode('utf-8')
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        if method == 'POST':
+            headers['X-CSRFToken'] = self.csrf_token()
+            headers['Referer'] = self.base_url + path
+        req = urllib.request.Request(self.base_url + path, data=body, headers=headers, method=method)
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def login(self, username):
+        self.request('GET', '/login/')
+        status, body = self.request('POST', '/login/', data={'username': username, 'password': PASSWORD})
+        if status != 200 or b'name="password"' in body:
+            raise RuntimeError(f"Login failed for {username} (HTTP {status})")
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {name: [] for name in ENDPOINTS}
+        self.statuses = {name: {} for name in ENDPOINTS}
+        self.errors = {name: {'http': 0, 'app': 0, 'exception': 0} for name in ENDPOINTS}
+        self.error_examples = []
+
+    def record(self, endpoint, seconds, status, error_kind=None, detail=None):
+        with self.lock:
+            self.samples[endpoint].append(seconds)
+            key = str(status)
+            self.statuses[endpoint][key] = self.statuses[endpoint].get(key, 0) + 1
+            if error_kind:
+                self.errors[endpoint][error_kind] += 1
+                if len(self.error_examples) < 20:
+                    self.error_examples.append({'endpoint': endpoint, 'kind': error_kind, 'status': status,
+                                                'detail': (detail or '')[:300]})
+
+
+def classify(endpoint, status, body):
+    if status >= 400:
+        return 'http'
+    if endpoint in ('heart', 'lung') and PREDICTION_ERROR_MARKER in body:
+        return 'app'
+    if endpoint in ('chat', 'suggestions'):
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return 'app'
+        if endpoint == 'suggestions' and not payload.get('success'):
+            return 'app'
+        if endpoint == 'chat' and str(payload.get('response', '')).startswith(CHAT_ERROR_PREFIX):
+            return 'app'
+    return None
+
+
+def virtual_user(index, args, account, form_rows, mix, recorder, deadline, started_event):
+    rng = random.Random(args.seed + index)
+    session = Session(args.base_url, args.request_timeout)
+    try:
+        session.login(account['username'])
+    except Exception as e:
+        recorder.record('history', 0.0, 'login', 'exception', str(e))
+        return
+    started_event.wait()
+    stop_at = deadline[0]
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    while time.monotonic() < stop_at:
+        endpoint = rng.choices(names, weights)[0]
+        prediction_id = rng.choice(account['prediction_ids'])
+        started = time.perf_counter()
+        status, body, error_kind, detail = 'exception', b'', None, None
+        try:
+            if endpoint in ('heart', 'lung'):
+                status, body = session.request('POST', f'/{endpoint}/', data=rng.choice(form_rows[endpoint]))
+            elif endpoint == 'history':
+                status, body = session.request('GET', '/history/')
+            elif endpoint == 'chat':
+                status, body = session.request('POST', f'/chatbot/{prediction_id}/query/',
+                                               json_body={'message': 'What should I change in my diet?'})
+            else:
+                status, body = session.request('POST', f'/chatbot/{prediction_id}/suggestions/')
+            error_kind = classify(endpoint, status, body)
+            if error_kind:
+                detail = body[:300].decode('utf-8', 'replace')
+        except Exception as e:
+            error_kind, detail = 'exception', f"{type(e).__name__}: {e}"
+        recorder.record(endpoint, time.perf_counter() - started, status, error_kind, detail)
+        if args.think_ms:
+            time.sleep(rng.uniform(0, 2 * args.think_ms) / 1000.0)
+
+
+def sample_rss(master_pid, interval, stop_event, timeline):
+    started = time.monotonic()
+    while not stop_event.is_set():
+        point = {'t': round(time.monotonic() - started, 2), 'master': rss_bytes(master_pid), 'workers': {}}
+        for pid in child_pids(master_pid):
+            point['workers'][str(pid)] = rss_bytes(pid)
+        timeline.append(point)
+        stop_event.wait(interval)
+
+
+def wait_until_ready(base_url, timeout):
+    deadline = time.monotonic() + timeout
+    last_error = None
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(base_url + '/healthz/ready', timeout=5) as response:
+                if response.status == 200:
+                    return
+        except urllib.error.HTTPError as e:
+            last_error = f"HTTP {e.code}"
+        except OSError as e:
+            last_error = str(e)
+        time.sleep(0.5)
+    raise SystemExit(f"gunicorn did not become ready within {timeout}s ({last_error})")
+
+
+def summarise(recorder, elapsed):
+    endpoints = {}
+    for endpoint in ENDPOINTS:
+        samples = np.asarray(recorder.samples[endpoint]) * 1000.0
+        if not samples.size:
+            continue
+        errors = sum(recorder.errors[endpoint].values())
+        endpoints[endpoint] = {
+            'requests': int(samples.size),
+            'throughput_rps': round(samples.size / elapsed, 2),
+            'error_rate': round(errors / samples.size, 4),
+            'errors': recorder.errors[endpoint],
+            'status_codes': recorder.statuses[endpoint],
+            'mean_ms': round(float(samples.mean()), 2),
+            'p50_ms': round(float(np.percentile(samples, 50)), 2),
+            'p95_ms': round(float(np.percentile(samples, 95)), 2),
+            'p99_ms': round(float(np.percentile(samples, 99)), 2),
+            'max_ms': round(float(samples.max()), 2),
+        }
+    return endpoints
+
+
+def summarise_rss(timeline):
+    workers = {}
+    for point in timeline:
+        for pid, rss in point['workers'].items():
+            if rss is None:
+                continue
+            entry = workers.setdefault(pid, {'first_bytes': rss, 'max_bytes': rss, 'last_bytes': rss,
+                                             'first_t': point['t']})
+            entry['max_bytes'] = max(entry['max_bytes'], rss)
+            entry['last_bytes'] = rss
+            entry['last_t'] = point['t']
+    return workers
+
+
+def main():
+    argv = sys.argv[1:]
+    gunicorn_extra = []
+    if '--' in argv:
+        split = argv.index('--')
+        argv, gunicorn_extra = argv[:split], argv[split + 1:]
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--duration', type=float, default=30.0, help="Seconds of load after warm-up")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent logged-in sessions")
+    parser.add_argument('--users', type=int, default=4, help="Test accounts (sessions are spread across them)")
+    parser.add_argument('--predictions-per-user', type=int, default=20)
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f"Endpoint weights (default: {DEFAULT_MIX})")
+    parser.add_argument('--think-ms', type=float, default=0.0, help="Mean pause between a session's requests")
+    parser.add_argument('--workers', type=int, default=None, help="gunicorn workers (default: gunicorn_config.py)")
+    parser.add_argument('--warmup-models', default='heart,lung', help="ML_WARMUP_MODELS for the workers")
+    parser.add_argument('--request-timeout', type=float, default=120.0)
+    parser.add_argument('--ready-timeout', type=float, default=120.0)
+    parser.add_argument('--rss-interval', type=float, default=1.0)
+    parser.add_argument('--database', default=os.path.join(REPO_DIR, 'db.sqlite3'),
+                        help="Database copied for the run (the original is never written)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="JSON file (default: loadtest/results/<time>.json)")
+    parser.add_argument('--keep-temp', action='store_true', help="Keep the temporary database and logs")
+    add_stub_arguments(parser)
+    parser.set_defaults(latency_ms=800.0)
+    args = parser.parse_args(argv)
+    mix = parse_mix(args.mix)
+
+    temp_dir = tempfile.mkdtemp(prefix='healthoracle-loadtest-')
+    db_path = os.path.join(temp_dir, 'db.sqlite3')
+    if os.path.exists(args.database):
+        shutil.copy(args.database, db_path)
+    app_port, stub_port = free_port(), free_port()
+    args.base_url = f'http://127.0.0.1:{app_port}'
+
+    env = dict(os.environ)
+    env.update({
+        'DJANGO_SETTINGS_MODULE': 'HealthOracle.settings',
+        'SQLITE_PATH': db_path,
+        'GEMINI_API_KEY': 'loadtest-stub',
+        'GEMINI_BASE_URL': f'http://127.0.0.1:{stub_port}',
+        'ML_WARMUP_MODELS': args.warmup_models,
+        'PORT': str(app_port),
+    })
+    env.pop('RENDER', None)
+    os.environ.update({key: env[key] for key in ('DJANGO_SETTINGS_MODULE', 'SQLITE_PATH')})
+
+    print(f"Preparing {args.users} test users in {db_path}...", flush=True)
+    accounts, form_rows = prepare_database(db_path, args.users, args.predictions_per_user)
+
+    stub_log = open(os.path.join(temp_dir, 'gemini_stub.log'), 'w')
+    stub = subprocess.Popen(
+        [sys.executable, os.path.join(REPO_DIR, 'loadtest', 'gemini_stub.py'), '--port', str(stub_port),
+         '--latency-ms', str(args.latency_ms), '--jitter-ms', str(args.jitter_ms), '--chunks', str(args.chunks),
+         '--chunk-delay-ms', str(args.chunk_delay_ms), '--error-rate', str(args.error_rate),
+         '--response-words', str(args.response_words)],
+        stdout=stub_log, stderr=subprocess.STDOUT,
+    )
+    gunicorn_cmd = [sys.executable, '-m', 'gunicorn', 'HealthOracle.wsgi:application', '--config', 'gunicorn_config.py',
+                    '--access-logfile', os.path.join(temp_dir, 'access.log')]
+    if args.workers:
+        gunicorn_cmd += ['--workers', str(args.workers)]
+    gunicorn_cmd += gunicorn_extra
+    app_log = open(os.path.join(temp_dir, 'gunicorn.log'), 'w')
+    app = subprocess.Popen(gunicorn_cmd, cwd=REPO_DIR, env=env, stdout=app_log, stderr=subprocess.STDOUT)
+
+    timeline = []
+    stop_sampling = threading.Event()
+    try:
+        print(f"Waiting for gunicorn on {args.base_url}...", flush=True)
+        wait_until_ready(args.base_url, args.ready_timeout)
+        sampler = threading.Thread(target=sample_rss, args=(app.pid, args.rss_interval, stop_sampling, timeline),
+                                   daemon=True)
+        sampler.start()
+
+        recorder = Recorder()
+        started_event = threading.Event()
+        deadline = [None]
+        threads = [
+            threading.Thread(target=virtual_user, daemon=True,
+                             args=(i, args, accounts[i % len(accounts)], form_rows, mix, recorder, deadline,
+                                   started_event))
+            for i in range(args.concurrency)
+        ]
+        # Sessions log in first; the clock starts once they have had a moment to do so
+        for thread in threads:
+            thread.start()
+        time.sleep(1.0)
+        print(f"Running {args.concurrency} sessions for {args.duration:g}s with mix {args.mix}...", flush=True)
+        load_started = time.monotonic()
+        deadline[0] = load_started + args.duration
+        started_event.set()
+        for thread in threads:
+            thread.join(timeout=args.duration + args.request_timeout + 10)
+        elapsed = time.monotonic() - load_started
+    finally:
+        stop_sampling.set()
+        for process in (app, stub):
+            if process.poll() is None:
+                process.send_signal(signal.SIGTERM)
+        for process in (app, stub):
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        app_log.close()
+        stub_log.close()
+
+    results = {
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(),
+            'duration_s': round(elapsed, 2),
+            'concurrency': args.concurrency,
+            'users': args.users,
+            'mix': mix,
+            'gunicorn_args': gunicorn_cmd[3:],
+            'stub': {'latency_ms': args.latency_ms, 'jitter_ms': args.jitter_ms, 'chunks': args.chunks,
+                     'chunk_delay_ms': args.chunk_delay_ms, 'error_rate': args.error_rate},
+        },
+        'total': {
+            'requests': sum(len(samples) for samples in recorder.samples.values()),
+            'throughput_rps': round(sum(len(samples) for samples in recorder.samples.values()) / elapsed, 2),
+        },
+        'endpoints': summarise(recorder, elapsed),
+        'error_examples': recorder.error_examples,
+        'worker_rss': summarise_rss(timeline),
+        'rss_timeline': timeline,
+    }
+
+    output = args.output or os.path.join(
+        REPO_DIR, 'loadtest', 'results', f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\n{'endpoint':<12} {'requests':>8} {'req/s':>8} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'max ms':>8}")
+    for endpoint, stats in results['endpoints'].items():
+        print(f"{endpoint:<12} {stats['requests']:>8} {stats['throughput_rps']:>8.2f} {stats['error_rate']:>7.1%} "
+              f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['max_ms']:>8.1f}")
+    print(f"{'total':<12} {results['total']['requests']:>8} {results['total']['throughput_rps']:>8.2f}")
+    for pid, rss in results['worker_rss'].items():
+        print(f"worker {pid}: RSS {rss['first_bytes'] / 2**20:.1f} MB -> {rss['last_bytes'] / 2**20:.1f} MB "
+              f"(max {rss['max_bytes'] / 2**20:.1f} MB)")
+    for example in results['error_examples'][:5]:
+        print(f"error example: {example}")
+    print(f"\nResults written to {output}")
+    if args.keep_temp:
+        print(f"Database and logs kept in {temp_dir}")
+    else:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -10,5 +10,11 @@ python manage.py migrate --noinput
 echo "Collecting static files..."
 python manage.py collectstatic --noinput
 
+# The retraining job runner needs the same database and model_bundles/ as the web workers
+if [ "${ML_TRAINING_RUNNER:-false}" = "true" ]; then
+    echo "Starting model training job runner..."
+    python manage.py run_training_jobs &
+fi
+
 echo "Starting gunicorn..."
 exec gunicorn HealthOracle.wsgi:application --config gunicorn_config.py
@@ -4,6 +4,7 @@ from django.contrib.auth.decorators import login_required
 from .forms import UserRegisterForm, UserUpdateForm, ProfileUpdateForm
 from .models import PatientProfile
 from HealthOracle.models import PredictionHistory
+from HealthOracle.request_timing import stage
 
 def register(request):
     if request.method == 'POST':
@@ -48,5 +49,5 @@ def profile(request):
 def patient_history(request):
     # Get the patient's prediction history
     prediction_history = PredictionHistory.objects.filter(user=request.user)
-    print(f"Found {prediction_history.count()} predictions for user {request.user.username}")
-    return render(request, 'users/history.html', {'prediction_history': prediction_history})
\ No newline at end of file
+    with stage('render'):
+        return render(request, 'users/history.html', {'prediction_history': prediction_history})
\ No newline at end of file